@@ -0,0 +1,152 @@
+"""
+End-to-end cost of Aron20 in the local backtest harness: initialize time, bars per
+second through the time loop and on_data, and memory per symbol.
+
+    python benchmarks/bench_backtest.py [--days 5] [--source BAR_STORE --start DATE]
+    python benchmarks/bench_backtest.py --save baseline.json
+    python benchmarks/bench_backtest.py --compare baseline.json --tolerance 0.2
+
+Without a source the bars are a synthetic random walk of Aron20's tickers. With
+--compare the run fails if a throughput drops or a cost rises by more than the
+tolerance against the saved results.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+from datetime import date, timedelta
+from time import perf_counter
+
+SOURCE_FOLDER = os.path.join(os.path.dirname(__file__), "..", "src")
+sys.path.insert(0, os.path.join(SOURCE_FOLDER, "aron20"))
+sys.path.insert(1, os.path.join(SOURCE_FOLDER, "lean_local"))
+
+from backtest import LocalBacktest, random_walk_minute_bars
+from bar_store import load_minute_bars
+from main import Aron20
+from tickers import get_tickers_list_as_string
+
+PARAMETERS = {"close_vwap_div_threshold": "0.3", "crv": "1"}
+# metrics where more is better, the others are costs
+THROUGHPUTS = ("bars_per_second", "on_data_bars_per_second")
+
+
+class TimedAron20(Aron20):
+    def initialize(self):
+        self.on_data_seconds = 0.0
+        super().initialize()
+
+    def on_data(self, data):
+        started = perf_counter()
+        super().on_data(data)
+        self.on_data_seconds += perf_counter() - started
+
+
+def load_bars(args):
+    tickers = get_tickers_list_as_string()
+    if args.source is None:
+        # one extra day in front serves the warm up history
+        bars = random_walk_minute_bars(tickers, args.days + 1, seed=args.seed)
+        return bars, bars.dates[1].astype(object)
+    start = date.fromisoformat(args.start)
+    bars = load_minute_bars(
+        args.source, tickers, start - timedelta(days=7), start + timedelta(args.days)
+    )
+    return bars, start
+
+
+def measure(bars, start, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        result = LocalBacktest(TimedAron20, bars, PARAMETERS, start).run()
+        timings.append(
+            (
+                result.run_seconds,
+                result.initialize_seconds,
+                result.algorithm.on_data_seconds,
+                result.bars,
+                result.time_steps,
+            )
+        )
+    run_seconds, initialize_seconds, on_data_seconds, n_bars, time_steps = min(timings)
+    n_symbols = len(result.algorithm.symbols)
+
+    # separate pass, tracing allocations slows everything down
+    tracemalloc.start()
+    backtest = LocalBacktest(Aron20, bars, PARAMETERS, start)
+    before = tracemalloc.get_traced_memory()[0]
+    backtest.run()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "symbols": n_symbols,
+        "time_steps": time_steps,
+        "bars": n_bars,
+        "initialize_seconds": initialize_seconds,
+        "run_seconds": run_seconds,
+        "bars_per_second": n_bars / run_seconds,
+        "on_data_bars_per_second": n_bars / on_data_seconds,
+        "retained_bytes_per_symbol": (retained - before) / n_symbols,
+        "peak_bytes_per_symbol": (peak - before) / n_symbols,
+    }
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    failed = []
+    for name, value in results.items():
+        reference = baseline.get(name)
+        if not reference or name in ("symbols", "time_steps", "bars"):
+            continue
+        if name in THROUGHPUTS:
+            change = 1 - value / reference
+        else:
+            change = value / reference - 1
+        if change > tolerance:
+            failed.append(f"{name}: {value:,.2f} against {reference:,.2f}")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--days", type=int, default=5, help="backtest days")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--source", help="bar store or LEAN data folder")
+    parser.add_argument("--start", help="first backtest day with --source")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", help="write the results to this json file")
+    parser.add_argument("--compare", help="json file of earlier results")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    if args.source is not None and args.start is None:
+        parser.error("--source needs --start")
+
+    bars, start = load_bars(args)
+    results = measure(bars, start, args.repeat)
+    print(
+        f"{results['symbols']} symbols, {results['time_steps']} time steps, "
+        f"{results['bars']} bars\n"
+        f"initialize        {results['initialize_seconds']:10.3f} s\n"
+        f"time loop         {results['bars_per_second']:10,.0f} bars/s\n"
+        f"on_data           {results['on_data_bars_per_second']:10,.0f} bars/s\n"
+        f"retained memory   {results['retained_bytes_per_symbol'] / 1024:10,.1f} "
+        f"KiB/symbol\n"
+        f"peak memory       {results['peak_bytes_per_symbol'] / 1024:10,.1f} KiB/symbol"
+    )
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            failed = regressions(results, json.load(file), args.tolerance)
+        for line in failed:
+            print(f"regression {line}")
+        if failed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Per minute bar cost of the Python indicators of one symbol: LEAN's scanning
+WILR(180) against the sliding one, and the consolidation pipeline with 5 and 15
+minute indicators added on top of the minute ones.
+
+    python benchmarks/bench_consolidation.py [--days 5]
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+from time import perf_counter
+
+SOURCE_FOLDER = os.path.join(os.path.dirname(__file__), "..", "src")
+sys.path.insert(0, os.path.join(SOURCE_FOLDER, "aron20"))
+sys.path.insert(1, os.path.join(SOURCE_FOLDER, "lean_local"))
+
+from AlgorithmImports import ExponentialMovingAverage, TradeBar, WilliamsPercentR
+from backtest import random_walk_minute_bars
+from consolidation_pipeline import ConsolidationPipeline
+from fibonacci_retracement import FibonacciRetracementIndicator
+from williams_percent_r import SlidingWilliamsPercentR
+
+
+def trade_bars(n_days: int) -> list:
+    bars = random_walk_minute_bars(["SYM0"], n_days)
+    result = []
+    for bar in range(bars.n_bars):
+        session = bars.dates[bars.day[bar]].astype(object)
+        start = datetime(session.year, session.month, session.day) + timedelta(
+            minutes=int(bars.minute[bar])
+        )
+        result.append(
+            TradeBar(
+                start,
+                "SYM0",
+                *(
+                    float(getattr(bars, field)[0, bar])
+                    for field in ("open", "high", "low", "close", "volume")
+                ),
+            )
+        )
+    return result
+
+
+def pipeline(timeframes=()):
+    stage = ConsolidationPipeline("pipeline")
+    stage.add(SlidingWilliamsPercentR("WILR", 180))
+    stage.add(FibonacciRetracementIndicator("Fibo"))
+    for minutes in timeframes:
+        stage.add(SlidingWilliamsPercentR(f"WILR-{minutes}", 180 // minutes), minutes)
+        stage.add(ExponentialMovingAverage(f"EMA9-{minutes}", 9), minutes)
+    return [stage]
+
+
+def per_bar(indicators: list, bars: list) -> float:
+    started = perf_counter()
+    for bar in bars:
+        for indicator in indicators:
+            indicator.update(bar)
+    return (perf_counter() - started) / len(bars) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bars = trade_bars(args.days)
+    cases = {
+        "scanning WILR(180)": lambda: [WilliamsPercentR("WILR", 180)],
+        "sliding WILR(180)": lambda: [SlidingWilliamsPercentR("WILR", 180)],
+        "WILR + Fibonacci, registered": lambda: [
+            SlidingWilliamsPercentR("WILR", 180),
+            FibonacciRetracementIndicator("Fibo"),
+        ],
+        "pipeline": pipeline,
+        "pipeline + 5/15 minutes": lambda: pipeline((5, 15)),
+    }
+    print(f"{len(bars)} minute bars")
+    print(f"{'case':<32} {'[us/bar]':>9}")
+    for name, make in cases.items():
+        microseconds = min(per_bar(make(), bars) for _ in range(args.repeat))
+        print(f"{name:<32} {microseconds:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
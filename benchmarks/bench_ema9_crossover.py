@@ -0,0 +1,105 @@
+"""
+Cost of one previous_minutes_close_over_ema9 lookup: the original scan over the
+RollingWindows, the ring buffer scan of the first SymbolStateStore and the
+incremental tracker that replaced both.
+
+    python benchmarks/bench_ema9_crossover.py
+"""
+
+import os
+import sys
+import tracemalloc
+from timeit import repeat
+
+import numpy as np
+
+SOURCE_FOLDER = os.path.join(os.path.dirname(__file__), "..", "src")
+sys.path.insert(0, os.path.join(SOURCE_FOLDER, "aron20"))
+sys.path.insert(1, os.path.join(SOURCE_FOLDER, "lean_local"))
+
+from AlgorithmImports import RollingWindow
+from symbol_state import SymbolStateStore
+
+WINDOW_SIZE = 10
+N_SYMBOLS = 33
+
+
+def rolling_window_lookup(closes, ema9s):
+    close_window = RollingWindow[float](WINDOW_SIZE)
+    ema9_window = RollingWindow[float](WINDOW_SIZE)
+    for close, ema9 in zip(closes, ema9s):
+        close_window.add(close)
+        ema9_window.add(ema9)
+
+    def lookup():
+        for close, ema9 in zip(list(close_window)[1:], list(ema9_window)[1:]):
+            if close > ema9:
+                return close
+        return False
+
+    return lookup
+
+
+def ring_buffer_lookup(closes, ema9s):
+    close_window = np.zeros((N_SYMBOLS, WINDOW_SIZE))
+    ema9_window = np.zeros((N_SYMBOLS, WINDOW_SIZE))
+    close_window[0, : len(closes)] = closes
+    ema9_window[0, : len(ema9s)] = ema9s
+    head, count = len(closes) - 1, min(len(closes), WINDOW_SIZE)
+
+    def lookup():
+        slots = ((head - np.arange(count)) % WINDOW_SIZE)[1:]
+        window_closes = close_window[0, slots]
+        over = np.nonzero(window_closes > ema9_window[0, slots])[0]
+        if over.size:
+            return float(window_closes[over[0]])
+        return False
+
+    return lookup
+
+
+def tracker_lookup(closes, ema9s):
+    state = SymbolStateStore(range(N_SYMBOLS), window_size=WINDOW_SIZE)
+    for close, ema9 in zip(closes, ema9s):
+        state.update_ema9_tracker([0], [close], [ema9])
+    return lambda: state.previous_close_over_ema9(0)
+
+
+def per_call(lookup, number=20000):
+    microseconds = min(repeat(lookup, number=number, repeat=5)) / number * 1e6
+    lookup()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    lookup()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return microseconds, peak - before
+
+
+def main():
+    # the worst case scans the whole window, the best case stops at the last bar
+    cases = {
+        "no close over EMA9": ([100.0] * WINDOW_SIZE, [101.0] * WINDOW_SIZE),
+        "last bar over EMA9": (
+            [100.0] * (WINDOW_SIZE - 2) + [102.0, 100.0],
+            [101.0] * WINDOW_SIZE,
+        ),
+    }
+    lookups = {
+        "rolling windows": rolling_window_lookup,
+        "ring buffer scan": ring_buffer_lookup,
+        "tracker": tracker_lookup,
+    }
+    print(f"{'case':<20} {'lookup':<18} {'[us/call]':>10} {'[bytes/call]':>13}")
+    for case, (closes, ema9s) in cases.items():
+        results = []
+        for name, make_lookup in lookups.items():
+            lookup = make_lookup(closes, ema9s)
+            results.append(lookup())
+            microseconds, allocated = per_call(lookup)
+            print(f"{case:<20} {name:<18} {microseconds:>10.2f} {allocated:>13}")
+        assert len(set(results)) == 1, results
+
+
+if __name__ == "__main__":
+    main()
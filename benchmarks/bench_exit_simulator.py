@@ -0,0 +1,76 @@
+"""
+Exit resolution of random bracket entries: the vectorized first crossing search
+against walking each entry bar by bar.
+
+    python benchmarks/bench_exit_simulator.py [--entries 10000] [--days 20]
+"""
+
+import argparse
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+SOURCE_FOLDER = os.path.join(os.path.dirname(__file__), "..", "src")
+sys.path.insert(0, os.path.join(SOURCE_FOLDER, "aron20"))
+sys.path.insert(1, os.path.join(SOURCE_FOLDER, "lean_local"))
+
+from backtest import random_walk_minute_bars
+from exit_simulator import liquidation_bars, simulate_exits
+
+
+def walk(bars, flatten, symbol, entry_bar, side, take_profit, stop_loss) -> None:
+    for entry in range(len(entry_bar)):
+        row = symbol[entry]
+        last = max(flatten[bars.day[entry_bar[entry]]], entry_bar[entry])
+        window = slice(entry_bar[entry] + 1, last + 1)
+        if side[entry] == 1:
+            hits = (bars.high[row, window] > take_profit[entry]) | (
+                bars.low[row, window] < stop_loss[entry]
+            )
+        else:
+            hits = (bars.low[row, window] < take_profit[entry]) | (
+                bars.high[row, window] > stop_loss[entry]
+            )
+        np.argmax(hits) if hits.any() else last
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--symbols", type=int, default=33)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    bars = random_walk_minute_bars(
+        [f"SYM{index}" for index in range(args.symbols)], args.days
+    )
+    rng = np.random.default_rng(1)
+    symbol = rng.integers(0, args.symbols, args.entries)
+    entry_bar = rng.integers(0, bars.n_bars, args.entries)
+    side = rng.choice([-1, 1], args.entries)
+    price = bars.close[symbol, entry_bar]
+    take_profit = price * (1 + side * rng.uniform(0.002, 0.02, args.entries))
+    stop_loss = price * (1 - side * rng.uniform(0.002, 0.02, args.entries))
+    flatten = liquidation_bars(bars)
+    arguments = (symbol, entry_bar, side, take_profit, stop_loss)
+
+    cases = {
+        "vectorized": lambda: simulate_exits(bars, *arguments, flatten),
+        "bar by bar": lambda: walk(bars, flatten, *arguments),
+    }
+    print(f"{args.entries} entries on {bars.n_bars} minute bars")
+    print(f"{'case':<12} {'[ms]':>9} {'[us/entry]':>11}")
+    for name, run in cases.items():
+        seconds = float("inf")
+        for _ in range(args.repeat):
+            started = perf_counter()
+            run()
+            seconds = min(seconds, perf_counter() - started)
+        print(f"{name:<12} {seconds * 1e3:>9.1f} {seconds / args.entries * 1e6:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Per-bar cost of Aron20's per-symbol state bookkeeping: the former dict-of-windows
+layout against the SymbolStateStore struct of arrays.
+
+    python benchmarks/bench_symbol_state.py
+"""
+
+import os
+import sys
+from collections import deque
+from timeit import repeat
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "aron20"))
+
+from symbol_state import SymbolStateStore
+
+SYMBOL_COUNTS = (33, 500, 3000)
+WINDOW_SIZE = 10
+
+
+def dict_layout(symbols):
+    close_window = {symbol: deque(maxlen=WINDOW_SIZE) for symbol in symbols}
+    ema9_window = {symbol: deque(maxlen=WINDOW_SIZE) for symbol in symbols}
+    previous_minute_close = {}
+    previous_minute_high = {}
+    previous_minute_low = {}
+    traded_today = {}
+
+    def update(closes, highs, lows, ema9s):
+        for symbol, close, high, low, ema9 in zip(symbols, closes, highs, lows, ema9s):
+            if symbol in traded_today:
+                continue
+            close_window[symbol].appendleft(close)
+            ema9_window[symbol].appendleft(ema9)
+            previous_minute_close[symbol] = close
+            previous_minute_high[symbol] = high
+            previous_minute_low[symbol] = low
+
+    return update
+
+
+def store_layout(symbols):
+    state = SymbolStateStore(symbols, window_size=WINDOW_SIZE)
+
+    def update(closes, highs, lows, ema9s):
+        indices = np.flatnonzero(~state.traded_today)
+        state.update_ema9_tracker(indices, closes[indices], ema9s[indices])
+        state.update_previous_minute_values(
+            indices, closes[indices], highs[indices], lows[indices]
+        )
+
+    return update
+
+
+def per_bar_microseconds(update, bars, number=200):
+    closes, highs, lows, ema9s = bars
+    timings = repeat(
+        lambda: update(closes, highs, lows, ema9s), number=number, repeat=5
+    )
+    return min(timings) / number * 1e6
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(
+        f"{'symbols':>8} {'dicts [us/bar]':>15} {'store [us/bar]':>15} {'speedup':>8}"
+    )
+    for n_symbols in SYMBOL_COUNTS:
+        symbols = [f"SYM{index}" for index in range(n_symbols)]
+        closes = rng.uniform(10, 500, n_symbols)
+        bars = (closes, closes * 1.001, closes * 0.999, closes * 1.0005)
+        as_lists = tuple(values.tolist() for values in bars)
+        dicts = per_bar_microseconds(dict_layout(symbols), as_lists)
+        store = per_bar_microseconds(store_layout(symbols), bars)
+        print(f"{n_symbols:>8} {dicts:>15.1f} {store:>15.1f} {dicts / store:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
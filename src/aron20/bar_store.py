@@ -0,0 +1,330 @@
+"""
+Local minute bar cache in a memory-mapped columnar layout.
+
+A store is a directory holding generations of .npy files and a CURRENT file naming
+the one to read:
+
+    CURRENT                     name of the current generation directory
+    generation-<n>/
+        symbols.json            symbol names, the position is the symbol id
+        index.npy               one row per symbol-day: symbol, date, start, stop
+        time.npy                int64 bar start, minutes since the epoch, exchange time
+        open/high/low/close.npy float32
+        volume.npy              int64
+
+Rows are sorted by symbol and time, so the bars of a symbol over any time range are
+one contiguous slice of every column and can be read without copying.
+
+A writer fills a new generation and then replaces CURRENT, so readers see either
+the old or the new store, never a mix of both. The previous generation is kept for
+readers that opened it just before the swap, older ones are removed.
+"""
+
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import date, datetime
+
+import numpy as np
+
+from minute_bars import (
+    MARKET_CLOSE_MINUTE,
+    MARKET_OPEN_MINUTE,
+    MINUTES_PER_DAY,
+    MinuteBars,
+    lean_minute_trade_path,
+    load_lean_minute_bars,
+    read_lean_minute_trade_file,
+)
+
+COLUMNS = {
+    "time": np.int64,
+    "open": np.float32,
+    "high": np.float32,
+    "low": np.float32,
+    "close": np.float32,
+    "volume": np.int64,
+}
+CURRENT = "CURRENT"
+_GENERATION_PREFIX = "generation-"
+INDEX_DTYPE = np.dtype(
+    [
+        ("symbol", np.int32),
+        ("date", "datetime64[D]"),
+        ("start", np.int64),
+        ("stop", np.int64),
+    ]
+)
+
+
+@dataclass
+class BarSlice:
+    """Column views of one symbol's bars, backed by the store's memory maps"""
+
+    time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self):
+        return self.time.shape[0]
+
+
+def to_epoch_minutes(value, end: bool = False) -> int:
+    """
+    Minutes since the epoch of a date or datetime. A date used as `end` stands for
+    the whole day, so it maps to the first minute of the next day.
+    """
+    if isinstance(value, datetime):
+        return int(np.datetime64(value, "m").astype(np.int64))
+    days = int(np.datetime64(value, "D").astype(np.int64))
+    return (days + 1 if end else days) * MINUTES_PER_DAY
+
+
+def current_generation(path: str):
+    """Name of the generation directory CURRENT points to, None for no store"""
+    try:
+        with open(os.path.join(path, CURRENT)) as file:
+            return file.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+class BarStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.generation = current_generation(path)
+        if self.generation is None:
+            raise FileNotFoundError(f"no bar store in {path}")
+        folder = os.path.join(path, self.generation)
+        with open(os.path.join(folder, "symbols.json")) as file:
+            self.symbols = json.load(file)
+        self.symbol_ids = {symbol: index for index, symbol in enumerate(self.symbols)}
+        self.index = np.load(os.path.join(folder, "index.npy"))
+        self.columns = {
+            name: np.load(os.path.join(folder, f"{name}.npy"), mmap_mode="r")
+            for name in COLUMNS
+        }
+        # first and last row of every symbol
+        ids = np.arange(len(self.symbols))
+        first = np.searchsorted(self.index["symbol"], ids, side="left")
+        last = np.searchsorted(self.index["symbol"], ids, side="right")
+        self.symbol_rows = np.zeros((len(self.symbols), 2), dtype=np.int64)
+        has_rows = last > first
+        self.symbol_rows[has_rows, 0] = self.index["start"][first[has_rows]]
+        self.symbol_rows[has_rows, 1] = self.index["stop"][last[has_rows] - 1]
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, CURRENT))
+
+    def __len__(self):
+        return self.columns["time"].shape[0]
+
+    def dates(self, symbol=None) -> np.ndarray:
+        index = self.index
+        if symbol is not None:
+            index = index[index["symbol"] == self.symbol_ids[symbol]]
+        return np.unique(index["date"])
+
+    def row_range(self, symbol: str, start=None, end=None):
+        """
+        Rows of `symbol` from `start` up to `end`. Dates include the whole day,
+        datetimes are bar start times with `end` exclusive.
+        """
+        begin, stop = self.symbol_rows[self.symbol_ids[symbol]]
+        time = self.columns["time"]
+        if start is not None:
+            begin += np.searchsorted(time[begin:stop], to_epoch_minutes(start))
+        if end is not None:
+            stop = begin + np.searchsorted(
+                time[begin:stop], to_epoch_minutes(end, end=True)
+            )
+        return int(begin), int(stop)
+
+    def slice(self, symbol: str, start=None, end=None) -> BarSlice:
+        begin, stop = self.row_range(symbol, start, end)
+        return BarSlice(
+            **{name: column[begin:stop] for name, column in self.columns.items()}
+        )
+
+    def to_minute_bars(self, symbols=None, start=None, end=None) -> MinuteBars:
+        """Align the stored bars of `symbols` on one MinuteBars timeline"""
+        if symbols is None:
+            symbols = self.symbols
+        symbols = [symbol for symbol in symbols if symbol in self.symbol_ids]
+        slices = [self.slice(symbol, start, end) for symbol in symbols]
+        slices_with_bars = [bars for bars in slices if len(bars)]
+        # union of the bar times as a bitmap over the covered minutes, cheaper than
+        # sorting all rows
+        first = min((bars.time[0] for bars in slices_with_bars), default=0)
+        last = max((bars.time[-1] for bars in slices_with_bars), default=-1)
+        traded = np.zeros(last - first + 1, dtype=bool)
+        for bars in slices_with_bars:
+            traded[bars.time - first] = True
+        times = np.flatnonzero(traded) + first
+        column_of = np.cumsum(traded) - 1
+
+        panel = np.full((5, len(symbols), len(times)), np.nan)
+        for symbol_index, bars in enumerate(slices):
+            columns = column_of[bars.time - first]
+            for row, name in enumerate(("open", "high", "low", "close", "volume")):
+                panel[row, symbol_index, columns] = getattr(bars, name)
+        return MinuteBars.from_timeline(symbols, times, panel)
+
+
+class BarStoreWriter:
+    """
+    Collects minute bars per symbol-day and writes them as a BarStore on `close`.
+    Symbol-days already in the store at `path` are kept unless they were re-added.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # (symbol, date) -> (n, 6) array of minute of day, open, high, low, close, volume
+        self.chunks = {}
+
+    def add(self, symbol: str, day: date, rows: np.ndarray) -> None:
+        rows = np.asarray(rows, dtype=np.float64)
+        if len(rows):
+            self.chunks[(symbol, np.datetime64(day, "D"))] = rows[
+                np.argsort(rows[:, 0], kind="stable")
+            ]
+
+    def close(self) -> BarStore:
+        symbols = sorted({symbol for symbol, _ in self.chunks})
+        existing = BarStore(self.path) if BarStore.exists(self.path) else None
+        if existing is not None:
+            symbols = sorted(set(symbols) | set(existing.symbols))
+        symbol_ids = {symbol: index for index, symbol in enumerate(symbols)}
+
+        # (symbol id, date) -> column arrays
+        days = {}
+        if existing is not None:
+            for entry in existing.index:
+                symbol = existing.symbols[entry["symbol"]]
+                if (symbol, entry["date"]) in self.chunks:
+                    continue
+                rows = slice(entry["start"], entry["stop"])
+                days[(symbol_ids[symbol], entry["date"])] = {
+                    name: np.array(column[rows])
+                    for name, column in existing.columns.items()
+                }
+        for (symbol, day), rows in self.chunks.items():
+            minutes = day.astype(np.int64) * MINUTES_PER_DAY + rows[:, 0]
+            days[(symbol_ids[symbol], day)] = {
+                "time": minutes.astype(np.int64),
+                "open": rows[:, 1],
+                "high": rows[:, 2],
+                "low": rows[:, 3],
+                "close": rows[:, 4],
+                "volume": rows[:, 5],
+            }
+
+        keys = sorted(days)
+        index = np.zeros(len(keys), dtype=INDEX_DTYPE)
+        lengths = np.array([len(days[key]["time"]) for key in keys], dtype=np.int64)
+        stops = np.cumsum(lengths)
+        index["symbol"] = [symbol_id for symbol_id, _ in keys]
+        index["date"] = [day for _, day in keys]
+        index["start"] = stops - lengths
+        index["stop"] = stops
+        n_rows = int(stops[-1]) if len(stops) else 0
+
+        previous = existing.generation if existing is not None else None
+        del existing
+        os.makedirs(self.path, exist_ok=True)
+        generations = _generations(self.path)
+        generation = f"{_GENERATION_PREFIX}{max(generations, default=0) + 1:06d}"
+        folder = os.path.join(self.path, generation)
+        os.makedirs(folder)
+        for name, dtype in COLUMNS.items():
+            column = np.lib.format.open_memmap(
+                os.path.join(folder, f"{name}.npy"),
+                mode="w+",
+                dtype=dtype,
+                shape=(n_rows,),
+            )
+            for key, start, stop in zip(keys, index["start"], index["stop"]):
+                column[start:stop] = days[key][name]
+            column.flush()
+            del column
+        np.save(os.path.join(folder, "index.npy"), index)
+        with open(os.path.join(folder, "symbols.json"), "w") as file:
+            json.dump(symbols, file)
+
+        # the swap, readers opening the store from now on get the new generation
+        temporary = os.path.join(self.path, f".{CURRENT}.{os.getpid()}")
+        with open(temporary, "w") as file:
+            file.write(generation)
+        os.replace(temporary, os.path.join(self.path, CURRENT))
+        for name in generations.values():
+            if name != previous:
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+        self.chunks = {}
+        return BarStore(self.path)
+
+
+def _generations(path: str) -> dict:
+    """Generation number -> directory name of the generations under `path`"""
+    return {
+        int(entry.name[len(_GENERATION_PREFIX) :]): entry.name
+        for entry in os.scandir(path)
+        if entry.is_dir()
+        and entry.name.startswith(_GENERATION_PREFIX)
+        and entry.name[len(_GENERATION_PREFIX) :].isdigit()
+    }
+
+
+def import_lean_minute_data(
+    data_folder: str, path: str, tickers: list, start: date, end: date
+) -> BarStore:
+    """Copy regular-session minute bars from a LEAN data folder into a BarStore"""
+    writer = BarStoreWriter(path)
+    for day in np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1).astype(
+        object
+    ):
+        for ticker in tickers:
+            lean_path = lean_minute_trade_path(data_folder, ticker, day)
+            if not os.path.exists(lean_path):
+                continue
+            rows = read_lean_minute_trade_file(lean_path)
+            in_session = (rows[:, 0] >= MARKET_OPEN_MINUTE) & (
+                rows[:, 0] < MARKET_CLOSE_MINUTE
+            )
+            writer.add(ticker, day, rows[in_session])
+    return writer.close()
+
+
+def load_minute_bars(source: str, tickers: list, start: date, end: date):
+    """MinuteBars from a BarStore directory, or else from a LEAN data folder"""
+    if BarStore.exists(source):
+        return BarStore(source).to_minute_bars(tickers, start, end)
+    return load_lean_minute_bars(source, tickers, start, end)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from tickers import get_tickers_list_as_string
+
+    parser = argparse.ArgumentParser(
+        description="Import LEAN minute data into a bar store"
+    )
+    parser.add_argument("data_folder", help="LEAN data folder")
+    parser.add_argument("path", help="bar store directory")
+    parser.add_argument("start", type=date.fromisoformat)
+    parser.add_argument("end", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    store = import_lean_minute_data(
+        args.data_folder,
+        args.path,
+        get_tickers_list_as_string(),
+        args.start,
+        args.end,
+    )
+    print(f"{len(store)} bars of {len(store.symbols)} symbols in {args.path}")
@@ -0,0 +1,315 @@
+from time import perf_counter
+
+import numpy as np
+
+from AlgorithmImports import *
+
+# order prices are rounded to the tick, a cent, when they are submitted
+PRICE_TOLERANCE = 0.005 + 1e-9
+
+
+class BracketLeg:
+    """One order of a bracket and what the broker reported for it"""
+
+    ENTRY = 0
+    TAKE_PROFIT = 1
+    STOP_LOSS = 2
+    KINDS = ("entry", "take_profit", "stop_loss")
+
+    __slots__ = (
+        "bracket",
+        "kind",
+        "order_id",
+        "ticket",
+        "quantity_filled",
+        "closed",
+        "submitted_at",
+    )
+
+    def __init__(self, bracket, kind: int):
+        self.bracket = bracket
+        self.kind = kind
+        self.order_id = None
+        self.ticket = None
+        self.quantity_filled = 0
+        self.closed = False
+        # perf_counter() when the order was handed to the broker, until acked
+        self.submitted_at = None
+
+
+class Bracket:
+    """An entry market order with its take profit limit and stop loss market order"""
+
+    __slots__ = ("symbol", "quantity", "take_profit", "stop_loss", "legs", "position")
+
+    def __init__(self, symbol, quantity: int, take_profit: float, stop_loss: float):
+        self.symbol = symbol
+        self.quantity = quantity
+        self.take_profit = take_profit
+        self.stop_loss = stop_loss
+        self.legs = (
+            BracketLeg(self, BracketLeg.ENTRY),
+            BracketLeg(self, BracketLeg.TAKE_PROFIT),
+            BracketLeg(self, BracketLeg.STOP_LOSS),
+        )
+        # net quantity the bracket's fills hold
+        self.position = 0
+
+    @property
+    def entry(self) -> BracketLeg:
+        return self.legs[BracketLeg.ENTRY]
+
+    @property
+    def exits(self) -> tuple:
+        return self.legs[BracketLeg.TAKE_PROFIT :]
+
+    @property
+    def closed(self) -> bool:
+        return all(leg.closed for leg in self.legs)
+
+
+class BracketOrderManager:
+    """
+    Submits entries together with their take profit and stop loss and keeps the
+    legs one cancels the other.
+
+    The three orders go out in one batch, the entry asynchronously, so the exits
+    are working from the start instead of after the entry fill came back. They are
+    sized for the full entry and resized to the position on every partial fill of
+    the entry or of an exit, so an exit never sells more than was bought. Legs are indexed by order
+    id for O(1) lookups from `on_order_event` and dropped once the whole bracket
+    is closed.
+
+    Broker events can arrive before the submitting call returned the ticket, as
+    in backtests where market orders fill synchronously. An event for an unknown
+    order id during a submission belongs to the leg being submitted.
+
+    A sibling can fill while its cancel is still pending. The position then went
+    past flat and is closed with a market order, counted in `races`.
+
+    The time from handing a leg to the broker to its first event is recorded per
+    leg kind, see `latency_report`.
+    """
+
+    def __init__(self, algorithm: QCAlgorithm):
+        self.algorithm = algorithm
+        # order id -> BracketLeg of the open brackets
+        self.legs = {}
+        self.races = 0
+        # per leg kind: acknowledged legs, total and worst submit-to-ack seconds
+        self.acks = [0] * len(BracketLeg.KINDS)
+        self.ack_seconds = [0.0] * len(BracketLeg.KINDS)
+        self.max_ack_seconds = [0.0] * len(BracketLeg.KINDS)
+        self._submitting = None
+
+    def submit(
+        self, symbol, quantity: int, take_profit: float, stop_loss: float
+    ) -> Bracket:
+        algorithm = self.algorithm
+        bracket = Bracket(symbol, quantity, take_profit, stop_loss)
+        entry, take_profit_leg, stop_loss_leg = bracket.legs
+        self._submit(
+            entry, lambda: algorithm.market_order(symbol, quantity, asynchronous=True)
+        )
+        self._submit(
+            take_profit_leg,
+            lambda: algorithm.limit_order(symbol, -quantity, take_profit),
+        )
+        self._submit(
+            stop_loss_leg,
+            lambda: algorithm.stop_market_order(symbol, -quantity, stop_loss),
+        )
+        self._settle(bracket)
+        return bracket
+
+    def _submit(self, leg: BracketLeg, place) -> None:
+        leg.submitted_at = perf_counter()
+        self._submitting = leg
+        try:
+            ticket = place()
+        finally:
+            self._submitting = None
+        leg.ticket = ticket
+        if leg.order_id is None:
+            leg.order_id = ticket.order_id
+            self.legs[leg.order_id] = leg
+
+    def on_order_event(self, order_event: OrderEvent):
+        """Update the bracket of the order, returns its leg or None"""
+        leg = self.legs.get(order_event.order_id)
+        if leg is None:
+            leg = self._submitting
+            if leg is None or leg.order_id is not None:
+                return None
+            leg.order_id = order_event.order_id
+            self.legs[leg.order_id] = leg
+
+        if leg.submitted_at is not None:
+            self._record_ack(leg)
+        status = order_event.status
+        if status in (OrderStatus.FILLED, OrderStatus.PARTIALLY_FILLED):
+            leg.quantity_filled += order_event.fill_quantity
+            leg.bracket.position += order_event.fill_quantity
+        if status in OrderStatus.CLOSED:
+            leg.closed = True
+        if status in (OrderStatus.FILLED, OrderStatus.PARTIALLY_FILLED) or (
+            leg.closed and leg.kind == BracketLeg.ENTRY
+        ):
+            # while a bracket is submitted its remaining legs are not placed yet
+            submitting = self._submitting
+            if submitting is None or submitting.bracket is not leg.bracket:
+                self._settle(leg.bracket)
+        if leg.bracket.closed:
+            self._forget(leg.bracket)
+        return leg
+
+    def _settle(self, bracket: Bracket) -> None:
+        """Bring the open legs in line with the bracket's position"""
+        entry = bracket.entry
+        exited = any(leg.quantity_filled for leg in bracket.exits)
+        if exited and not entry.closed:
+            # the trade is over, don't add to it anymore
+            self._cancel(entry)
+        position = bracket.position
+        if position == 0 and not entry.closed and not exited:
+            # nothing filled yet, the exits stay sized for the full entry
+            return
+
+        if position == 0:
+            for leg in bracket.exits:
+                self._cancel(leg)
+        elif (position > 0) == (bracket.quantity > 0):
+            for leg in bracket.exits:
+                # the order quantity includes what the leg already filled
+                quantity = leg.quantity_filled - position
+                if not leg.closed and leg.ticket.quantity != quantity:
+                    leg.ticket.update_quantity(quantity)
+        else:
+            # both exits filled, close what the second one opened
+            self.races += 1
+            for leg in bracket.exits:
+                self._cancel(leg)
+            bracket.position = 0
+            self.algorithm.market_order(
+                bracket.symbol, -position, tag="Bracket overfill"
+            )
+        if bracket.closed:
+            self._forget(bracket)
+
+    def snapshot(self) -> dict:
+        """
+        Symbol, quantity and exit prices of the open brackets for a checkpoint.
+        Order ids are not saved, the broker's orders get new ones on a restart.
+        """
+        brackets = list(
+            {id(leg.bracket): leg.bracket for leg in self.legs.values()}.values()
+        )
+        return {
+            "symbol": np.array(
+                [str(bracket.symbol) for bracket in brackets], dtype=str
+            ),
+            "quantity": np.array(
+                [bracket.quantity for bracket in brackets], dtype=np.int64
+            ),
+            "take_profit": np.array(
+                [bracket.take_profit for bracket in brackets], dtype=np.float64
+            ),
+            "stop_loss": np.array(
+                [bracket.stop_loss for bracket in brackets], dtype=np.float64
+            ),
+        }
+
+    def restore(self, arrays: dict) -> int:
+        """
+        Rebuild the open brackets of a snapshot from the broker's open orders and
+        holdings, which also know the fills since the checkpoint. Call it once they
+        are loaded, i.e. not before the first data. The legs are matched by symbol,
+        side, order type and price. Returns the number of brackets.
+        """
+        transactions = self.algorithm.transactions
+        open_orders = {}
+        for order in transactions.get_open_orders():
+            open_orders.setdefault(str(order.symbol), []).append(order)
+        restored = 0
+        for symbol, quantity, take_profit, stop_loss in zip(
+            arrays["symbol"].tolist(),
+            arrays["quantity"].tolist(),
+            arrays["take_profit"].tolist(),
+            arrays["stop_loss"].tolist(),
+        ):
+            candidates = open_orders.get(symbol, [])
+            side = 1 if quantity > 0 else -1
+            orders = [
+                _take_order(
+                    candidates, lambda order: order.type == OrderType.MARKET, side
+                ),
+                _take_order(
+                    candidates,
+                    lambda order: order.type == OrderType.LIMIT
+                    and abs(order.limit_price - take_profit) <= PRICE_TOLERANCE,
+                    -side,
+                ),
+                _take_order(
+                    candidates,
+                    lambda order: order.type == OrderType.STOP_MARKET
+                    and abs(order.stop_price - stop_loss) <= PRICE_TOLERANCE,
+                    -side,
+                ),
+            ]
+            known = [order for order in orders if order is not None]
+            if not known:
+                # the bracket ended while the algorithm was down
+                continue
+            bracket = Bracket(known[0].symbol, quantity, take_profit, stop_loss)
+            bracket.position = self.algorithm.portfolio[bracket.symbol].quantity
+            for leg, order in zip(bracket.legs, orders):
+                if order is None:
+                    leg.closed = True
+                    continue
+                leg.ticket = transactions.get_order_ticket(order.id)
+                leg.order_id = order.id
+                leg.quantity_filled = leg.ticket.quantity_filled
+                self.legs[leg.order_id] = leg
+            # whatever the exits didn't sell came from the entry
+            bracket.entry.quantity_filled = bracket.position - sum(
+                leg.quantity_filled for leg in bracket.exits
+            )
+            restored += 1
+            self._settle(bracket)
+        return restored
+
+    @staticmethod
+    def _cancel(leg: BracketLeg) -> None:
+        if not leg.closed and leg.ticket is not None:
+            leg.ticket.cancel()
+
+    def _forget(self, bracket: Bracket) -> None:
+        for leg in bracket.legs:
+            self.legs.pop(leg.order_id, None)
+
+    def _record_ack(self, leg: BracketLeg) -> None:
+        seconds = perf_counter() - leg.submitted_at
+        leg.submitted_at = None
+        self.acks[leg.kind] += 1
+        self.ack_seconds[leg.kind] += seconds
+        self.max_ack_seconds[leg.kind] = max(self.max_ack_seconds[leg.kind], seconds)
+
+    def latency_report(self) -> list:
+        lines = []
+        for kind, name in enumerate(BracketLeg.KINDS):
+            acks = self.acks[kind]
+            mean = self.ack_seconds[kind] / acks * 1e3 if acks else 0.0
+            lines.append(
+                f"{name} submit to ack: {acks} orders, {mean:.2f}ms mean, "
+                f"{self.max_ack_seconds[kind] * 1e3:.2f}ms max"
+            )
+        lines.append(f"cancel races closed with a market order: {self.races}")
+        return lines
+
+
+def _take_order(orders: list, matches, side: int):
+    """Remove and return the first order on `side` that `matches`, or None"""
+    for index, order in enumerate(orders):
+        if (order.quantity > 0) == (side > 0) and matches(order):
+            return orders.pop(index)
+    return None
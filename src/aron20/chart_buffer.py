@@ -0,0 +1,114 @@
+import numpy as np
+
+
+class ChartBuffer:
+    """
+    Collects the per-symbol trade chart points in preallocated arrays and hands them
+    to `sink` in batches instead of plotting every point as it happens.
+
+    A point is kept if `every_n_minutes` passed since the symbol's last kept point
+    or, with `on_level_change`, if one of the Fibonacci levels moved. Buffers are
+    flushed when full and whenever `flush` is called, e.g. at the end of the day.
+
+    `sink(index, series, times, values)` receives one symbol's points of one series,
+    values are (n, 4) open, high, low, close for "Price" and (n,) otherwise.
+    """
+
+    PRICE = "Price"
+    LINE_SERIES = (
+        "VWAP",
+        "EMA9",
+        "FIBO-100",
+        "FIBO-618",
+        "FIBO-50",
+        "FIBO-382",
+        "FIBO-0",
+    )
+    # columns of LINE_SERIES the level change decimation looks at
+    LEVEL_COLUMNS = slice(2, len(LINE_SERIES))
+
+    def __init__(
+        self,
+        n_symbols: int,
+        sink,
+        capacity: int = 390,
+        every_n_minutes: int = 1,
+        on_level_change: bool = False,
+    ):
+        self.sink = sink
+        self.capacity = capacity
+        self.interval_seconds = 60 * every_n_minutes
+        self.on_level_change = on_level_change
+
+        self.times = np.empty((n_symbols, capacity), dtype=object)
+        self.candles = np.empty((n_symbols, capacity, 4))
+        self.lines = np.empty((n_symbols, capacity, len(self.LINE_SERIES)))
+        self.count = np.zeros(n_symbols, dtype=np.int64)
+        self.last_time = [None] * n_symbols
+        self.last_lines = np.full((n_symbols, len(self.LINE_SERIES)), np.nan)
+        # scatter points like entries and exits: (index, series, time, value)
+        self.markers = []
+
+        self.recorded = 0
+        self.skipped = 0
+
+    def record(self, index: int, time, open_, high, low, close, lines) -> bool:
+        """Buffer one point of every series, returns False if it was decimated away"""
+        last_time = self.last_time[index]
+        due = (
+            last_time is None
+            or (time - last_time).total_seconds() >= self.interval_seconds
+        )
+        if not due and self.on_level_change:
+            levels = lines[self.LEVEL_COLUMNS]
+            due = any(
+                level != last
+                for level, last in zip(
+                    levels, self.last_lines[index, self.LEVEL_COLUMNS]
+                )
+            )
+        if not due:
+            self.skipped += 1
+            return False
+
+        if self.count[index] == self.capacity:
+            self.flush_symbol(index)
+        position = self.count[index]
+        self.times[index, position] = time
+        self.candles[index, position] = (open_, high, low, close)
+        self.lines[index, position] = lines
+        self.last_lines[index] = lines
+        self.count[index] = position + 1
+        self.last_time[index] = time
+        self.recorded += 1
+        return True
+
+    def mark(self, index: int, series: str, time, value: float) -> None:
+        self.markers.append((index, series, time, value))
+
+    def flush_symbol(self, index: int) -> None:
+        count = self.count[index]
+        if count:
+            times = self.times[index, :count].tolist()
+            self.sink(index, self.PRICE, times, self.candles[index, :count])
+            for column, series in enumerate(self.LINE_SERIES):
+                self.sink(index, series, times, self.lines[index, :count, column])
+            self.times[index, :count] = None
+            self.count[index] = 0
+
+    def release(self, index: int) -> None:
+        """Flush a symbol's points and forget its state, the slot gets reused"""
+        self.flush_symbol(index)
+        markers = [marker for marker in self.markers if marker[0] == index]
+        self.markers = [marker for marker in self.markers if marker[0] != index]
+        for _, series, time, value in markers:
+            self.sink(index, series, [time], np.array([value]))
+        self.last_time[index] = None
+        self.last_lines[index] = np.nan
+
+    def flush(self) -> None:
+        for index in np.flatnonzero(self.count):
+            self.flush_symbol(int(index))
+        markers, self.markers = self.markers, []
+        for index, series, time, value in markers:
+            self.sink(index, series, [time], np.array([value]))
@@ -0,0 +1,97 @@
+from AlgorithmImports import *
+
+
+class MinuteBarConsolidator:
+    """
+    Consolidates minute TradeBars into `minutes` bars aligned to midnight, like
+    LEAN's TradeBarConsolidator(timedelta(minutes=...)). The consolidated bar is
+    emitted with the minute bar that completes it, so it is available in the same
+    on_data. A bar left incomplete by a gap is emitted once a later period starts.
+    """
+
+    __slots__ = ("minutes", "period", "_start", "_end", "_bar")
+
+    def __init__(self, minutes: int):
+        self.minutes = minutes
+        self.period = timedelta(minutes=minutes)
+        self._start = self._end = None
+        # [open, high, low, close, volume] of the bar being built
+        self._bar = None
+
+    def update(self, bar) -> tuple:
+        """Add a minute bar, returns the consolidated bars it completed"""
+        completed = ()
+        start = bar.time
+        if self._bar is not None and start >= self._end:
+            completed = (self._emit(bar.symbol),)
+        if self._bar is None:
+            midnight = datetime(start.year, start.month, start.day)
+            minute = (start - midnight) // timedelta(minutes=1)
+            self._start = midnight + timedelta(minutes=minute - minute % self.minutes)
+            self._end = self._start + self.period
+            self._bar = [bar.open, bar.high, bar.low, bar.close, bar.volume]
+        else:
+            consolidated = self._bar
+            if bar.high > consolidated[1]:
+                consolidated[1] = bar.high
+            if bar.low < consolidated[2]:
+                consolidated[2] = bar.low
+            consolidated[3] = bar.close
+            consolidated[4] += bar.volume
+        if bar.end_time >= self._end:
+            completed += (self._emit(bar.symbol),)
+        return completed
+
+    def _emit(self, symbol) -> TradeBar:
+        open_, high, low, close, volume = self._bar
+        self._bar = None
+        return TradeBar(
+            self._start, symbol, open_, high, low, close, volume, self.period
+        )
+
+
+class ConsolidationPipeline(PythonIndicator):
+    """
+    Single indicator registration per symbol that fans its minute bars out to the
+    symbol's Python indicators.
+
+    Minute indicators get every bar. For each higher timeframe there is one
+    consolidator, shared by all indicators of that timeframe, and they are only
+    updated when it completes a bar. Adding 5 or 15 minute indicators therefore
+    costs one consolidator update per minute bar and timeframe, not one per
+    indicator.
+    """
+
+    def __init__(self, name: str):
+        super().__init__()
+        self.name = name
+        self.minute_indicators = []
+        # [(consolidator, indicators)] per timeframe
+        self.timeframes = []
+
+    def add(self, indicator, minutes: int = 1):
+        """Feed `indicator` `minutes` bars, returns the indicator"""
+        if minutes == 1:
+            self.minute_indicators.append(indicator)
+        else:
+            for consolidator, indicators in self.timeframes:
+                if consolidator.minutes == minutes:
+                    indicators.append(indicator)
+                    break
+            else:
+                self.timeframes.append((MinuteBarConsolidator(minutes), [indicator]))
+        # minute bars of history the indicator needs to be ready
+        self.warm_up_period = max(
+            self.warm_up_period, minutes * indicator.warm_up_period
+        )
+        return indicator
+
+    def update(self, input) -> bool:
+        for indicator in self.minute_indicators:
+            indicator.update(input)
+        for consolidator, indicators in self.timeframes:
+            for bar in consolidator.update(input):
+                for indicator in indicators:
+                    indicator.update(bar)
+        self.current.set_value(input.close)
+        return True
@@ -0,0 +1,222 @@
+"""
+Vectorized exit resolution of bracket entries on minute bars.
+
+Each entry holds a take profit limit and a stop market order until one of them
+fills or the scheduled liquidation closes it, with LEAN's minute fill rules: the
+limit fills once a bar trades through it, at the limit or a better open, the stop
+at the stop or the worse close, the liquidation at the close of its bar.
+
+Instead of walking every entry bar by bar, the next bars of all open entries are
+gathered into one (entries, bars) array and the first bar touching either level is
+found with one argmax. Most entries exit soon, so the search starts with a few
+bars and doubles the window for the entries still open.
+
+`ExitRules` configures which order fills when both levels are touched on the same
+bar and the slippage of the market fills.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from minute_bars import MinuteBars
+from session_calendar import SessionCalendar
+from trade_journal import LIQUIDATION, STOP_LOSS, TAKE_PROFIT
+
+# same bar tie breaks
+TAKE_PROFIT_FIRST = "take_profit"
+STOP_LOSS_FIRST = "stop_loss"
+NEAREST_TO_OPEN = "nearest_to_open"
+TIE_BREAKS = (TAKE_PROFIT_FIRST, STOP_LOSS_FIRST, NEAREST_TO_OPEN)
+# bars searched in the first pass, doubled in every further pass
+FIRST_WINDOW = 16
+# gathered bars per chunk, bounds the temporary arrays
+CHUNK_ELEMENTS = 1 << 21
+
+
+@dataclass(frozen=True)
+class ExitRules:
+    # TAKE_PROFIT_FIRST is LEAN's order, the take profit is submitted first.
+    # NEAREST_TO_OPEN assumes the bar went from its open to the nearer level first.
+    tie_break: str = TAKE_PROFIT_FIRST
+    # adverse slippage of stop and liquidation fills, as a fraction of the price
+    stop_slippage: float = 0.0
+    liquidation_slippage: float = 0.0
+
+    def __post_init__(self):
+        if self.tie_break not in TIE_BREAKS:
+            raise ValueError(f"tie_break must be one of {TIE_BREAKS}")
+        if self.stop_slippage < 0 or self.liquidation_slippage < 0:
+            raise ValueError("slippage must not be negative")
+
+
+@dataclass
+class Exits:
+    bar: np.ndarray
+    price: np.ndarray
+    reason: np.ndarray
+    # minutes from the entry bar's end to the exit bar's end
+    holding_minutes: np.ndarray
+
+
+def liquidation_bars(bars: MinuteBars) -> np.ndarray:
+    """
+    Bar per day at which the scheduled liquidate fills, i.e. the bar ending at its
+    session's flatten minute, or the last bar of the day if there is none.
+    """
+    flatten = SessionCalendar().minutes(bars.dates)["flatten_minute"]
+    end_minute = bars.minute.astype(np.int64) + 1
+    result = bars.day_offsets[1:] - 1
+    hits = np.nonzero(end_minute == flatten[bars.day])[0]
+    result[bars.day[hits]] = hits
+    return result
+
+
+def simulate_exits(
+    bars: MinuteBars,
+    symbol,
+    entry_bar,
+    side,
+    take_profit,
+    stop_loss,
+    flatten_bars: np.ndarray = None,
+    rules: ExitRules = ExitRules(),
+) -> Exits:
+    """
+    Exits of entries filled at the close of `entry_bar` of `symbol`, the row in
+    `bars`. `side` is 1 for longs and -1 for shorts. Exits start on the next bar,
+    an entry on or after its day's liquidation bar is closed at its own close.
+    """
+    entry_bar = np.asarray(entry_bar, dtype=np.int64)
+    # the other arguments may be scalars shared by all entries
+    symbol, side = (
+        np.broadcast_to(np.asarray(values, dtype=np.int64), entry_bar.shape)
+        for values in (symbol, side)
+    )
+    take_profit, stop_loss = (
+        np.broadcast_to(np.asarray(values, dtype=np.float64), entry_bar.shape)
+        for values in (take_profit, stop_loss)
+    )
+    if flatten_bars is None:
+        flatten_bars = liquidation_bars(bars)
+    n_entries = len(entry_bar)
+    last_bar = np.maximum(flatten_bars[bars.day[entry_bar]], entry_bar)
+    exit_bar = last_bar.copy()
+    exit_reason = np.full(n_entries, LIQUIDATION, dtype=np.int8)
+
+    holding = last_bar - entry_bar
+    open_entries = np.flatnonzero(holding > 0)
+    searched = 0
+    window = FIRST_WINDOW
+    while len(open_entries):
+        chunk_size = max(1, CHUNK_ELEMENTS // window)
+        hit = np.concatenate(
+            [
+                _first_hits(
+                    bars,
+                    open_entries[start : start + chunk_size],
+                    searched,
+                    window,
+                    symbol,
+                    entry_bar,
+                    last_bar,
+                    side,
+                    take_profit,
+                    stop_loss,
+                    rules,
+                    exit_bar,
+                    exit_reason,
+                )
+                for start in range(0, len(open_entries), chunk_size)
+            ]
+        )
+        searched += window
+        window *= 2
+        open_entries = open_entries[~hit & (holding[open_entries] > searched)]
+
+    row_open = bars.open[symbol, exit_bar]
+    row_close = bars.close[symbol, exit_bar]
+    long = side == 1
+    price = np.where(
+        long,
+        np.minimum(stop_loss, row_close),
+        np.maximum(stop_loss, row_close),
+    ) * np.where(long, 1 - rules.stop_slippage, 1 + rules.stop_slippage)
+    price = np.where(
+        exit_reason == TAKE_PROFIT,
+        np.where(
+            long, np.maximum(take_profit, row_open), np.minimum(take_profit, row_open)
+        ),
+        price,
+    )
+    price = np.where(
+        exit_reason == LIQUIDATION,
+        row_close
+        * np.where(
+            long, 1 - rules.liquidation_slippage, 1 + rules.liquidation_slippage
+        ),
+        price,
+    )
+    return Exits(
+        bar=exit_bar,
+        price=price,
+        reason=exit_reason,
+        holding_minutes=(
+            bars.minute[exit_bar].astype(np.int64)
+            - bars.minute[entry_bar].astype(np.int64)
+        ),
+    )
+
+
+def _first_hits(
+    bars,
+    chunk,
+    searched,
+    window,
+    symbol,
+    entry_bar,
+    last_bar,
+    side,
+    take_profit,
+    stop_loss,
+    rules,
+    exit_bar,
+    exit_reason,
+) -> np.ndarray:
+    """
+    Search the `window` bars after the `searched` ones of the `chunk` entries,
+    writes the exits found and returns which entries had one
+    """
+    gathered = entry_bar[chunk, None] + np.arange(searched + 1, searched + window + 1)
+    in_hold = gathered <= last_bar[chunk, None]
+    gathered = np.minimum(gathered, last_bar[chunk, None])
+    rows = symbol[chunk, None]
+    high = bars.high[rows, gathered]
+    low = bars.low[rows, gathered]
+    long = (side[chunk] == 1)[:, None]
+    take_profit = take_profit[chunk, None]
+    stop_loss = stop_loss[chunk, None]
+    profit_hits = np.where(long, high > take_profit, low < take_profit) & in_hold
+    stop_hits = np.where(long, low < stop_loss, high > stop_loss) & in_hold
+
+    hits = profit_hits | stop_hits
+    hit = hits.any(axis=1)
+    hit_rows = np.flatnonzero(hit)
+    first = np.argmax(hits[hit_rows], axis=1)
+    profit = profit_hits[hit_rows, first]
+    both = profit & stop_hits[hit_rows, first]
+    if rules.tie_break == STOP_LOSS_FIRST:
+        profit = profit & ~both
+    elif rules.tie_break == NEAREST_TO_OPEN:
+        row_open = bars.open[rows[hit_rows, 0], gathered[hit_rows, first]]
+        profit = profit & ~(
+            both
+            & (
+                np.abs(row_open - stop_loss[hit_rows, 0])
+                < np.abs(row_open - take_profit[hit_rows, 0])
+            )
+        )
+    entries = chunk[hit_rows]
+    exit_bar[entries] = gathered[hit_rows, first]
+    exit_reason[entries] = np.where(profit, TAKE_PROFIT, STOP_LOSS)
+    return hit
@@ -1,5 +1,10 @@
 from AlgorithmImports import *
 
+# levels in percent of the daily range, in the order they are stored
+FIBONACCI_RATIOS = (100, 78.6, 61.8, 50, 38.2, 23.6, 0)
+_FRACTIONS = tuple(ratio / 100 for ratio in FIBONACCI_RATIOS)
+_LEVEL_INDEX = {ratio: index for index, ratio in enumerate(FIBONACCI_RATIOS)}
+
 
 class FibonacciRetracementIndicator(PythonIndicator):
     def __init__(self, name):
@@ -9,13 +14,16 @@ class FibonacciRetracementIndicator(PythonIndicator):
         self.current_high = None
         self.current_low = None
         self.current_day = None
-        self._100 = FibonacciLevelIndicator(100)
-        self._786 = FibonacciLevelIndicator(78.6)
-        self._618 = FibonacciLevelIndicator(61.8)
-        self._50 = FibonacciLevelIndicator(50)
-        self._382 = FibonacciLevelIndicator(38.2)
-        self._236 = FibonacciLevelIndicator(23.6)
-        self._0 = FibonacciLevelIndicator(0)
+        # one value per FIBONACCI_RATIOS entry, only rewritten in place when the
+        # daily range moves so the level views below stay bound to it
+        self.levels = [0.0] * len(FIBONACCI_RATIOS)
+        self._100 = FibonacciLevel(self.levels, 100)
+        self._786 = FibonacciLevel(self.levels, 78.6)
+        self._618 = FibonacciLevel(self.levels, 61.8)
+        self._50 = FibonacciLevel(self.levels, 50)
+        self._382 = FibonacciLevel(self.levels, 38.2)
+        self._236 = FibonacciLevel(self.levels, 23.6)
+        self._0 = FibonacciLevel(self.levels, 0)
         self.level_indicators = [
             self._100,
             self._786,
@@ -40,55 +48,77 @@ class FibonacciRetracementIndicator(PythonIndicator):
         # Forward set request to window object
         self.window[index] = value
 
+    def level(self, ratio: float) -> float:
+        """Current value of a level, e.g. level(61.8)"""
+        return self.levels[_LEVEL_INDEX[ratio]]
+
     def update(self, input):
+        high = input.High
+        low = input.Low
         # Check if it's a new day
         if self.current_day != input.Time.date():
             self.current_day = input.Time.date()
-            self.current_high = input.High
-            self.current_low = input.Low
-        else:
+            self.current_high = high
+            self.current_low = low
+        elif high > self.current_high or low < self.current_low:
             # Update the high and low for the current day
-            self.current_high = max(self.current_high, input.High)
-            self.current_low = min(self.current_low, input.Low)
+            self.current_high = max(self.current_high, high)
+            self.current_low = min(self.current_low, low)
+        else:
+            # range unchanged, so are the levels
+            return self.current_high != self.current_low
 
         if self.current_high == self.current_low:
             return False  # no fib if no diff
 
+        self._set_levels()
+        return bool(self.current_high and self.current_low)
+
+    def restore(self, day, high: float, low: float) -> None:
+        """Merge a saved daily range, e.g. from a checkpoint taken before a restart"""
+        if self.current_day is not None and self.current_day > day:
+            return
+        if self.current_day == day:
+            high = max(high, self.current_high)
+            low = min(low, self.current_low)
+        self.current_day = day
+        self.current_high = high
+        self.current_low = low
+        if high != low:
+            self._set_levels()
+
+    def _set_levels(self):
         diff = self.current_high - self.current_low
         low = self.current_low
-        # Fibonacci levels (23.6%, 38.2%, 50%, 61.8%, 100%)
-
-        for level in self.level_indicators:
-            level.update(low, diff)
+        levels = self.levels
+        for index, fraction in enumerate(_FRACTIONS):
+            levels[index] = low + fraction * diff
 
-        # set 50er fib as value here as the interface demands. We'll only be using the level indicators anyway.
-        self.value = self._50.current.value
+        # set 50er fib as value here as the interface demands. We'll only be using the levels anyway.
+        self.value = levels[_LEVEL_INDEX[50]]
         self.current.set_value(self.value)
 
-        return bool(self.current_high and self.current_low)
 
+class FibonacciLevel:
+    """
+    Read-only view of one level of a FibonacciRetracementIndicator.
 
-class FibonacciLevelIndicator(PythonIndicator):
-    def __init__(self, level: float):
-        super().__init__()
-        self.level = level
-        self.name = str(f"level-{level}")
-        self.value = None
+    Keeps the `indicator._382.current.value` style access working without a
+    separate indicator object to update per level.
+    """
 
-    def __getitem__(self, index):
-        # Forward index request to window object
-        try:
-            item = self.window[index]
-            return item
-        except Exception:
-            return 0, 0
+    __slots__ = ("_levels", "_index", "level", "name")
 
-    def __setitem__(self, index, value):
-        # Forward set request to window object
-        self.window[index] = value
+    def __init__(self, levels: list, level: float):
+        self._levels = levels
+        self._index = _LEVEL_INDEX[level]
+        self.level = level
+        self.name = str(f"level-{level}")
 
-    def update(self, low, diff):
-        self.value = low + ((self.level / 100) * diff)
-        self.current.set_value(self.value)
+    @property
+    def current(self):
+        return self
 
-        return bool(low and diff)
+    @property
+    def value(self) -> float:
+        return self._levels[self._index]
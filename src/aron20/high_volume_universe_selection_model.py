@@ -3,50 +3,108 @@ from AlgorithmImports import *
 from Selection.FundamentalUniverseSelectionModel import (
     FundamentalUniverseSelectionModel,
 )
+from volume_window_cache import VolumeWindowCache
 
 
 class HighVolumeUniverseSelectionModel(FundamentalUniverseSelectionModel):
-    def __init__(self, period=14, volume_threshold=1000000, top_n=20):
+    def __init__(
+        self,
+        period=14,
+        volume_threshold=1000000,
+        top_n=20,
+        max_candidates=500,
+        max_cached_symbols=2000,
+        max_window_age=timedelta(days=7),
+    ):
         """Initialize with the parameters for the volume filter"""
         super().__init__(filterFineData=False)
         self.period = period
         self.volume_threshold = volume_threshold
         self.top_n = top_n
+        # bounds the size of the history request at each selection
+        self.max_candidates = max_candidates
         self.filtered_symbols = []
+        # volume windows survive between selections, see update()
+        self.volume_cache = VolumeWindowCache(period, max_symbols=max_cached_symbols)
+        # windows of symbols without bars, e.g. candidates that were not selected,
+        # are reused until they are this old
+        self.max_window_age = max_window_age
+
+    def update(self, symbol: Symbol, bar: TradeBar, time: datetime) -> None:
+        """
+        Feed an arriving minute bar with the current algorithm time, keeps the
+        symbol's cached window current
+        """
+        self.volume_cache.update(symbol, bar.volume, time)
 
     def select_coarse(
         self, algorithm: QCAlgorithm, fundamental: list[Fundamental]
     ) -> list[Symbol]:
         """Custom universe selection based on volume filtering criteria"""
-        # Filter coarse data by price and HasFundamentalData, then limit to top N by dollar volume
-        symbols = [
-            x.Symbol
-            for x in fundamental
-            if x.HasFundamentalData and x.volume > self.volume_threshold
-        ]
-
-        valid_symbols = []
-        for symbol in symbols:
-            history = algorithm.History(symbol, self.period, Resolution.Minute)
-
-            if history.empty or not "volume" in history:
-                continue
+        # Filter coarse data by HasFundamentalData and volume, then keep the most
+        # liquid candidates by dollar volume
+        candidates = sorted(
+            (
+                x
+                for x in fundamental
+                if x.HasFundamentalData and x.volume > self.volume_threshold
+            ),
+            key=lambda x: x.dollar_volume,
+            reverse=True,
+        )[: self.max_candidates]
+        symbols = [x.Symbol for x in candidates]
 
-            # Extract volume data from historical bars
-            volumes = history["volume"].tolist()
-
-            avg_volume = sum(volumes) / len(volumes)
-            min_volume = min(volumes)
-            has_gap = any(v == 0 for v in volumes)
+        # windows seeded or rolled forward recently enough are reused, only new
+        # symbols and aged windows need history
+        since = algorithm.time - self.max_window_age
+        missing = [
+            symbol
+            for symbol in symbols
+            if self.volume_cache.lookup(symbol, since=since) is None
+        ]
+        if missing:
+            # one history request for all of them instead of one per symbol
+            history = algorithm.History(missing, self.period, Resolution.Minute)
+            self.seed_volume_cache(missing, history, algorithm.time)
 
-            # Only include symbols that pass the criteria
-            if (
-                avg_volume > self.volume_threshold
-                and min_volume > self.volume_threshold
-                and not has_gap
-            ):
-                valid_symbols.append(symbol)
+        # candidates are in dollar volume order, keep the most liquid top_n
+        valid_symbols = self.filter_by_volume(
+            [symbol for symbol in symbols if symbol in self.volume_cache]
+        )[: self.top_n]
 
         # Store filtered symbols for later use
         self.filtered_symbols = valid_symbols
         return valid_symbols
+
+    def seed_volume_cache(self, symbols: list[Symbol], history, time) -> None:
+        """
+        Seed the windows of `symbols` from the history refresh. Symbols it has no
+        volumes for lose their cached window, which is stale.
+        """
+        if history.empty or not "volume" in history:
+            volumes, available = None, set()
+        else:
+            volumes = history["volume"]
+            available = set(volumes.index.get_level_values(0))
+        for symbol in symbols:
+            if symbol in available:
+                self.volume_cache.seed(symbol, volumes.loc[symbol].to_numpy(), time)
+            else:
+                self.volume_cache.remove(symbol)
+
+    def filter_by_volume(self, symbols: list[Symbol]) -> list[Symbol]:
+        """Symbols whose cached minute volume stays above the threshold without gaps"""
+        if not symbols:
+            return []
+        slots = [self.volume_cache.slots[symbol] for symbol in symbols]
+        avg_volume, min_volume, has_gap, count = self.volume_cache.window_statistics(
+            slots
+        )
+        # Only include symbols that pass the criteria
+        passed = (
+            (count > 0)
+            & (avg_volume > self.volume_threshold)
+            & (min_volume > self.volume_threshold)
+            & ~has_gap
+        )
+        return [symbol for symbol, ok in zip(symbols, passed) if ok]
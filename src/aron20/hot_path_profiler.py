@@ -0,0 +1,137 @@
+from time import perf_counter
+
+import numpy as np
+
+
+class HotPathProfiler:
+    """
+    Opt-in timers and counters for the stages of Aron20.on_data.
+
+    Time and counts are accumulated per stage and symbol in preallocated arrays and
+    rolled up per day by `end_day`. Work done for all symbols at once is booked on
+    ALL_SYMBOLS, an extra column after the last symbol, and so is the work of removed
+    symbols. The algorithm keeps a None profiler when profiling is off, so the hot
+    path only pays an `is not None` check.
+    """
+
+    # stages
+    WINDOWS = 0
+    TIME_FRAME = 1
+    VWAP_DIVERGENCE = 2
+    FIBONACCI = 3
+    EMA9_SCAN = 4
+    ORDERS = 5
+    PLOT = 6
+    CANDIDATES = 7
+    STAGES = (
+        "windows",
+        "time_frame",
+        "vwap_divergence",
+        "fibonacci",
+        "ema9_scan",
+        "orders",
+        "plot",
+        "candidates",
+    )
+
+    # counters
+    BARS = 0
+    CHECKED = 1
+    NOT_SIGNIFICANT = 2
+    LONG_SETUPS = 3
+    SHORT_SETUPS = 4
+    ENTRIES = 5
+    PLOTS = 6
+    COUNTERS = (
+        "bars",
+        "checked",
+        "not_significant",
+        "long_setups",
+        "short_setups",
+        "entries",
+        "plots",
+    )
+
+    ALL_SYMBOLS = -1
+
+    def __init__(self, symbols):
+        # by reference, the report names the current holders of reused slots
+        self.symbols = symbols
+        columns = len(self.symbols) + 1
+        self.seconds = np.zeros((len(self.STAGES), columns))
+        self.calls = np.zeros((len(self.STAGES), columns), dtype=np.int64)
+        self.counters = np.zeros((len(self.COUNTERS), columns), dtype=np.int64)
+        # per day totals over all symbols: (day, seconds per stage, counters)
+        self.days = []
+        self._day_start = (self.seconds.sum(axis=1), self.counters.sum(axis=1))
+
+    @staticmethod
+    def start() -> float:
+        return perf_counter()
+
+    def lap(self, stage: int, index: int, started: float) -> float:
+        """Book the time since `started` on a stage, returns now to chain stages"""
+        now = perf_counter()
+        self.seconds[stage, index] += now - started
+        self.calls[stage, index] += 1
+        return now
+
+    def count(self, counter: int, index, amount: int = 1) -> None:
+        """`index` may be a single symbol index or a list of distinct ones"""
+        self.counters[counter, index] += amount
+
+    def release(self, index: int) -> None:
+        """
+        Fold a removed symbol's column into ALL_SYMBOLS, so the totals keep its work
+        and the next holder of the slot starts from zero
+        """
+        seconds = self.seconds.sum(axis=1)
+        for columns in (self.seconds, self.calls, self.counters):
+            columns[:, self.ALL_SYMBOLS] += columns[:, index]
+            columns[:, index] = 0
+        # summing in another order may round differently, keep the day's time exact
+        start_seconds, start_counters = self._day_start
+        self._day_start = (
+            self.seconds.sum(axis=1) - (seconds - start_seconds),
+            start_counters,
+        )
+
+    def end_day(self, day) -> None:
+        seconds = self.seconds.sum(axis=1)
+        counters = self.counters.sum(axis=1)
+        start_seconds, start_counters = self._day_start
+        if (counters - start_counters).any() or (seconds - start_seconds).any():
+            self.days.append((day, seconds - start_seconds, counters - start_counters))
+        self._day_start = (seconds, counters)
+
+    def report(self, top_symbols: int = 5) -> list:
+        """Summary lines: totals per stage and counter, slowest symbols, days"""
+        lines = []
+        total_seconds = self.seconds.sum(axis=1)
+        total_calls = self.calls.sum(axis=1)
+        for name, seconds, calls in zip(self.STAGES, total_seconds, total_calls):
+            per_call = seconds / calls * 1e6 if calls else 0.0
+            lines.append(
+                f"stage {name}: {seconds:.3f}s over {calls} calls, {per_call:.1f}us/call"
+            )
+        lines.append(
+            "counters: "
+            + ", ".join(
+                f"{name}={count}"
+                for name, count in zip(self.COUNTERS, self.counters.sum(axis=1))
+            )
+        )
+        per_symbol = self.seconds[:, :-1].sum(axis=0)
+        for index in np.argsort(per_symbol)[::-1][:top_symbols]:
+            lines.append(
+                f"symbol {self.symbols[index]}: {per_symbol[index]:.3f}s, "
+                f"{self.counters[self.BARS, index]} bars, "
+                f"{self.counters[self.ENTRIES, index]} entries"
+            )
+        for day, seconds, counters in self.days:
+            lines.append(
+                f"day {day}: {seconds.sum():.3f}s, {counters[self.BARS]} bars, "
+                f"{counters[self.NOT_SIGNIFICANT]} not significant, "
+                f"{counters[self.ENTRIES]} entries, {counters[self.PLOTS]} plots"
+            )
+        return lines
@@ -0,0 +1,221 @@
+"""
+On-disk cache of the signal engine's indicators.
+
+VWAP, EMA9, WILR(180), ATR(14) and the Fibonacci range don't depend on any
+StrategyConfig parameter, so sweeps and research runs over the same bars only need
+to compute them once. Every (symbol, date) series is stored in its own file named by
+a digest of
+
+    CACHE_VERSION, the indicator parameters, the symbol and the digests of the
+    day and of the days before it the warm up depends on
+
+where a day's digest covers its date, timeline and the symbol's bars. The smoothers
+forget bars further back than WARM_UP_BARS below float precision and WILR's window
+is shorter, so the chain only reaches back that many bars, or to the first day of
+the panel. Extending or shifting a range reuses every day whose chain is unchanged.
+Changed bars change the key of their day and of the chains containing it, so stale
+entries are never read, they just age out: the folder is kept below `max_bytes` by
+removing the least recently used files after every write.
+
+Missing days are computed together with the days their chain reaches back to, in
+one batch per span of days.
+"""
+
+import hashlib
+import os
+from dataclasses import fields, replace
+
+import numpy as np
+
+from minute_bars import MinuteBars
+from signal_engine import (
+    ATR_PERIOD,
+    EMA_PERIOD,
+    WILR_PERIOD,
+    Indicators,
+    compute_indicators,
+)
+
+# bump whenever the indicator computation changes
+CACHE_VERSION = 2
+INDICATOR_PARAMETERS = (
+    f"vwap;ema({EMA_PERIOD});wilr({WILR_PERIOD});atr({ATR_PERIOD});fibonacci"
+)
+# ATR's Wilder smoothing is the slowest to forget, (13 / 14) ** 600 < 1e-19
+WARM_UP_BARS = 600
+DEFAULT_MAX_BYTES = 1 << 30
+_SUFFIX = ".npy"
+_INDICATOR_NAMES = [field.name for field in fields(Indicators)]
+_PER_SYMBOL_FIELDS = ("open", "high", "low", "close", "volume", "available")
+
+
+class IndicatorCache:
+    def __init__(self, folder: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        self.folder = folder
+        self.max_bytes = max_bytes
+        # (symbol, date) series read and computed
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(folder, exist_ok=True)
+
+    def indicators(self, bars: MinuteBars) -> Indicators:
+        """Indicators of `bars`, read from the cache where present"""
+        offsets = bars.day_offsets
+        starts = warm_up_starts(bars)
+        series = np.empty((len(_INDICATOR_NAMES), bars.n_symbols, bars.n_bars))
+        # (first day of the chains, last missing day + 1) -> [(row, missing days)]
+        spans = {}
+        keys = [self.keys(bars, row, starts) for row in range(bars.n_symbols)]
+        for row in range(bars.n_symbols):
+            missing = []
+            for day, key in enumerate(keys[row]):
+                start, stop = offsets[day], offsets[day + 1]
+                cached = self._read(key, stop - start)
+                if cached is None:
+                    missing.append(day)
+                else:
+                    series[:, row, start:stop] = cached
+            if missing:
+                span = (int(starts[missing[0]]), missing[-1] + 1)
+                spans.setdefault(span, []).append((row, missing))
+            self.hits += bars.n_days - len(missing)
+            self.misses += len(missing)
+
+        for (first_day, stop_day), missing_rows in spans.items():
+            rows = [row for row, _ in missing_rows]
+            computed = compute_indicators(
+                select_days(select_rows(bars, rows), first_day, stop_day)
+            )
+            base = offsets[first_day]
+            for position, (row, missing) in enumerate(missing_rows):
+                for day in missing:
+                    start, stop = offsets[day], offsets[day + 1]
+                    series[:, row, start:stop] = [
+                        getattr(computed, name)[position, start - base : stop - base]
+                        for name in _INDICATOR_NAMES
+                    ]
+                    self._write(keys[row][day], series[:, row, start:stop])
+        if spans:
+            self.evict()
+        return Indicators(*series)
+
+    @staticmethod
+    def day_digests(bars: MinuteBars, row: int) -> list:
+        """Digest of every day's date, timeline and bars of the symbol"""
+        digests = []
+        for day in range(bars.n_days):
+            start, stop = bars.day_offsets[day], bars.day_offsets[day + 1]
+            digest = hashlib.sha256(f"{bars.dates[day]}".encode())
+            digest.update(np.ascontiguousarray(bars.minute[start:stop]).view(np.uint8))
+            for name in _PER_SYMBOL_FIELDS:
+                digest.update(
+                    np.ascontiguousarray(getattr(bars, name)[row, start:stop]).view(
+                        np.uint8
+                    )
+                )
+            digests.append(digest.digest())
+        return digests
+
+    @classmethod
+    def keys(cls, bars: MinuteBars, row: int, starts: np.ndarray = None) -> list:
+        """Cache key of every day of the symbol"""
+        if starts is None:
+            starts = warm_up_starts(bars)
+        digests = cls.day_digests(bars, row)
+        prefix = f"{CACHE_VERSION};{INDICATOR_PARAMETERS};{bars.symbols[row]}"
+        keys = []
+        for day in range(bars.n_days):
+            digest = hashlib.sha256(prefix.encode())
+            # the chain is as long as the days the warm up depends on
+            digest.update(f";{day - starts[day]}".encode())
+            for chained in digests[starts[day] : day + 1]:
+                digest.update(chained)
+            keys.append(digest.hexdigest())
+        return keys
+
+    def size(self) -> int:
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def evict(self) -> int:
+        """Remove the least recently used files above `max_bytes`, returns how many"""
+        entries = sorted(
+            ((entry.stat(), entry.path) for entry in self._entries()),
+            key=lambda item: item[0].st_mtime_ns,
+        )
+        total = sum(stat.st_size for stat, _ in entries)
+        removed = 0
+        for stat, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= stat.st_size
+            removed += 1
+        return removed
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.folder, key + _SUFFIX)
+
+    def _entries(self):
+        return [
+            entry
+            for entry in os.scandir(self.folder)
+            if entry.is_file() and entry.name.endswith(_SUFFIX)
+        ]
+
+    def _read(self, key: str, n_bars: int):
+        path = self._path(key)
+        try:
+            series = np.load(path, allow_pickle=False)
+        except FileNotFoundError:
+            return None
+        except (ValueError, EOFError):
+            # unreadable, e.g. truncated, compute it again
+            os.remove(path)
+            return None
+        if series.shape != (len(_INDICATOR_NAMES), n_bars):
+            os.remove(path)
+            return None
+        # a hit makes the file the most recently used one
+        os.utime(path)
+        return series
+
+    def _write(self, key: str, series: np.ndarray):
+        path = self._path(key)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            np.save(file, series)
+        os.replace(temporary, path)
+
+
+def select_rows(bars: MinuteBars, rows) -> MinuteBars:
+    """The panel of some of the symbols on the same timeline"""
+    return replace(
+        bars,
+        symbols=[bars.symbols[row] for row in rows],
+        **{name: getattr(bars, name)[rows] for name in _PER_SYMBOL_FIELDS},
+    )
+
+
+def select_days(bars: MinuteBars, start: int, stop: int) -> MinuteBars:
+    """The panel of the days `start` to `stop`, excluded"""
+    first, last = bars.day_offsets[start], bars.day_offsets[stop]
+    return replace(
+        bars,
+        dates=bars.dates[start:stop],
+        day_offsets=bars.day_offsets[start : stop + 1] - first,
+        minute=bars.minute[first:last],
+        **{name: getattr(bars, name)[:, first:last] for name in _PER_SYMBOL_FIELDS},
+    )
+
+
+def warm_up_starts(bars: MinuteBars) -> np.ndarray:
+    """
+    First day each day's series depend on: the latest day from which at least
+    WARM_UP_BARS bars precede it, or the first day of the panel
+    """
+    offsets = bars.day_offsets[:-1]
+    # the latest day starting at least WARM_UP_BARS bars before the day
+    starts = np.searchsorted(offsets, offsets - WARM_UP_BARS, side="right") - 1
+    return np.maximum(starts, 0)
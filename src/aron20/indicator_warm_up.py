@@ -0,0 +1,62 @@
+from AlgorithmImports import *
+
+
+class IndicatorWarmUp:
+    """
+    Warms up the indicators of many symbols from a single multi-symbol history
+    request instead of one request per symbol and lookback.
+
+    Register indicators with the number of minutes they want, then `run` fetches the
+    largest lookback once and feeds every indicator the tail of its symbol's bars.
+    """
+
+    def __init__(self):
+        # symbol -> list of (periods, indicators, data_point)
+        self.requirements = {}
+
+    def add(self, symbol, indicators: list, periods: int, data_point: bool = False):
+        """
+        `data_point` feeds IndicatorDataPoints of the close instead of TradeBars, for
+        indicators like the EMA that don't take bars.
+        """
+        self.requirements.setdefault(symbol, []).append(
+            (periods, indicators, data_point)
+        )
+
+    @property
+    def periods(self) -> int:
+        return max(
+            (
+                periods
+                for requirements in self.requirements.values()
+                for periods, _, _ in requirements
+            ),
+            default=0,
+        )
+
+    def run(self, algorithm: QCAlgorithm) -> int:
+        """Fetch and replay the history, returns the number of bars received"""
+        if not self.requirements:
+            return 0
+        history = algorithm.history[TradeBar](
+            list(self.requirements), self.periods, Resolution.MINUTE
+        )
+        bars = {symbol: [] for symbol in self.requirements}
+        for bars_by_symbol in history:
+            for symbol, bar in bars_by_symbol.items():
+                if symbol in bars:
+                    bars[symbol].append(bar)
+
+        for symbol, requirements in self.requirements.items():
+            symbol_bars = bars[symbol]
+            for periods, indicators, data_point in requirements:
+                for bar in symbol_bars[-periods:]:
+                    input = (
+                        IndicatorDataPoint(bar.end_time, bar.close)
+                        if data_point
+                        else bar
+                    )
+                    for indicator in indicators:
+                        indicator.update(input)
+
+        return sum(len(symbol_bars) for symbol_bars in bars.values())
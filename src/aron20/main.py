@@ -1,20 +1,56 @@
 # region imports
+import os
+from time import perf_counter
+
+import numpy as np
+
 from AlgorithmImports import *
-from tickers import get_tickers_list_as_string
+from tickers import MORNINGSTAR_SECTOR_CODES, get_tickers_list_as_string
+from bracket_orders import BracketLeg, BracketOrderManager
+from chart_buffer import ChartBuffer
+from consolidation_pipeline import ConsolidationPipeline
 from fibonacci_retracement import FibonacciRetracementIndicator
 from high_volume_universe_selection_model import HighVolumeUniverseSelectionModel
+from hot_path_profiler import HotPathProfiler
+from indicator_warm_up import IndicatorWarmUp
+from position_sizing import PositionSizer, RiskLimits
+from session_calendar import FLATTEN_MINUTES_BEFORE_CLOSE, SessionCalendar
+from state_checkpoint import (
+    component,
+    flatten,
+    read_checkpoint,
+    slot_mapping,
+    slot_names,
+    write_checkpoint,
+)
+from strategy_config import StrategyConfig
+from symbol_state import SymbolStateStore
+from trade_journal import (
+    LIQUIDATION,
+    STOP_LOSS,
+    TAKE_PROFIT,
+    NpzChunkWriter,
+    TradeJournal,
+)
+from williams_percent_r import SlidingWilliamsPercentR
 
 # from oco_margin_model import OCOMarginModel
 
 
 class Aron20(QCAlgorithm):
+    # journal exit reason of a fill by its bracket leg, anything else liquidates
+    EXIT_REASONS = {
+        BracketLeg.TAKE_PROFIT: TAKE_PROFIT,
+        BracketLeg.STOP_LOSS: STOP_LOSS,
+    }
+    # the scheduled events follow the US equity market hours of this ticker
+    MARKET_HOURS_TICKER = "SPY"
 
     def initialize(self):
+        initialize_started = perf_counter()
         self.set_brokerage_model(
             BrokerageName.INTERACTIVE_BROKERS_BROKERAGE, AccountType.MARGIN
         )
-        self.total_trades = 0
-        self.winning_trades = 0
 
         # liquidate all holdings by end of day
         self.default_order_properties.time_in_force = TimeInForce.DAY
@@ -24,88 +60,161 @@ class Aron20(QCAlgorithm):
         self.set_cash(100000)  # Set Strategy Cash
         berlin_time_zone_utc_plus_2 = "Europe/Berlin"
         self.set_time_zone(berlin_time_zone_utc_plus_2)
-        ticker_strings = get_tickers_list_as_string()  # enable for prod
-        # ticker_strings = ["AMZN", "CSCO"]  # speed up backtest
-
-        self.symbols = []
 
-        for ticker_string in ticker_strings:
-            self.symbols.append(
-                self.add_equity(ticker_string, resolution=Resolution.MINUTE).Symbol
+        # "dynamic" trades the HighVolumeUniverseSelectionModel's picks instead of
+        # the ticker list, indicators follow the universe in on_securities_changed
+        self.dynamic_universe = self.get_parameter("universe") == "dynamic"
+        if self.dynamic_universe:
+            self.universe_settings.resolution = Resolution.MINUTE
+            self.universe_model = HighVolumeUniverseSelectionModel(
+                volume_threshold=float(
+                    self.get_parameter("universe_volume_threshold") or 1000000
+                ),
+                top_n=int(self.get_parameter("universe_size") or 20),
             )
-            self.securities[ticker_string].set_margin_model(SecurityMarginModel.NULL)
+            self.set_universe_selection(self.universe_model)
+            initial_symbols = []
+            # removals of invested symbols wait for the liquidation, room for both
+            capacity = 2 * self.universe_model.top_n
+        else:
+            self.universe_model = None
+            ticker_strings = get_tickers_list_as_string()  # enable for prod
+            # ticker_strings = ["AMZN", "CSCO"]  # speed up backtest
+            initial_symbols = [
+                self.add_equity(ticker_string, resolution=Resolution.MINUTE).Symbol
+                for ticker_string in ticker_strings
+            ]
+            capacity = len(initial_symbols)
 
         self._vwap = {}
         self._ema9 = {}
         self._fibonacci_retracement_levels = {}
         self._wilr = {}
         self._atr = {}
-        self.previous_minute_close = {}
-        self.previous_minute_high = {}
-        self.previous_minute_low = {}
-        self.current_minute_high = {}
-        self.take_profit_order_ticket = {}
-        self.stop_order_ticket = {}
-        self.orders = {}
-        self.closing_prices = {}
+        self._pipelines = {}
+        # previous minute values, traded today flags and the close over EMA9 tracker,
+        # one slot per symbol in the universe
+        self.state = SymbolStateStore([], window_size=10, capacity=capacity)
+        # slot index -> symbol, None for free slots
+        self.symbols = self.state.symbols
+        # symbols removed from the universe while invested, freed after liquidation
+        self.pending_removals = set()
+        # strategy parameters, resolved once and re-checked before every session
+        self.apply_config(StrategyConfig.from_parameters(self.get_parameter))
+        # the entries of a minute are queued and sized together under these caps
+        self.sizer = PositionSizer(
+            capacity, RiskLimits.from_parameters(self.get_parameter)
+        )
+        self.pending_entries = []
+        # entries with their take profit and stop loss, one cancels the other
+        self.brackets = BracketOrderManager(self)
+        # finished trades and running metrics, chunks go to disk if a path is set
+        journal_path = self.get_parameter("trade_journal_path")
+        self.journal = TradeJournal(
+            self.symbols, sink=NpzChunkWriter(journal_path) if journal_path else None
+        )
         self.charts = {}
         self.chart_names = {}
         self.previous_day = None
-        self.traded_today = {}
-        self._close_window = {}
-        self._ema9_window = {}
-        # scheduled actions
+        # intraday state saved periodically and restored on a restart that day
+        self.checkpoint_path = self.get_parameter("checkpoint_path")
+        self.checkpoint_interval = timedelta(
+            minutes=int(self.get_parameter("checkpoint_every_n_minutes") or 5)
+        )
+        self.last_checkpoint = None
+        # opt-in per stage timers and counters for on_data, dumped at the end
+        self.profiler = (
+            HotPathProfiler(self.symbols)
+            if self.get_parameter("profile_hot_path") in ("1", "true", "True")
+            else None
+        )
+        # trade chart points are buffered, decimated and flushed after the close
+        self.chart_buffer = ChartBuffer(
+            capacity,
+            self.add_chart_points,
+            every_n_minutes=int(self.get_parameter("plot_every_n_minutes") or 1),
+            on_level_change=self.get_parameter("plot_on_level_change")
+            in ("1", "true", "True"),
+        )
+        # scheduled actions, relative to the session so they don't move when US and
+        # European daylight saving time are out of sync, or on early closes
+        # not subscribed, the schedule only needs its exchange hours
+        market = Symbol.create(
+            self.MARKET_HOURS_TICKER, SecurityType.EQUITY, Market.USA
+        )
         self.schedule.on(
-            self.date_rules.every_day(), self.time_rules.at(21, 55), self.liquidate
+            self.date_rules.every_day(market),
+            self.time_rules.before_market_open(market, 30),
+            self.reload_config,
         )
 
         self.schedule.on(
-            self.date_rules.every_day(),
-            self.time_rules.at(21, 55),
+            self.date_rules.every_day(market),
+            self.time_rules.before_market_close(market, FLATTEN_MINUTES_BEFORE_CLOSE),
+            self.liquidate,
+        )
+
+        self.schedule.on(
+            self.date_rules.every_day(market),
+            self.time_rules.before_market_close(market, FLATTEN_MINUTES_BEFORE_CLOSE),
             self.reset_traded_today,
         )
 
-        for symbol in self.symbols:
+        self.schedule.on(
+            self.date_rules.every_day(market),
+            self.time_rules.after_market_close(market),
+            self.chart_buffer.flush,
+        )
+
+        warm_up_bars = self.add_symbols(initial_symbols)
+        # restored with the first data, the broker's holdings and open orders are
+        # only loaded after initialize
+        self.checkpoint_pending = bool(self.checkpoint_path) and os.path.exists(
+            self.checkpoint_path
+        )
+        self.report_initialize_time(perf_counter() - initialize_started, warm_up_bars)
+
+    def add_symbols(self, symbols) -> int:
+        """
+        Create the indicators, state slot and chart of each symbol and warm them up,
+        returns the number of warm up bars
+        """
+        # every indicator is warmed up from one history request after the loop
+        warm_up = IndicatorWarmUp()
+        for symbol in symbols:
+            if symbol in self.state.index:
+                continue
+            if not self.state.free_slots:
+                self.error(
+                    f"Universe capacity {len(self.state)} reached, skip {symbol}"
+                )
+                continue
+            index = self.state.add(symbol)
+            self.securities[symbol].set_margin_model(SecurityMarginModel.NULL)
+            self.sizer.set_sector(index, self.get_sector(symbol))
             # Initialize indicator for each symbol
-            self._close_window[symbol] = RollingWindow[float](10)
-            self._ema9_window[symbol] = RollingWindow[float](10)
             self._vwap[symbol] = self.vwap(symbol=symbol)
             self._ema9[symbol] = self.ema(symbol=symbol, period=9)
-            self._wilr[symbol] = self.wilr(
-                symbol=symbol, period=180, resolution=Resolution.Minute
-            )
             self._atr[symbol] = self.ATR(
                 symbol=symbol, period=14, resolution=Resolution.Minute
             )
-            # custom indicators
-            self._fibonacci_retracement_levels[symbol] = FibonacciRetracementIndicator(
-                f"Fibo-{symbol}-daily"
-            )
-            self.register_indicator(
-                symbol, self._fibonacci_retracement_levels[symbol], Resolution.Minute
-            )
-
-            # warm up indicators with full day
-            self.warm_up_indicator(
-                symbol=symbol,
-                periods=14,
-                indicators=[self._atr[symbol], self._vwap[symbol]],
+            # custom indicators share one registration, higher timeframe
+            # indicators can be added to the pipeline with minutes=5 or 15
+            pipeline = self._pipelines[symbol] = ConsolidationPipeline(
+                f"Pipeline-{symbol}"
             )
-            # ema9s want indicator datapoint, not tradebar
-            history = self.history[TradeBar](
-                symbol=symbol, periods=9, resolution=Resolution.Minute
+            self._wilr[symbol] = pipeline.add(
+                SlidingWilliamsPercentR(f"WILR-{symbol}-180", 180)
             )
-            for bar in history:
-                self._ema9[symbol].update(IndicatorDataPoint(bar.end_time, bar.close))
-
-            self.warm_up_indicator(
-                symbol=symbol, periods=180, indicators=[self._wilr[symbol]]
+            self._fibonacci_retracement_levels[symbol] = pipeline.add(
+                FibonacciRetracementIndicator(f"Fibo-{symbol}-daily")
             )
+            self.register_indicator(symbol, pipeline, Resolution.Minute)
 
-            # Initialize daily high and low
-            self.previous_minute_close[symbol] = float("-inf")
-            self.previous_minute_high[symbol] = float("-inf")
-            self.previous_minute_low[symbol] = float("inf")
+            warm_up.add(symbol, [self._atr[symbol], self._vwap[symbol]], periods=14)
+            # ema9s want indicator datapoint, not tradebar
+            warm_up.add(symbol, [self._ema9[symbol]], periods=9, data_point=True)
+            warm_up.add(symbol, [pipeline], periods=max(180, pipeline.warm_up_period))
 
             # charting
             self.chart_names[symbol] = f"Trade Chart {symbol.value}"
@@ -126,45 +235,215 @@ class Aron20(QCAlgorithm):
             self.charts[symbol].add_series(Series("Exit", SeriesType.SCATTER, 0))
             self.add_chart(self.charts[symbol])
 
-    def reset_traded_today(self):
-        self.traded_today = {}
+        return warm_up.run(self)
+
+    def remove_symbols(self, symbols) -> None:
+        """Deregister and drop the indicators of each symbol and free its slot"""
+        for symbol in symbols:
+            index = self.state.index.get(symbol)
+            if index is None:
+                continue
+            for indicator in (
+                self._vwap.pop(symbol),
+                self._ema9.pop(symbol),
+                self._atr.pop(symbol),
+                self._pipelines.pop(symbol),
+            ):
+                self.deregister_indicator(indicator)
+            del self._wilr[symbol]
+            del self._fibonacci_retracement_levels[symbol]
+            # the sink still finds the chart of the slot while it is flushed
+            self.chart_buffer.release(index)
+            self.journal.release(index)
+            self.sizer.release(index)
+            if self.profiler is not None:
+                self.profiler.release(index)
+            del self.charts[symbol]
+            del self.chart_names[symbol]
+            self.state.remove(symbol)
+            self.pending_removals.discard(symbol)
+
+    def get_sector(self, symbol):
+        """Morningstar sector code of the symbol, None if unknown"""
+        code = MORNINGSTAR_SECTOR_CODES.get(symbol.value)
+        if code is None:
+            fundamentals = getattr(self.securities[symbol], "fundamentals", None)
+            if fundamentals is not None:
+                code = fundamentals.asset_classification.morningstar_sector_code
+        return code or None
+
+    def on_securities_changed(self, changes: SecurityChanges):
+        if not self.dynamic_universe:
+            # the tickers added in initialize, their state exists already
+            return
+        removed = []
+        for security in changes.removed_securities:
+            symbol = security.symbol
+            if self.portfolio[symbol].invested or self.transactions.get_open_orders(
+                symbol
+            ):
+                # keep the indicators until the position is liquidated
+                self.pending_removals.add(symbol)
+            else:
+                removed.append(symbol)
+        # free slots first, they are reused by the added symbols
+        self.remove_symbols(removed)
+        added = [security.symbol for security in changes.added_securities]
+        self.pending_removals.difference_update(added)
+        if added:
+            warm_up_bars = self.add_symbols(added)
+            self.debug(
+                f"Universe: added {len(added)}, removed {len(removed)}, "
+                f"{len(self.state.index)} symbols, {warm_up_bars} warm up bars"
+            )
+
+    def report_initialize_time(self, seconds: float, warm_up_bars: int):
+        # runtime statistics show up in the backtest results so startup can be tracked
+        self.set_runtime_statistic("Initialize [s]", f"{seconds:.2f}")
+        self.debug(
+            f"Initialized {len(self.state.index)} symbols in {seconds:.2f}s, "
+            f"{warm_up_bars} warm up bars"
+        )
+
+    def apply_config(self, config: StrategyConfig):
+        self.config = config
+        # entry window and flatten minute of every trading date, exchange time
+        self.calendar = SessionCalendar(config, algorithm_time_zone=str(self.time_zone))
+        self.session = None
+        self.state.set_divergence_band(
+            config.close_vwap_div_threshold, config.max_vwap_divergence_percent
+        )
 
-    def warm_up_indicator(self, symbol, periods: int, indicators: List[Indicator]):
-        history = self.history[TradeBar](
-            symbol=symbol, periods=periods, resolution=Resolution.Minute
+    def reload_config(self) -> bool:
+        """
+        Swap in a new config when the parameters changed, e.g. in a live deployment.
+        Invalid parameters keep the current config running.
+        """
+        try:
+            config = StrategyConfig.from_parameters(self.get_parameter)
+        except ValueError as error:
+            self.error(f"Keeping the strategy config: {error}")
+            return False
+        if config == self.config:
+            return False
+        self.apply_config(config)
+        self.debug(f"Reloaded {config}")
+        return True
+
+    def save_checkpoint(self) -> int:
+        """Write the intraday state of every symbol, returns the bytes written"""
+        fibonacci = [
+            self._fibonacci_retracement_levels.get(symbol) for symbol in self.symbols
+        ]
+        ranges = [
+            (
+                (indicator.current_day, indicator.current_high, indicator.current_low)
+                if indicator is not None and indicator.current_day is not None
+                else (None, np.nan, np.nan)
+            )
+            for indicator in fibonacci
+        ]
+        arrays = flatten(
+            {
+                "state": self.state.snapshot(),
+                "journal": self.journal.snapshot(),
+                "brackets": self.brackets.snapshot(),
+                "fibonacci": {
+                    "day": np.array(
+                        [day or np.datetime64("NaT", "D") for day, _, _ in ranges],
+                        dtype="datetime64[D]",
+                    ),
+                    "high": np.array([high for _, high, _ in ranges]),
+                    "low": np.array([low for _, _, low in ranges]),
+                },
+            }
         )
-        for bar in history:
-            for indicator in indicators:
-                indicator.update(bar)
+        arrays["time"] = np.datetime64(self.time, "s")
+        arrays["symbols"] = slot_names(self.symbols)
+        size = write_checkpoint(self.checkpoint_path, arrays)
+        self.last_checkpoint = self.time
+        return size
+
+    def restore_checkpoint(self) -> bool:
+        """
+        Restore a checkpoint of today with the first data, e.g. after a live restart,
+        so no symbol trades a second time. Checkpoints of other days are ignored.
+        """
+        started = perf_counter()
+        try:
+            arrays = read_checkpoint(self.checkpoint_path)
+        except (OSError, ValueError) as error:
+            self.error(f"Ignoring the checkpoint: {error}")
+            return False
+        saved = arrays["time"].item()
+        if saved.date() != self.time.date():
+            self.debug(f"Ignoring the checkpoint of {saved}, it is not from today")
+            return False
+
+        rows, slots = slot_mapping(arrays["symbols"], self.state.index)
+        self.state.restore(component(arrays, "state"), rows, slots)
+        self.journal.restore(component(arrays, "journal"), rows, slots)
+        fibonacci = component(arrays, "fibonacci")
+        for row, slot in zip(rows.tolist(), slots.tolist()):
+            symbol = self.symbols[slot]
+            # the portfolio is the broker's, not the checkpoint's
+            self.state.invested[slot] = self.portfolio[symbol].invested
+            day = fibonacci["day"][row]
+            if not np.isnat(day):
+                self._fibonacci_retracement_levels[symbol].restore(
+                    day.astype(object),
+                    float(fibonacci["high"][row]),
+                    float(fibonacci["low"][row]),
+                )
+        brackets = self.brackets.restore(component(arrays, "brackets"))
+        # the sessions mirrored before the checkpoint are not started again
+        self.previous_day = saved.date()
+        self.last_checkpoint = self.time
+        self.debug(
+            f"Restored the checkpoint of {saved}: {len(slots)} symbols, "
+            f"{brackets} open brackets in {(perf_counter() - started) * 1e3:.1f}ms"
+        )
+        return True
+
+    def reset_traded_today(self):
+        self.state.reset_traded_today()
+        if self.pending_removals:
+            self.remove_symbols(
+                [
+                    symbol
+                    for symbol in self.pending_removals
+                    if not self.portfolio[symbol].invested
+                    and not self.transactions.get_open_orders(symbol)
+                ]
+            )
+        if self.profiler is not None:
+            self.profiler.end_day(self.time.date())
+        if self.checkpoint_path:
+            self.save_checkpoint()
 
-    @staticmethod
-    def is_in_time_frame(current_time: datetime.time) -> bool:
-        return time(18, 0) < current_time < time(21, 0)
+    def is_in_time_frame(self, end_minute: int) -> bool:
+        """`end_minute` is the bar end in minutes since midnight exchange time"""
+        return self.session.in_entry_window(end_minute)
 
     def get_close_vwap_divergence_percent(self, bar, symbol) -> float:
         vwap_value = self._vwap[symbol].current.value
         return (vwap_value - bar.close) / vwap_value * 100
 
     def is_significant(self, close_price_vwap_divergence_percent: float):
+        config = self.config
         if (
-            3
+            config.max_vwap_divergence_percent
             >= abs(close_price_vwap_divergence_percent)
-            >= float(self.get_parameter("close_vwap_div_threshold"))
+            >= config.close_vwap_div_threshold
         ):  # relax to 0.5 to get more values with less tickers for testing
             return True
         return False
 
     def previous_minutes_close_over_ema9(self, symbol) -> bool:
-        for close, ema9 in zip(
-            list(self._close_window[symbol])[1:],
-            list(self._ema9_window[symbol])[1:],
-        ):
-            if close > ema9:
-                return close
-        return False
+        return self.state.previous_close_over_ema9(self.state.index[symbol])
 
     def previous_minutes_close_under_ema9(self, symbol) -> bool:
-        return self.previous_minute_close[symbol] < self._ema9[symbol].previous.price
+        return self.state.previous_close_under_ema9(self.state.index[symbol])
 
     def previous_minutes_close_over_ema9_and_is_new_high(self, bar, symbol):
         if previous_minutes_close_over_ema9 := self.previous_minutes_close_over_ema9(
@@ -174,35 +453,35 @@ class Aron20(QCAlgorithm):
         return False
 
     def is_new_low(self, bar, symbol):
-        return self.previous_minute_close[symbol] > bar.close
+        return self.state.previous_minute_close[self.state.index[symbol]] > bar.close
 
     def get_take_profit_price_long(self, symbol):
-        return self._fibonacci_retracement_levels[symbol]._382.current.value
+        return self._fibonacci_retracement_levels[symbol].level(38.2)
 
     def get_take_profit_price_short(self, symbol):
-        return self._fibonacci_retracement_levels[symbol]._618.current.value
+        return self._fibonacci_retracement_levels[symbol].level(61.8)
 
     def get_stop_loss_price_long(self, symbol, bar):
-        return self._fibonacci_retracement_levels[symbol]._0.current.value - (
+        return self._fibonacci_retracement_levels[symbol].level(0) - (
             2 * self._atr[symbol].current.value
         )
 
     def get_stop_loss_price_short(self, symbol, bar):
-        return self._fibonacci_retracement_levels[symbol]._100.current.value + (
+        return self._fibonacci_retracement_levels[symbol].level(100) + (
             2 * self._atr[symbol].current.value
         )
 
     def stop_loss_has_enough_space_long(self, symbol, bar):
         distance = self.stop_loss_distance_long(symbol, bar)
         return (
-            bar.close + (distance * float(self.get_parameter("crv")))
-        ) <= self._fibonacci_retracement_levels[symbol]._382.current.value
+            bar.close + (distance * self.config.crv)
+        ) <= self._fibonacci_retracement_levels[symbol].level(38.2)
 
     def stop_loss_has_enough_space_short(self, symbol, bar):
         distance = self.stop_loss_distance_short(symbol, bar)
         return (
-            bar.close - (distance * float(self.get_parameter("crv")))
-        ) >= self._fibonacci_retracement_levels[symbol]._618.current.value
+            bar.close - (distance * self.config.crv)
+        ) >= self._fibonacci_retracement_levels[symbol].level(61.8)
 
     def stop_loss_distance_long(self, symbol, bar):
         return bar.close - self.get_stop_loss_price_long(symbol, bar)
@@ -210,208 +489,338 @@ class Aron20(QCAlgorithm):
     def stop_loss_distance_short(self, symbol, bar):
         return self.get_stop_loss_price_short(symbol, bar) - bar.close
 
-    def get_position_size(self, stop_loss_distance):
-        # Risk per trade is 1% of portfolio
-        risk_per_trade = self.portfolio.total_portfolio_value * 0.01
-
-        # Risk per share is the difference between the current price and the stop loss distance
-        risk_per_share = stop_loss_distance
-
-        # Calculate the position size
-        position_size = risk_per_trade / risk_per_share
-
-        return int(position_size)
-
-    def register_oco_orders(self, take_profit_ticket, stop_loss_ticket):
-        # set up order index so we can cancel the opposite once filled
-        self.orders[stop_loss_ticket.order_id] = {
-            "oco_order_id": take_profit_ticket.order_id,
-            "type": "stop_loss",
-        }
-        self.orders[take_profit_ticket.order_id] = {
-            "oco_order_id": stop_loss_ticket.order_id,
-            "type": "take_profit",
-        }
-        return None
-
     def on_end_of_algorithm(self):
-        if self.total_trades > 0:
-            hit_rate = self.winning_trades / self.total_trades
-            self.debug(f"Hit Rate: {hit_rate:.2%}")
+        self.chart_buffer.flush()
+        self.journal.flush()
+        metrics = self.journal.metrics
+        if metrics.trades > 0:
+            self.debug(f"Hit Rate: {metrics.hit_rate:.2%}")
+            for line in metrics.report():
+                self.log(line)
+        for line in self.brackets.latency_report():
+            self.log(line)
+        if self.profiler is not None:
+            self.profiler.end_day(self.time.date())
+            for line in self.profiler.report():
+                self.log(line)
 
     def on_data(self, data):
-        current_time = self.time.time()
-
-        for symbol in self.symbols:
-            if symbol not in data.Bars or symbol in self.traded_today:
-                continue
-
-            bar = data.Bars[symbol]
-            self._close_window[symbol].add(bar.close)
-            self._ema9_window[symbol].add(self._ema9[symbol].current.value)
+        if self.checkpoint_pending:
+            self.checkpoint_pending = False
+            self.restore_checkpoint()
+        now = self.time
+        state = self.state
+        profiler = self.profiler
+        if profiler is not None:
+            started = profiler.start()
+
+        today = now.date()
+        if today != self.previous_day:
+            if self.previous_day is not None:
+                state.start_session()
+            self.previous_day = today
+        session = self.session
+        if session is None or session.day != today:
+            session = self.session = self.calendar.session(today)
+        if self.checkpoint_path and (
+            self.last_checkpoint is None
+            or self.time - self.last_checkpoint >= self.checkpoint_interval
+        ):
+            self.save_checkpoint()
 
-            if not self.is_in_time_frame(current_time):
-                self.update_previous_minute_values(symbol, bar)
+        # one pass over the bars, everything after works on arrays of them
+        slots = state.index
+        universe_update = (
+            None if self.universe_model is None else self.universe_model.update
+        )
+        received, received_indices, prices = [], [], []
+        for symbol, bar in data.Bars.items():
+            index = slots.get(symbol)
+            if index is None:
                 continue
+            received.append((index, symbol, bar))
+            received_indices.append(index)
+            prices.append((bar.high, bar.low, bar.close, bar.volume))
+            if universe_update is not None:
+                # keeps the volume windows of the universe current between selections
+                universe_update(symbol, bar, now)
+        if not received:
+            return
+        received_indices = np.array(received_indices, dtype=np.int64)
+        highs, lows, closes, volumes = np.array(prices, dtype=np.float64).T
+        # intraday VWAP, range and entry bands of every symbol in one call
+        state.update_session(received_indices, highs, lows, closes, volumes)
+        # adverse and favorable excursions of the open trades
+        self.journal.update_excursions(received_indices, highs, lows)
+        active = np.flatnonzero(~state.traded_today[received_indices])
+        if not len(active):
+            return
+        indices = received_indices[active]
+        highs, lows, closes = highs[active], lows[active], closes[active]
+        active = active.tolist()
+        # one vectorized update of the close over EMA9 tracker of every active symbol
+        ema9 = self._ema9
+        state.update_ema9_tracker(
+            indices,
+            closes,
+            [ema9[received[position][1]].current.value for position in active],
+        )
+        if profiler is not None:
+            started = profiler.lap(profiler.WINDOWS, profiler.ALL_SYMBOLS, started)
+            profiler.count(profiler.BARS, indices)
 
-            if self.portfolio[symbol].invested:
-                self.plot_trade(symbol, bar)
+        in_time_frame = self.is_in_time_frame(
+            now.hour * 60 + now.minute - session.algorithm_offset
+        )
+        if profiler is not None:
+            started = profiler.lap(profiler.TIME_FRAME, profiler.ALL_SYMBOLS, started)
+
+        submitted = 0
+        if in_time_frame:
+            # only symbols whose close is in an entry band or that are invested
+            candidates = state.entry_candidates(indices, closes)
+            if profiler is not None:
+                profiler.lap(profiler.CANDIDATES, profiler.ALL_SYMBOLS, started)
+            for position in candidates.tolist():
+                self.check_entry(*received[active[position]])
+            if self.pending_entries:
+                submitted = self.submit_entries()
+
+        state.update_previous_minute_values(indices, closes, highs, lows)
+        if submitted and self.checkpoint_path:
+            # a restart before the next periodic checkpoint would enter them again
+            self.save_checkpoint()
+
+    def check_entry(self, index, symbol, bar):
+        profiler = self.profiler
+        if profiler is not None:
+            started = profiler.start()
+            profiler.count(profiler.CHECKED, index)
+
+        invested = self.portfolio[symbol].invested
+        if invested:
+            self.plot_trade(index, symbol, bar)
+            if profiler is not None:
+                started = profiler.lap(profiler.PLOT, index, started)
+                profiler.count(profiler.PLOTS, index)
+
+        close_vwap_divergence_percent = self.get_close_vwap_divergence_percent(
+            bar, symbol
+        )
+        significant = self.is_significant(close_vwap_divergence_percent)
+        if profiler is not None:
+            started = profiler.lap(profiler.VWAP_DIVERGENCE, index, started)
+        if not significant:
+            if profiler is not None:
+                profiler.count(profiler.NOT_SIGNIFICANT, index)
+            return
+
+        # long
+        vwap_is_above_50er_fibo = self._vwap[
+            symbol
+        ].current.value > self._fibonacci_retracement_levels[symbol].level(50)
+        # long
+        close_is_below_23er_fibo = bar.close < self._fibonacci_retracement_levels[
+            symbol
+        ].level(23.6)
+        # short
+        close_is_above_78er_fibo = bar.close > self._fibonacci_retracement_levels[
+            symbol
+        ].level(78.6)
 
-            close_vwap_divergence_percent = self.get_close_vwap_divergence_percent(
-                bar, symbol
+        long_setup = (
+            vwap_is_above_50er_fibo
+            and close_vwap_divergence_percent > 0
+            and close_is_below_23er_fibo
+            and self.stop_loss_has_enough_space_long(symbol, bar)
+        )
+        short_setup = not long_setup and (
+            not vwap_is_above_50er_fibo
+            and close_vwap_divergence_percent < 0
+            and close_is_above_78er_fibo
+            and self.stop_loss_has_enough_space_short(symbol, bar)
+        )
+        if profiler is not None:
+            started = profiler.lap(profiler.FIBONACCI, index, started)
+
+        if long_setup:
+            if profiler is not None:
+                profiler.count(profiler.LONG_SETUPS, index)
+            enter = (
+                not invested
+                and self.previous_minutes_close_over_ema9_and_is_new_high(bar, symbol)
+                and (self._wilr[symbol].current.value < self.config.wilr_long_threshold)
             )
-
-            # long
-            vwap_is_above_50er_fibo = (
-                self._vwap[symbol].current.value
-                > self._fibonacci_retracement_levels[symbol]._50.current.value
+        elif short_setup:
+            if profiler is not None:
+                profiler.count(profiler.SHORT_SETUPS, index)
+            enter = (
+                self.previous_minutes_close_under_ema9(symbol)
+                and self.is_new_low(bar, symbol)
+                and (
+                    self._wilr[symbol].current.value > self.config.wilr_short_threshold
+                )
+                and not invested
+            )
+        else:
+            return
+        if profiler is not None:
+            started = profiler.lap(profiler.EMA9_SCAN, index, started)
+        if not enter:
+            return
+
+        if long_setup:
+            self.enter_long(index, symbol, bar)
+        else:
+            self.enter_short(index, symbol, bar)
+        self.state.traded_today[index] = True
+        if profiler is not None:
+            started = profiler.lap(profiler.ORDERS, index, started)
+            profiler.count(profiler.ENTRIES, index)
+
+        self.plot_trade(index, symbol, bar)
+        if profiler is not None:
+            profiler.lap(profiler.PLOT, index, started)
+            profiler.count(profiler.PLOTS, index)
+
+    def enter_long(self, index, symbol, bar):
+        # queued, submit_entries sizes the entries of the minute together
+        self.pending_entries.append(
+            (
+                index,
+                symbol,
+                bar,
+                1,
+                self.get_take_profit_price_long(symbol),
+                self.get_stop_loss_price_long(symbol, bar),
             )
-            # long
-            close_is_below_23er_fibo = (
-                bar.close
-                < self._fibonacci_retracement_levels[symbol]._236.current.value
+        )
+
+    def enter_short(self, index, symbol, bar):
+        self.pending_entries.append(
+            (
+                index,
+                symbol,
+                bar,
+                -1,
+                self.get_take_profit_price_short(symbol),
+                self.get_stop_loss_price_short(symbol, bar),
             )
-            # short
-            close_is_above_78er_fibo = (
-                bar.close
-                > self._fibonacci_retracement_levels[symbol]._786.current.value
+        )
+
+    def submit_entries(self) -> int:
+        """
+        Size the queued entries on one portfolio snapshot under the risk limits and
+        submit them as brackets, entries that don't fit are dropped. Returns the
+        number of submitted brackets.
+        """
+        profiler = self.profiler
+        if profiler is not None:
+            started = profiler.start()
+        entries, self.pending_entries = self.pending_entries, []
+        portfolio = self.portfolio
+        invested = np.flatnonzero(self.state.invested)
+        snapshot = self.sizer.snapshot(
+            portfolio.total_portfolio_value,
+            invested,
+            [portfolio[self.symbols[index]].holdings_value for index in invested],
+        )
+        # risking risk_per_trade of the portfolio on the stop distance
+        quantities = self.sizer.size(
+            snapshot,
+            [index for index, *_ in entries],
+            [bar.close for _, _, bar, *_ in entries],
+            [
+                side * (bar.close - stop_loss)
+                for _, _, bar, side, _, stop_loss in entries
+            ],
+            self.config.risk_per_trade,
+        )
+        submitted = 0
+        for (index, symbol, bar, side, take_profit, stop_loss), quantity in zip(
+            entries, quantities.tolist()
+        ):
+            if not quantity:
+                continue
+            self.journal_entry(symbol, bar, side, take_profit, stop_loss)
+            # market entry with the exits attached
+            self.brackets.submit(
+                symbol, side * quantity, take_profit=take_profit, stop_loss=stop_loss
             )
+            submitted += 1
+        if profiler is not None:
+            profiler.lap(profiler.ORDERS, profiler.ALL_SYMBOLS, started)
+        return submitted
+
+    def journal_entry(self, symbol, bar, side, take_profit, stop_loss):
+        # before the submission, backtest market orders fill synchronously
+        self.journal.open(
+            self.state.index[symbol],
+            side,
+            take_profit,
+            stop_loss,
+            vwap_divergence=self.get_close_vwap_divergence_percent(bar, symbol),
+            atr=self._atr[symbol].current.value,
+            wilr=self._wilr[symbol].current.value,
+            fibonacci_levels=self._fibonacci_retracement_levels[symbol].levels,
+        )
 
-            if self.is_significant(close_vwap_divergence_percent):
-
-                if (
-                    vwap_is_above_50er_fibo
-                    and close_vwap_divergence_percent > 0
-                    and close_is_below_23er_fibo
-                    and self.stop_loss_has_enough_space_long(symbol, bar)
-                ):
-
-                    if (
-                        not self.portfolio[symbol].invested
-                        and self.previous_minutes_close_over_ema9_and_is_new_high(
-                            bar, symbol
-                        )
-                        and (self._wilr[symbol].current.value < -90)
-                    ):
-                        self.market_order(
-                            symbol=symbol,
-                            quantity=self.get_position_size(
-                                self.stop_loss_distance_long(symbol, bar)
-                            ),
-                        )  # enter with market order with 1% portfolio
-                        self.traded_today[symbol] = True
-                        # register take profit
-                        take_profit_ticket = self.LimitOrder(
-                            symbol,
-                            -self.Portfolio[symbol].Quantity,
-                            self.get_take_profit_price_long(symbol),
-                        )
-                        # register stop loss
-                        stop_loss_ticket = self.StopMarketOrder(
-                            symbol,
-                            -self.Portfolio[symbol].Quantity,
-                            self.get_stop_loss_price_long(symbol, bar),
-                        )
-                        self.register_oco_orders(take_profit_ticket, stop_loss_ticket)
-                        self.plot_trade(symbol=symbol, bar=bar)
-                elif (
-                    not vwap_is_above_50er_fibo
-                    and close_vwap_divergence_percent < 0
-                    and close_is_above_78er_fibo
-                    and self.stop_loss_has_enough_space_short(symbol, bar)
-                ):
-
-                    if (
-                        self.previous_minutes_close_under_ema9(symbol)
-                        and self.is_new_low(bar, symbol)
-                        and (self._wilr[symbol].current.value > -10)
-                        and not self.portfolio[symbol].invested
-                    ):
-                        self.market_order(
-                            symbol=symbol,
-                            quantity=-self.get_position_size(
-                                self.stop_loss_distance_short(symbol, bar)
-                            ),
-                        )
-
-                        self.traded_today[symbol] = True
-
-                        # register take profit
-                        take_profit_ticket = self.LimitOrder(
-                            symbol,
-                            -self.Portfolio[symbol].Quantity,
-                            self.get_take_profit_price_short(symbol),
-                        )
-                        # register stop loss
-                        stop_loss_ticket = self.StopMarketOrder(
-                            symbol,
-                            -self.Portfolio[symbol].Quantity,
-                            self.get_stop_loss_price_short(symbol, bar),
-                        )
-                        self.register_oco_orders(take_profit_ticket, stop_loss_ticket)
-
-                        self.plot_trade(symbol=symbol, bar=bar)
-
-            self.update_previous_minute_values(symbol, bar)
-
-    def update_previous_minute_values(self, symbol, bar):
-        self.previous_minute_close[symbol] = bar.close
-        self.previous_minute_high[symbol] = bar.high
-        self.previous_minute_low[symbol] = bar.low
-
-    def plot_trade(self, symbol, bar):
-        self.plot(chart=self.chart_names[symbol], series="Price", bar=bar)
-        self.plot(
-            chart=self.chart_names[symbol],
-            series="VWAP",
-            value=self._vwap[symbol].current.value,
-        )
-        self.plot(
-            chart=self.chart_names[symbol],
-            series="EMA9",
-            value=self._ema9[symbol].current.value,
-        )
-        self.plot(
-            chart=self.chart_names[symbol],
-            series="FIBO-100",
-            value=self._fibonacci_retracement_levels[symbol]._100.current.value,
-        )
-        self.plot(
-            chart=self.chart_names[symbol],
-            series="FIBO-618",
-            value=self._fibonacci_retracement_levels[symbol]._618.current.value,
-        )
-        self.plot(
-            chart=self.chart_names[symbol],
-            series="FIBO-50",
-            value=self._fibonacci_retracement_levels[symbol]._50.current.value,
-        )
-        self.plot(
-            chart=self.chart_names[symbol],
-            series="FIBO-382",
-            value=self._fibonacci_retracement_levels[symbol]._382.current.value,
-        )
-        self.plot(
-            chart=self.chart_names[symbol],
-            series="FIBO-0",
-            value=self._fibonacci_retracement_levels[symbol]._0.current.value,
+    def plot_trade(self, index, symbol, bar):
+        fibonacci = self._fibonacci_retracement_levels[symbol]
+        return self.chart_buffer.record(
+            index,
+            self.utc_time,
+            bar.open,
+            bar.high,
+            bar.low,
+            bar.close,
+            (
+                self._vwap[symbol].current.value,
+                self._ema9[symbol].current.value,
+                fibonacci.level(100),
+                fibonacci.level(61.8),
+                fibonacci.level(50),
+                fibonacci.level(38.2),
+                fibonacci.level(0),
+            ),
         )
 
+    def add_chart_points(self, index, series, times, values):
+        # sink of the chart buffer, adds the points with the time they were taken at
+        chart_series = self.charts[self.symbols[index]].series[series]
+        if series == ChartBuffer.PRICE:
+            for point_time, (open_, high, low, close) in zip(times, values.tolist()):
+                chart_series.add_point(point_time, open_, high, low, close)
+        else:
+            for point_time, value in zip(times, values.tolist()):
+                chart_series.add_point(point_time, value)
+
     def on_order_event(self, order_event: OrderEvent):
-        if order_event.status == OrderStatus.FILLED:
-            if (order := self.orders.get(order_event.order_id)) is not None:  # exit
-                self.transactions.cancel_order(order["oco_order_id"])
-                if order["type"] == "take_profit":
-                    self.winning_trades += 1
-                self.plot(
-                    chart=self.chart_names[order_event.symbol],
-                    series="Exit",
-                    value=order_event.fill_price,
-                )
-            else:  # plot entry
-                self.total_trades += 1
-                self.plot(
-                    chart=self.chart_names[order_event.symbol],
-                    series="Entry",
-                    value=order_event.fill_price,
-                )
+        # cancels or resizes the sibling legs of the order's bracket
+        leg = self.brackets.on_order_event(order_event)
+        if order_event.status not in (
+            OrderStatus.FILLED,
+            OrderStatus.PARTIALLY_FILLED,
+        ):
+            return
+        index = self.state.index.get(order_event.symbol)
+        if index is None:
+            return
+        # invested symbols are always entry candidates, they get plotted
+        self.state.invested[index] = self.portfolio[order_event.symbol].invested
+        kind = leg.kind if leg is not None else None
+        self.journal.fill(
+            index,
+            self.utc_time,
+            order_event.fill_quantity,
+            order_event.fill_price,
+            self.EXIT_REASONS.get(kind, LIQUIDATION),
+        )
+        if order_event.status != OrderStatus.FILLED:
+            return
+        self.chart_buffer.mark(
+            index,
+            "Entry" if kind == BracketLeg.ENTRY else "Exit",
+            self.utc_time,
+            order_event.fill_price,
+        )
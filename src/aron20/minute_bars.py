@@ -0,0 +1,207 @@
+import io
+import os
+import zipfile
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+
+# regular US equity session in exchange time, minutes since midnight
+MARKET_OPEN_MINUTE = 9 * 60 + 30
+MARKET_CLOSE_MINUTE = 16 * 60
+MINUTES_PER_SESSION = MARKET_CLOSE_MINUTE - MARKET_OPEN_MINUTE
+MINUTES_PER_DAY = 24 * 60
+
+# LEAN stores equity prices as deci-cents
+LEAN_PRICE_SCALE = 10000.0
+
+
+@dataclass
+class MinuteBars:
+    """
+    Minute OHLCV for several symbols on one shared timeline.
+
+    The timeline is the concatenation of every trading day's open minutes, so all
+    price arrays have the shape (n_symbols, n_bars). Minutes a symbol did not trade
+    are fill-forwarded from its previous close with zero volume, the same way LEAN
+    fill-forwards subscriptions. Leading minutes before a symbol's first trade are
+    back-filled and flagged as unavailable.
+    """
+
+    symbols: list
+    dates: np.ndarray  # datetime64[D], one per trading day
+    day_offsets: np.ndarray  # int64, n_days + 1 timeline offsets of each day
+    minute: np.ndarray  # int16, bar start in minutes since midnight exchange time
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    available: np.ndarray  # bool, False for back-filled leading bars
+
+    @property
+    def n_symbols(self) -> int:
+        return len(self.symbols)
+
+    @property
+    def n_bars(self) -> int:
+        return self.minute.shape[0]
+
+    @property
+    def n_days(self) -> int:
+        return self.dates.shape[0]
+
+    @property
+    def day(self) -> np.ndarray:
+        """Day index of every bar on the timeline"""
+        return np.repeat(
+            np.arange(self.n_days, dtype=np.int32), np.diff(self.day_offsets)
+        )
+
+    def symbol_index(self, symbol: str) -> int:
+        return self.symbols.index(symbol)
+
+    @classmethod
+    def from_day_grids(cls, symbols, dates, minutes_per_day, grids):
+        """
+        Build the panel from per-day grids.
+
+        `grids` is a list with one (5, n_symbols, n_minutes) array per day holding
+        open, high, low, close and volume, NaN where a symbol has no bar.
+        """
+        day_offsets = np.zeros(len(dates) + 1, dtype=np.int64)
+        day_offsets[1:] = np.cumsum([len(m) for m in minutes_per_day])
+        minute = (
+            np.concatenate(minutes_per_day).astype(np.int16)
+            if minutes_per_day
+            else np.zeros(0, dtype=np.int16)
+        )
+        if grids:
+            panel = np.concatenate(grids, axis=2)
+        else:
+            panel = np.full((5, len(symbols), 0), np.nan)
+        return cls.from_panel(symbols, dates, day_offsets, minute, panel)
+
+    @classmethod
+    def from_timeline(cls, symbols, times, panel):
+        """
+        Build the panel from sorted bar start times in minutes since the epoch,
+        exchange time, and a (5, n_symbols, n_bars) array like `from_panel` takes.
+        """
+        times = np.asarray(times, dtype=np.int64)
+        days = times // MINUTES_PER_DAY
+        starts = np.flatnonzero(np.diff(days, prepend=days[:1] - 1))
+        day_offsets = np.append(starts, len(times)).astype(np.int64)
+        return cls.from_panel(
+            symbols,
+            days[starts].astype("datetime64[D]"),
+            day_offsets,
+            (times % MINUTES_PER_DAY).astype(np.int16),
+            panel,
+        )
+
+    @classmethod
+    def from_panel(cls, symbols, dates, day_offsets, minute, panel):
+        """
+        `panel` holds open, high, low, close and volume as (5, n_symbols, n_bars),
+        NaN where a symbol has no bar. The gaps are filled as described above.
+        """
+        open_, high, low, close, volume = panel
+        traded = ~np.isnan(close)
+
+        # fill forward the last traded close into the gaps
+        positions = np.where(traded, np.arange(close.shape[1]), -1)
+        np.maximum.accumulate(positions, axis=1, out=positions)
+        available = positions >= 0
+        # back fill leading gaps with the first traded bar so indicators stay finite
+        first = np.argmax(traded, axis=1)
+        positions = np.where(available, positions, first[:, None])
+        filled_close = np.take_along_axis(close, positions, axis=1)
+
+        gaps = ~traded
+        open_ = np.where(gaps, filled_close, open_)
+        high = np.where(gaps, filled_close, high)
+        low = np.where(gaps, filled_close, low)
+        volume = np.where(gaps, 0.0, volume)
+
+        return cls(
+            symbols=list(symbols),
+            dates=np.asarray(dates, dtype="datetime64[D]"),
+            day_offsets=day_offsets,
+            minute=minute,
+            open=open_,
+            high=high,
+            low=low,
+            close=filled_close,
+            volume=volume,
+            available=available,
+        )
+
+
+def lean_minute_trade_path(data_folder: str, ticker: str, day: date) -> str:
+    return os.path.join(
+        data_folder,
+        "equity",
+        "usa",
+        "minute",
+        ticker.lower(),
+        f"{day:%Y%m%d}_trade.zip",
+    )
+
+
+def read_lean_minute_trade_file(path: str) -> np.ndarray:
+    """
+    Read one LEAN minute trade zip into a (n, 6) array of
+    minute-of-day, open, high, low, close, volume.
+    """
+    with zipfile.ZipFile(path) as archive:
+        raw = archive.read(archive.namelist()[0])
+    if not raw.strip():
+        return np.zeros((0, 6))
+    rows = np.loadtxt(io.BytesIO(raw), delimiter=",", ndmin=2)
+    rows[:, 0] = rows[:, 0] // 60000
+    rows[:, 1:5] /= LEAN_PRICE_SCALE
+    return rows
+
+
+def load_lean_minute_bars(
+    data_folder: str, tickers: list, start: date, end: date
+) -> MinuteBars:
+    """
+    Load regular-session minute bars for `tickers` between `start` and `end`
+    (inclusive) from a LEAN data folder into one MinuteBars panel.
+
+    Prices are read raw, i.e. without LEAN's factor-file adjustment.
+    """
+    dates = []
+    minutes_per_day = []
+    grids = []
+    day = start
+    while day <= end:
+        rows_per_symbol = []
+        for ticker in tickers:
+            path = lean_minute_trade_path(data_folder, ticker, day)
+            rows = (
+                read_lean_minute_trade_file(path)
+                if os.path.exists(path)
+                else np.zeros((0, 6))
+            )
+            in_session = (rows[:, 0] >= MARKET_OPEN_MINUTE) & (
+                rows[:, 0] < MARKET_CLOSE_MINUTE
+            )
+            rows_per_symbol.append(rows[in_session])
+
+        if any(len(rows) for rows in rows_per_symbol):
+            session_minutes = np.unique(
+                np.concatenate([rows[:, 0] for rows in rows_per_symbol])
+            ).astype(np.int64)
+            grid = np.full((5, len(tickers), len(session_minutes)), np.nan)
+            for symbol_index, rows in enumerate(rows_per_symbol):
+                columns = np.searchsorted(session_minutes, rows[:, 0].astype(np.int64))
+                grid[:, symbol_index, columns] = rows[:, 1:].T
+            dates.append(day)
+            minutes_per_day.append(session_minutes)
+            grids.append(grid)
+        day += timedelta(days=1)
+
+    return MinuteBars.from_day_grids(tickers, dates, minutes_per_day, grids)
@@ -0,0 +1,304 @@
+"""
+Grid search over the Aron20 parameters on top of the signal engine.
+
+Bars and the parameter independent indicators are computed once, copied into a
+single shared memory segment and mapped by every worker of a process pool, so each
+grid point only pays for its entry masks and exit resolution.
+"""
+
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from exit_simulator import ExitRules, liquidation_bars, simulate_exits
+from indicator_cache import IndicatorCache
+from minute_bars import MinuteBars
+from signal_engine import (
+    Entries,
+    Indicators,
+    compute_indicators,
+    entry_window_mask,
+    find_entries,
+)
+from strategy_config import DEFAULT_CONFIG, PARAMETER_NAMES, StrategyConfig
+from trade_journal import LIQUIDATION, STOP_LOSS, TAKE_PROFIT
+
+# Aron20.initialize default
+STARTING_CASH = 100000
+
+
+@dataclass
+class Trades:
+    """Resolved exits for a set of entries"""
+
+    entries: Entries
+    quantity: np.ndarray
+    exit_bar: np.ndarray
+    exit_price: np.ndarray
+    exit_reason: np.ndarray
+
+    @property
+    def pnl(self) -> np.ndarray:
+        return (
+            self.entries.side * self.quantity * (self.exit_price - self.entries.price)
+        )
+
+
+@dataclass
+class SweepResult:
+    parameters: dict
+    trades: int
+    hit_rate: float
+    pnl: float
+    max_drawdown: float
+
+
+def expand_grid(grid: dict) -> list:
+    """{"crv": [1, 2], "close_vwap_div_threshold": [0.5]} -> one dict per combination"""
+    names = list(grid)
+    unknown = set(names) - set(PARAMETER_NAMES)
+    if unknown:
+        raise ValueError(f"unknown strategy parameters {sorted(unknown)}")
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+def position_size(
+    entries: Entries,
+    portfolio_value: float = STARTING_CASH,
+    risk_per_trade: float = DEFAULT_CONFIG.risk_per_trade,
+):
+    """Aron20's risk based size of every entry on a fixed portfolio value, uncapped"""
+    risk_per_share = np.abs(entries.price - entries.stop_loss)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        quantity = (portfolio_value * risk_per_trade) / risk_per_share
+    return np.nan_to_num(quantity, nan=0.0, posinf=0.0).astype(np.int64)
+
+
+def resolve_exits(
+    bars: MinuteBars,
+    entries: Entries,
+    flatten_bars=None,
+    risk_per_trade: float = DEFAULT_CONFIG.risk_per_trade,
+    rules: ExitRules = ExitRules(),
+) -> Trades:
+    """
+    Exits of the entries' take profit limits, stop market orders and the end of
+    day liquidation, see exit_simulator. With the default rules the take profit
+    wins when both trigger on a bar as it was submitted first.
+    """
+    exits = simulate_exits(
+        bars,
+        entries.symbol,
+        entries.bar,
+        entries.side,
+        entries.take_profit,
+        entries.stop_loss,
+        flatten_bars,
+        rules,
+    )
+    return Trades(
+        entries=entries,
+        quantity=position_size(entries, risk_per_trade=risk_per_trade),
+        exit_bar=exits.bar,
+        exit_price=exits.price,
+        exit_reason=exits.reason,
+    )
+
+
+def summarize(parameters: dict, trades: Trades) -> SweepResult:
+    """Hit rate as Aron20.on_end_of_algorithm reports it, P&L and max drawdown"""
+    traded = trades.quantity > 0
+    pnl = trades.pnl[traded]
+    order = np.argsort(trades.exit_bar[traded], kind="stable")
+    equity = np.cumsum(pnl[order])
+    peak = np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:]
+    n_trades = int(traded.sum())
+    winning = int((trades.exit_reason[traded] == TAKE_PROFIT).sum())
+    return SweepResult(
+        parameters=parameters,
+        trades=n_trades,
+        hit_rate=winning / n_trades if n_trades else 0.0,
+        pnl=float(equity[-1]) if n_trades else 0.0,
+        max_drawdown=float((peak - equity).max()) if n_trades else 0.0,
+    )
+
+
+def evaluate(
+    bars: MinuteBars,
+    indicators: Indicators,
+    in_window: np.ndarray,
+    flatten_bars: np.ndarray,
+    parameters: dict,
+) -> SweepResult:
+    """
+    Entries and exits of one grid point. `in_window` is the mask of the default
+    entry window, grid points that move the window get their own.
+    """
+    config = StrategyConfig.from_parameters(parameters.get)
+    if config.entry_window_minutes != DEFAULT_CONFIG.entry_window_minutes:
+        in_window = None
+    entries = find_entries(bars, indicators, config, in_window=in_window)
+    return summarize(
+        parameters,
+        resolve_exits(bars, entries, flatten_bars, config.risk_per_trade),
+    )
+
+
+class SharedBarStore:
+    """
+    Bars, indicators and the gating arrays of a sweep packed into one shared memory
+    segment. Workers attach by name and get zero-copy views instead of pickled copies.
+    """
+
+    def __init__(self, bars: MinuteBars, indicators: Indicators = None):
+        if indicators is None:
+            indicators = compute_indicators(bars)
+        arrays = {
+            f"bars.{field.name}": getattr(bars, field.name)
+            for field in fields(MinuteBars)
+            if isinstance(getattr(bars, field.name), np.ndarray)
+        }
+        arrays.update(
+            {
+                f"indicators.{field.name}": getattr(indicators, field.name)
+                for field in fields(Indicators)
+            }
+        )
+        arrays["in_window"] = entry_window_mask(bars)
+        arrays["flatten_bars"] = liquidation_bars(bars)
+
+        layout = {}
+        offset = 0
+        for name, array in arrays.items():
+            # keep every array 64 byte aligned
+            offset = -(-offset // 64) * 64
+            layout[name] = (offset, array.shape, array.dtype.str)
+            offset += array.nbytes
+        self.memory = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for name, array in arrays.items():
+            start, shape, dtype = layout[name]
+            view = np.ndarray(shape, dtype=dtype, buffer=self.memory.buf, offset=start)
+            view[...] = array
+        self.descriptor = (self.memory.name, layout, list(bars.symbols))
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def attach(descriptor):
+        """Map a store created in another process, returns (memory, views)"""
+        name, layout, symbols = descriptor
+        try:
+            # the creating process owns the segment's lifetime
+            memory = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:  # Python < 3.13
+            memory = shared_memory.SharedMemory(name=name)
+        views = {
+            key: np.ndarray(shape, dtype=dtype, buffer=memory.buf, offset=start)
+            for key, (start, shape, dtype) in layout.items()
+        }
+        bars = MinuteBars(
+            symbols=symbols,
+            **{
+                key.split(".", 1)[1]: view
+                for key, view in views.items()
+                if key.startswith("bars.")
+            },
+        )
+        indicators = Indicators(
+            **{
+                key.split(".", 1)[1]: view
+                for key, view in views.items()
+                if key.startswith("indicators.")
+            }
+        )
+        return memory, (bars, indicators, views["in_window"], views["flatten_bars"])
+
+
+# per worker process state, set up once by _init_worker
+_worker_memory = None
+_worker_views = None
+
+
+def _init_worker(descriptor):
+    global _worker_memory, _worker_views
+    _worker_memory, _worker_views = SharedBarStore.attach(descriptor)
+
+
+def _evaluate_in_worker(parameters: dict) -> SweepResult:
+    return evaluate(*_worker_views, parameters)
+
+
+def run_parameter_sweep(
+    bars: MinuteBars,
+    grid: dict,
+    max_workers: int = None,
+    chunksize: int = 1,
+    indicator_cache: IndicatorCache = None,
+) -> list:
+    """
+    Evaluate every combination of `grid` across a process pool. The indicators
+    are read from `indicator_cache` if given.
+    """
+    points = expand_grid(grid)
+    indicators = None
+    if indicator_cache is not None:
+        indicators = indicator_cache.indicators(bars)
+    with SharedBarStore(bars, indicators) as store:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(store.descriptor,),
+        ) as pool:
+            return list(pool.map(_evaluate_in_worker, points, chunksize=chunksize))
+
+
+if __name__ == "__main__":
+    import argparse
+    from datetime import date
+    from time import perf_counter
+
+    from bar_store import load_minute_bars
+    from tickers import get_tickers_list_as_string
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("source", help="bar store or LEAN data folder")
+    parser.add_argument("start", type=date.fromisoformat)
+    parser.add_argument("end", type=date.fromisoformat)
+    parser.add_argument(
+        "--close-vwap-div-threshold", type=float, nargs="+", default=[0.5, 1.0, 1.5]
+    )
+    parser.add_argument("--crv", type=float, nargs="+", default=[1.0, 1.5, 2.0])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--indicator-cache", help="folder of the indicator cache")
+    args = parser.parse_args()
+
+    minute_bars = load_minute_bars(
+        args.source, get_tickers_list_as_string(), args.start, args.end
+    )
+    started = perf_counter()
+    results = run_parameter_sweep(
+        minute_bars,
+        {"close_vwap_div_threshold": args.close_vwap_div_threshold, "crv": args.crv},
+        max_workers=args.workers,
+        indicator_cache=(
+            IndicatorCache(args.indicator_cache) if args.indicator_cache else None
+        ),
+    )
+    for result in sorted(results, key=lambda result: result.pnl, reverse=True):
+        print(
+            f"{result.parameters}: {result.trades} trades, "
+            f"hit rate {result.hit_rate:.2%}, P&L {result.pnl:.2f}, "
+            f"max drawdown {result.max_drawdown:.2f}"
+        )
+    print(f"{len(results)} grid points in {perf_counter() - started:.2f}s")
@@ -0,0 +1,168 @@
+"""
+Risk based sizing of all entries of a time slice under portfolio wide caps.
+
+Every entry risks `risk_per_trade` of the portfolio value on its stop distance, as
+`Aron20.get_position_size` did per entry. The entries of one minute are sized
+together from one PortfolioSnapshot and are then cut down, in the order given, to
+the caps of RiskLimits: the exposure per sector, the gross exposure and then the
+number of concurrent positions, which only entries left with shares count against.
+Symbols trade with SecurityMarginModel.NULL, so these caps are the only limit on
+the leverage.
+"""
+
+from dataclasses import dataclass, fields
+from numbers import Real
+
+import numpy as np
+
+UNKNOWN_SECTOR = -1
+
+
+@dataclass(frozen=True)
+class RiskLimits:
+    # gross exposure as a multiple of the portfolio value
+    max_gross_exposure: float = float("inf")
+    # gross exposure of one sector as a multiple of the portfolio value
+    max_sector_exposure: float = float("inf")
+    max_positions: float = float("inf")
+
+    def __post_init__(self):
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if not isinstance(value, Real) or isinstance(value, bool):
+                raise ValueError(f"{field.name} must be a number")
+            if not value > 0:
+                raise ValueError(f"{field.name} must be positive")
+
+    @classmethod
+    def from_parameters(cls, get_parameter) -> "RiskLimits":
+        """Like StrategyConfig.from_parameters, missing limits are unlimited"""
+        values = {}
+        for field in fields(cls):
+            raw = get_parameter(field.name)
+            if raw is None or raw == "":
+                continue
+            try:
+                values[field.name] = float(raw)
+            except (TypeError, ValueError):
+                raise ValueError(f"invalid {field.name} parameter {raw!r}") from None
+        return cls(**values)
+
+
+@dataclass(frozen=True)
+class PortfolioSnapshot:
+    total_value: float
+    gross_exposure: float
+    # gross exposure per sector id
+    sector_exposure: np.ndarray
+    positions: int
+
+
+class PositionSizer:
+    """
+    Sizes entries by symbol slot, like SymbolStateStore's. Each slot has a sector,
+    slots of an unknown sector are only held to the gross exposure cap.
+    """
+
+    def __init__(self, capacity: int, limits: RiskLimits = RiskLimits()):
+        self.limits = limits
+        self.sector = np.full(capacity, UNKNOWN_SECTOR, dtype=np.int64)
+        # sector name -> id
+        self.sector_ids = {}
+
+    def set_sector(self, index: int, sector: str = None) -> None:
+        self.sector[index] = (
+            UNKNOWN_SECTOR
+            if sector is None
+            else self.sector_ids.setdefault(sector, len(self.sector_ids))
+        )
+
+    def release(self, index: int) -> None:
+        self.sector[index] = UNKNOWN_SECTOR
+
+    def snapshot(self, total_value: float, indices, holdings_values):
+        """
+        Portfolio state the entries of a time slice are sized on, from the
+        holdings value of every invested slot
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        exposure = np.abs(np.asarray(holdings_values, dtype=np.float64))
+        sectors = self.sector[indices]
+        known = sectors != UNKNOWN_SECTOR
+        return PortfolioSnapshot(
+            total_value=float(total_value),
+            gross_exposure=float(exposure.sum()),
+            sector_exposure=np.bincount(
+                sectors[known], weights=exposure[known], minlength=len(self.sector_ids)
+            ),
+            positions=int(np.count_nonzero(exposure)),
+        )
+
+    def size(
+        self,
+        snapshot: PortfolioSnapshot,
+        indices,
+        prices,
+        stop_distances,
+        risk_per_trade: float,
+    ) -> np.ndarray:
+        """Unsigned share quantities of the entries, 0 for entries that don't fit"""
+        indices = np.asarray(indices, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        stop_distances = np.asarray(stop_distances, dtype=np.float64)
+        limits = self.limits
+        with np.errstate(divide="ignore", invalid="ignore"):
+            quantity = np.trunc(snapshot.total_value * risk_per_trade / stop_distances)
+        quantity = np.where(np.isfinite(quantity) & (quantity > 0), quantity, 0.0)
+
+        notional = quantity * prices
+        if np.isfinite(limits.max_sector_exposure):
+            sectors = self.sector[indices]
+            known = sectors != UNKNOWN_SECTOR
+            budgets = limits.max_sector_exposure * snapshot.total_value - np.pad(
+                snapshot.sector_exposure,
+                (0, len(self.sector_ids) - len(snapshot.sector_exposure)),
+            )
+            notional[known] = _fill_budgets(
+                notional[known], budgets[sectors[known]], sectors[known]
+            )
+        if np.isfinite(limits.max_gross_exposure):
+            budget = (
+                limits.max_gross_exposure * snapshot.total_value
+                - snapshot.gross_exposure
+            )
+            notional = _fill_budgets(
+                notional, np.full(len(notional), budget), np.zeros(len(notional))
+            )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fitting = np.floor(notional / prices)
+        fitting = np.where(np.isfinite(fitting), fitting, 0.0)
+        quantity = np.minimum(quantity, fitting).astype(np.int64)
+
+        # the first entries that still get shares take the free position slots
+        sized = quantity > 0
+        free = limits.max_positions - snapshot.positions
+        quantity[sized & (np.cumsum(sized) > free)] = 0
+        return quantity
+
+
+def _fill_budgets(notional, budgets, groups) -> np.ndarray:
+    """
+    Notional each entry gets when the entries of a group take their group's budget
+    in order, the entry that exhausts it gets what is left.
+    """
+    if not len(notional):
+        return notional
+    order = np.argsort(groups, kind="stable")
+    sorted_groups = groups[order]
+    sorted_notional = notional[order]
+    spent = np.cumsum(sorted_notional)
+    # notional of the same group's earlier entries
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    group_spent = (spent - sorted_notional) - (spent - sorted_notional)[
+        np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    ]
+    allowed = np.clip(budgets[order] - group_spent, 0.0, sorted_notional)
+    result = np.empty_like(notional)
+    result[order] = allowed
+    return result
@@ -0,0 +1,228 @@
+"""
+Bootstrap and trade order permutation analysis of Aron20's trades.
+
+The hit rate `on_end_of_algorithm` prints is measured on a single path. Resampling
+the journaled trades shows how much it, the expectancy and the max drawdown could
+have varied:
+
+    bootstrap       draw as many trades with replacement
+    permutation     the same trades in random order, only the drawdown changes
+
+Resamples are drawn as (resamples, trades) index matrices and evaluated with one
+gather and cumulative sum per chunk, chunks run across a process pool. Every chunk
+only returns fixed size histograms of its metrics, which are added to the totals as
+they arrive, and only a few chunks per worker are in flight, so memory doesn't grow
+with the number of resamples. Take profit counts are exact, expectancy and drawdown are
+binned over their possible range with a resolution of 1 / HISTOGRAM_BINS of it.
+
+Every chunk gets its own seed spawned from `seed`, the result doesn't depend on the
+number of workers.
+"""
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+
+import numpy as np
+
+from trade_journal import TAKE_PROFIT
+
+BOOTSTRAP = "bootstrap"
+PERMUTATION = "permutation"
+METHODS = (BOOTSTRAP, PERMUTATION)
+# resampled trades per chunk, bounds the temporary matrices
+CHUNK_ELEMENTS = 1 << 20
+HISTOGRAM_BINS = 1 << 14
+# submitted but unfinished chunks per worker, keeps the workers busy
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+
+@dataclass(frozen=True)
+class Interval:
+    low: float
+    median: float
+    high: float
+
+
+@dataclass
+class RobustnessReport:
+    method: str
+    resamples: int
+    confidence: float
+    trades: int
+    hit_rate: Interval
+    expectancy: Interval
+    max_drawdown: Interval
+
+    def report(self) -> list:
+        level = f"{self.confidence:.0%}"
+        return [
+            f"{self.method}: {self.resamples} resamples of {self.trades} trades, "
+            f"{level} intervals",
+            f"hit rate {self.hit_rate.low:.2%} .. {self.hit_rate.high:.2%} "
+            f"(median {self.hit_rate.median:.2%})",
+            f"expectancy {self.expectancy.low:.2f} .. {self.expectancy.high:.2f} "
+            f"(median {self.expectancy.median:.2f})",
+            f"max drawdown {self.max_drawdown.low:.2f} .. "
+            f"{self.max_drawdown.high:.2f} (median {self.max_drawdown.median:.2f})",
+        ]
+
+
+def trades_from_journal(columns: dict) -> tuple:
+    """P&L and take profit flags of the journaled trades in exit order"""
+    order = np.argsort(columns["exit_time"], kind="stable")
+    return columns["pnl"][order], columns["exit_reason"][order] == TAKE_PROFIT
+
+
+def draw_indices(method: str, rng, resamples: int, n_trades: int) -> np.ndarray:
+    """(resamples, n_trades) trade indices of one chunk"""
+    if method == BOOTSTRAP:
+        return rng.integers(0, n_trades, (resamples, n_trades))
+    return np.argsort(rng.random((resamples, n_trades)), axis=1)
+
+
+def resample_metrics(pnl, take_profit, indices) -> tuple:
+    """Take profits, expectancy and max drawdown of every row of `indices`"""
+    take_profits = take_profit[indices].sum(axis=1)
+    equity = np.cumsum(pnl[indices], axis=1)
+    expectancy = equity[:, -1] / indices.shape[1]
+    # the equity starts at zero, like parameter_sweep.summarize
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), 0.0)
+    max_drawdown = (peak - equity).max(axis=1)
+    return take_profits, expectancy, max_drawdown
+
+
+def run_robustness(
+    pnl,
+    take_profit,
+    resamples: int = 10000,
+    method: str = BOOTSTRAP,
+    confidence: float = 0.95,
+    seed: int = 0,
+    max_workers: int = None,
+) -> RobustnessReport:
+    pnl = np.asarray(pnl, dtype=np.float64)
+    take_profit = np.asarray(take_profit, dtype=bool)
+    n_trades = len(pnl)
+    if n_trades == 0:
+        raise ValueError("no trades to resample")
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}")
+    if resamples <= 0:
+        raise ValueError("resamples must be positive")
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+
+    # no resample can leave these ranges
+    ranges = np.array([[pnl.min(), pnl.max()], [0.0, n_trades * max(-pnl.min(), 0.0)]])
+    chunk_size = max(1, CHUNK_ELEMENTS // n_trades)
+    sizes = [
+        min(chunk_size, resamples - start) for start in range(0, resamples, chunk_size)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    take_profit_counts = np.zeros(n_trades + 1, dtype=np.int64)
+    metric_counts = np.zeros((2, HISTOGRAM_BINS), dtype=np.int64)
+    workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(pnl, take_profit, method, ranges),
+    ) as pool:
+        chunks = iter(zip(sizes, seeds))
+        pending = set()
+        while True:
+            for size, chunk_seed in chunks:
+                pending.add(pool.submit(_histograms_in_worker, size, chunk_seed))
+                if len(pending) >= workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk_take_profits, chunk_metrics = future.result()
+                take_profit_counts += chunk_take_profits
+                metric_counts += chunk_metrics
+
+    tail = (1 - confidence) / 2
+    quantiles = np.array([tail, 0.5, 1 - tail])
+    hit_rate = _quantile_bins(take_profit_counts, quantiles) / n_trades
+    # bin centers, a zero width range holds a single value
+    low, high = ranges.T
+    width = (high - low) / HISTOGRAM_BINS
+    expectancy, max_drawdown = (
+        low[metric]
+        + (_quantile_bins(metric_counts[metric], quantiles) + 0.5) * width[metric]
+        for metric in range(2)
+    )
+    if method == PERMUTATION:
+        # every order has the same trades
+        hit_rate[:] = take_profit.mean()
+        expectancy[:] = pnl.mean()
+    return RobustnessReport(
+        method=method,
+        resamples=resamples,
+        confidence=confidence,
+        trades=n_trades,
+        hit_rate=Interval(*hit_rate.tolist()),
+        expectancy=Interval(*expectancy.tolist()),
+        max_drawdown=Interval(*max_drawdown.tolist()),
+    )
+
+
+def _quantile_bins(counts, quantiles) -> np.ndarray:
+    """Bin holding each quantile of the histogram"""
+    cumulative = np.cumsum(counts)
+    # rank of the value, rounded since e.g. 0.025 * 3000 is a bit above 75
+    ranks = np.maximum(np.ceil(np.round(quantiles * cumulative[-1], 6)), 1)
+    return np.searchsorted(cumulative, ranks).astype(np.float64)
+
+
+# per worker process state, set up once by _init_worker
+_worker_arguments = None
+
+
+def _init_worker(*arguments):
+    global _worker_arguments
+    _worker_arguments = arguments
+
+
+def _histograms_in_worker(size: int, seed) -> tuple:
+    pnl, take_profit, method, ranges = _worker_arguments
+    n_trades = len(pnl)
+    indices = draw_indices(method, np.random.default_rng(seed), size, n_trades)
+    take_profits, *metrics = resample_metrics(pnl, take_profit, indices)
+    metric_counts = np.empty((2, HISTOGRAM_BINS), dtype=np.int64)
+    for row, (values, (low, high)) in enumerate(zip(metrics, ranges)):
+        scale = HISTOGRAM_BINS / (high - low) if high > low else 0.0
+        bins = np.clip(((values - low) * scale).astype(np.int64), 0, HISTOGRAM_BINS - 1)
+        metric_counts[row] = np.bincount(bins, minlength=HISTOGRAM_BINS)
+    return np.bincount(take_profits, minlength=n_trades + 1), metric_counts
+
+
+if __name__ == "__main__":
+    import argparse
+    from time import perf_counter
+
+    from trade_journal import load_journal
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("journal", help="trade journal directory")
+    parser.add_argument("--resamples", type=int, default=10000)
+    parser.add_argument("--method", choices=METHODS, default=BOOTSTRAP)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    started = perf_counter()
+    result = run_robustness(
+        *trades_from_journal(load_journal(args.journal)),
+        resamples=args.resamples,
+        method=args.method,
+        confidence=args.confidence,
+        seed=args.seed,
+        max_workers=args.workers,
+    )
+    for line in result.report():
+        print(line)
+    print(f"in {perf_counter() - started:.2f}s")
@@ -0,0 +1,136 @@
+"""
+US equity session calendar of Aron20 in exchange time.
+
+The entry window is configured in algorithm time, Berlin, but the US session moves
+against Berlin time in the weeks only one side has switched daylight saving time.
+The calendar anchors the window to the exchange session: it is converted with the
+standard offset of both time zones, so the default 18:00 to 21:00 always means
+12:00 to 15:00 in New York. Positions are flattened FLATTEN_MINUTES_BEFORE_CLOSE
+before the close, which is 13:00 on the NYSE early closes.
+
+Everything is precomputed per trading date as minutes since midnight exchange time,
+gating a bar is an integer comparison of its end minute with its session's.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from minute_bars import MARKET_CLOSE_MINUTE, MARKET_OPEN_MINUTE
+from strategy_config import DEFAULT_CONFIG, StrategyConfig
+
+EXCHANGE_TIME_ZONE = "America/New_York"
+ALGORITHM_TIME_ZONE = "Europe/Berlin"
+EARLY_CLOSE_MINUTE = 13 * 60
+# the scheduled liquidation, before the close
+FLATTEN_MINUTES_BEFORE_CLOSE = 5
+
+
+def is_early_close(day: date) -> bool:
+    """
+    NYSE closes at 13:00 on July 3rd and December 24th from Monday to Thursday
+    and on the day after Thanksgiving.
+    """
+    if (day.month, day.day) in ((7, 3), (12, 24)):
+        return day.weekday() < 4
+    # the fourth Thursday of November is between the 22nd and the 28th
+    return day.month == 11 and day.weekday() == 4 and 23 <= day.day <= 29
+
+
+def algorithm_time_offsets(
+    dates: np.ndarray,
+    exchange_time_zone: str = EXCHANGE_TIME_ZONE,
+    algorithm_time_zone: str = ALGORITHM_TIME_ZONE,
+) -> np.ndarray:
+    """Minutes to add to exchange time to get algorithm time, per trading day"""
+    exchange = ZoneInfo(exchange_time_zone)
+    algorithm = ZoneInfo(algorithm_time_zone)
+    offsets = np.empty(len(dates), dtype=np.int64)
+    for index, day in enumerate(np.asarray(dates).astype(object)):
+        offsets[index] = _offsets(day, exchange, algorithm)[0]
+    return offsets
+
+
+def _offsets(day: date, exchange: ZoneInfo, algorithm: ZoneInfo) -> tuple:
+    """Current and standard, i.e. without daylight saving, minutes between the zones"""
+    # the offset only moves on weekend nights, midday is representative
+    moment = datetime(day.year, day.month, day.day, 12, tzinfo=exchange)
+    local = moment.astimezone(algorithm)
+    current = local.utcoffset() - moment.utcoffset()
+    standard = current - (local.dst() or timedelta()) + (moment.dst() or timedelta())
+    return int(current.total_seconds()) // 60, int(standard.total_seconds()) // 60
+
+
+@dataclass(frozen=True)
+class Session:
+    """Minutes since midnight exchange time of one trading date"""
+
+    day: date
+    open_minute: int
+    close_minute: int
+    flatten_minute: int
+    # bar end minutes strictly between them are in the entry window
+    entry_start_minute: int
+    entry_end_minute: int
+    # minutes to add to exchange time to get algorithm time
+    algorithm_offset: int
+
+    def in_entry_window(self, end_minute: int) -> bool:
+        return self.entry_start_minute < end_minute < self.entry_end_minute
+
+
+class SessionCalendar:
+    def __init__(
+        self,
+        config: StrategyConfig = DEFAULT_CONFIG,
+        exchange_time_zone: str = EXCHANGE_TIME_ZONE,
+        algorithm_time_zone: str = ALGORITHM_TIME_ZONE,
+    ):
+        self.entry_window_minutes = config.entry_window_minutes
+        self.exchange_time_zone = ZoneInfo(exchange_time_zone)
+        self.algorithm_time_zone = ZoneInfo(algorithm_time_zone)
+        self._sessions = {}
+
+    def session(self, day: date) -> Session:
+        session = self._sessions.get(day)
+        if session is None:
+            session = self._sessions[day] = self._build(day)
+        return session
+
+    def minutes(self, dates: np.ndarray) -> dict:
+        """Session fields of every date as int64 arrays, for panels of MinuteBars"""
+        sessions = [self.session(day) for day in np.asarray(dates).astype(object)]
+        return {
+            name: np.array(
+                [getattr(session, name) for session in sessions], dtype=np.int64
+            )
+            for name in (
+                "close_minute",
+                "flatten_minute",
+                "entry_start_minute",
+                "entry_end_minute",
+                "algorithm_offset",
+            )
+        }
+
+    def _build(self, day: date) -> Session:
+        offset, standard_offset = _offsets(
+            day, self.exchange_time_zone, self.algorithm_time_zone
+        )
+        close_minute = (
+            EARLY_CLOSE_MINUTE if is_early_close(day) else MARKET_CLOSE_MINUTE
+        )
+        flatten_minute = close_minute - FLATTEN_MINUTES_BEFORE_CLOSE
+        start_minute, end_minute = self.entry_window_minutes
+        return Session(
+            day=day,
+            open_minute=MARKET_OPEN_MINUTE,
+            close_minute=close_minute,
+            flatten_minute=flatten_minute,
+            entry_start_minute=start_minute - standard_offset,
+            # no entries the liquidation would close right away
+            entry_end_minute=min(end_minute - standard_offset, flatten_minute),
+            algorithm_offset=offset,
+        )
@@ -0,0 +1,365 @@
+"""
+LEAN-free replay of the Aron20 entry logic over MinuteBars panels.
+
+Every indicator and condition `Aron20.on_data` evaluates bar by bar is computed here
+for all symbols and days at once, so parameter sweeps don't need a full backtest.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from minute_bars import MinuteBars
+from session_calendar import SessionCalendar
+from strategy_config import DEFAULT_CONFIG, StrategyConfig
+
+# same periods Aron20.initialize uses
+EMA_PERIOD = 9
+WILR_PERIOD = 180
+ATR_PERIOD = 14
+# the close window holds 10 bars, on_data looks at all but the current one
+EMA9_LOOKBACK = 9
+
+# the exponential smoothers are evaluated in blocks of this many bars
+_SMOOTHING_BLOCK = 128
+
+
+@dataclass
+class Indicators:
+    """Indicator series aligned with a MinuteBars panel, each (n_symbols, n_bars)"""
+
+    vwap: np.ndarray
+    ema9: np.ndarray
+    wilr: np.ndarray
+    atr: np.ndarray
+    # the daily range the Fibonacci levels are currently drawn from
+    fibonacci_low: np.ndarray
+    fibonacci_high: np.ndarray
+
+    def fibonacci(self, level: float) -> np.ndarray:
+        """Fibonacci level in percent of the daily range, e.g. 61.8"""
+        return self.fibonacci_low + (level / 100) * (
+            self.fibonacci_high - self.fibonacci_low
+        )
+
+
+@dataclass
+class Entries:
+    """
+    Entries Aron20 takes, at most one per symbol and day.
+
+    The masks are (n_symbols, n_bars); the flat arrays list one entry each,
+    ordered by bar and then symbol.
+    """
+
+    long: np.ndarray
+    short: np.ndarray
+    symbol: np.ndarray
+    bar: np.ndarray
+    side: np.ndarray  # 1 long, -1 short
+    price: np.ndarray
+    take_profit: np.ndarray
+    stop_loss: np.ndarray
+
+    def __len__(self):
+        return self.bar.shape[0]
+
+
+def _smooth(values: np.ndarray, period: int, alpha: float) -> np.ndarray:
+    """
+    Exponential smoothing y[t] = y[t-1] + alpha * (x[t] - y[t-1]) along the time axis,
+    seeded with the running simple average of the first `period` values the way
+    LEAN's EMA and Wilder averages are.
+    """
+    n_symbols, n_bars = values.shape
+    out = np.empty_like(values, dtype=np.float64)
+    seed = min(period, n_bars)
+    out[:, :seed] = np.cumsum(values[:, :seed], axis=1) / np.arange(1, seed + 1)
+    if n_bars <= seed:
+        return out
+
+    # unroll the recursion over a block so it becomes one matrix product:
+    # y[s+j] = decay^(j+1) * y[s-1] + sum_{i<=j} alpha * decay^(j-i) * x[s+i]
+    decay = 1.0 - alpha
+    steps = np.arange(_SMOOTHING_BLOCK)
+    exponent = steps[None, :] - steps[:, None]
+    weights = np.where(exponent >= 0, alpha * decay ** np.maximum(exponent, 0), 0.0)
+    carry = decay ** (steps + 1)
+
+    previous = out[:, seed - 1]
+    for start in range(seed, n_bars, _SMOOTHING_BLOCK):
+        stop = min(start + _SMOOTHING_BLOCK, n_bars)
+        width = stop - start
+        block = (
+            values[:, start:stop] @ weights[:width, :width]
+            + previous[:, None] * carry[:width]
+        )
+        out[:, start:stop] = block
+        previous = block[:, -1]
+    return out
+
+
+def _rolling_extreme(values: np.ndarray, window: int, maximum: bool) -> np.ndarray:
+    """
+    Sliding max or min over the last `window` values including the current one,
+    using the van Herk/Gil-Werman block decomposition. The first bars use the
+    shorter window that is available, like a LEAN indicator that is not ready yet.
+    """
+    n_symbols, n_bars = values.shape
+    reduce = np.maximum if maximum else np.minimum
+    neutral = -np.inf if maximum else np.inf
+    # repeating the first value doesn't change any extreme that already contains it
+    padded_length = n_bars + window - 1
+    n_blocks = -(-padded_length // window)
+    padded = np.full((n_symbols, n_blocks * window), neutral)
+    padded[:, : window - 1] = values[:, :1]
+    padded[:, window - 1 : padded_length] = values
+
+    blocks = padded.reshape(n_symbols, n_blocks, window)
+    prefix = reduce.accumulate(blocks, axis=2).reshape(n_symbols, -1)
+    suffix = reduce.accumulate(blocks[:, :, ::-1], axis=2)[:, :, ::-1].reshape(
+        n_symbols, -1
+    )
+    return reduce(suffix[:, :n_bars], prefix[:, window - 1 : window - 1 + n_bars])
+
+
+def intraday_vwap(bars: MinuteBars) -> np.ndarray:
+    """LEAN's IntradayVwap: typical price weighted by volume, reset every day"""
+    typical = (bars.high + bars.low + bars.close) / 3
+    price_volume = np.cumsum(typical * bars.volume, axis=1)
+    volume = np.cumsum(bars.volume, axis=1)
+    # cumulative sums up to the end of the previous day
+    day_starts = bars.day_offsets[:-1]
+    before = day_starts - 1
+    base_price_volume = np.where(before >= 0, price_volume[:, before], 0.0)
+    base_volume = np.where(before >= 0, volume[:, before], 0.0)
+    day = bars.day
+    price_volume -= base_price_volume[:, day]
+    volume -= base_volume[:, day]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(volume > 0, price_volume / volume, typical)
+
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    return _smooth(values, period, 2.0 / (period + 1))
+
+
+def average_true_range(bars: MinuteBars, period: int) -> np.ndarray:
+    """LEAN's AverageTrueRange with its default Wilder smoothing"""
+    previous_close = np.empty_like(bars.close)
+    previous_close[:, 0] = np.nan
+    previous_close[:, 1:] = bars.close[:, :-1]
+    true_range = np.fmax(
+        bars.high - bars.low,
+        np.fmax(np.abs(bars.high - previous_close), np.abs(bars.low - previous_close)),
+    )
+    return _smooth(true_range, period, 1.0 / period)
+
+
+def williams_percent_r(bars: MinuteBars, period: int) -> np.ndarray:
+    highest = _rolling_extreme(bars.high, period, maximum=True)
+    lowest = _rolling_extreme(bars.low, period, maximum=False)
+    price_range = highest - lowest
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(
+            price_range == 0, 0.0, -100 * (highest - bars.close) / price_range
+        )
+
+
+def daily_fibonacci_range(bars: MinuteBars):
+    """
+    Running daily high/low the FibonacciRetracementIndicator draws its levels from.
+
+    Like the indicator, the levels keep their previous values while the day's high
+    equals its low. Before the first usable range they are NaN.
+    """
+    high = np.empty_like(bars.high)
+    low = np.empty_like(bars.low)
+    for start, stop in zip(bars.day_offsets[:-1], bars.day_offsets[1:]):
+        np.maximum.accumulate(bars.high[:, start:stop], axis=1, out=high[:, start:stop])
+        np.minimum.accumulate(bars.low[:, start:stop], axis=1, out=low[:, start:stop])
+
+    updated = high != low
+    positions = np.where(updated, np.arange(bars.n_bars), -1)
+    np.maximum.accumulate(positions, axis=1, out=positions)
+    has_range = positions >= 0
+    positions = np.maximum(positions, 0)
+    low = np.where(has_range, np.take_along_axis(low, positions, axis=1), np.nan)
+    high = np.where(has_range, np.take_along_axis(high, positions, axis=1), np.nan)
+    return low, high
+
+
+def compute_indicators(bars: MinuteBars) -> Indicators:
+    fibonacci_low, fibonacci_high = daily_fibonacci_range(bars)
+    return Indicators(
+        vwap=intraday_vwap(bars),
+        ema9=ema(bars.close, EMA_PERIOD),
+        wilr=williams_percent_r(bars, WILR_PERIOD),
+        atr=average_true_range(bars, ATR_PERIOD),
+        fibonacci_low=fibonacci_low,
+        fibonacci_high=fibonacci_high,
+    )
+
+
+def entry_window_mask(
+    bars: MinuteBars, config: StrategyConfig = DEFAULT_CONFIG
+) -> np.ndarray:
+    """
+    Bars on_data sees inside the trading window of their session. on_data runs at
+    the bar's end time, so a bar starting at 11:59 New York time is seen at 12:00,
+    i.e. 18:00 Berlin time.
+    """
+    sessions = SessionCalendar(config).minutes(bars.dates)
+    end_minute = bars.minute.astype(np.int64) + 1
+    day = bars.day
+    return (sessions["entry_start_minute"][day] < end_minute) & (
+        end_minute < sessions["entry_end_minute"][day]
+    )
+
+
+def find_entries(
+    bars: MinuteBars,
+    indicators: Indicators,
+    config: StrategyConfig,
+    in_window: np.ndarray = None,
+) -> Entries:
+    """
+    Evaluate the Aron20.on_data entry conditions for every symbol and bar.
+    `in_window` is the entry window mask of `config`, computed if not given.
+    """
+    close = bars.close
+    vwap = indicators.vwap
+    ema9 = indicators.ema9
+    atr = indicators.atr
+    n_bars = bars.n_bars
+    if in_window is None:
+        in_window = entry_window_mask(bars, config)
+    crv = config.crv
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        divergence = (vwap - close) / vwap * 100
+    distance = np.abs(divergence)
+    significant = (config.max_vwap_divergence_percent >= distance) & (
+        distance >= config.close_vwap_div_threshold
+    )
+    tradable = significant & in_window[None, :] & bars.available
+
+    fibonacci_0 = indicators.fibonacci(0)
+    fibonacci_100 = indicators.fibonacci(100)
+    take_profit_long = indicators.fibonacci(38.2)
+    take_profit_short = indicators.fibonacci(61.8)
+    stop_loss_long = fibonacci_0 - 2 * atr
+    stop_loss_short = fibonacci_100 + 2 * atr
+    vwap_is_above_50er_fibo = vwap > indicators.fibonacci(50)
+
+    # most recent of the previous nine closes above their EMA9
+    steps = np.arange(n_bars)
+    over = np.where(close > ema9, steps, -1)
+    np.maximum.accumulate(over, axis=1, out=over)
+    previous_over = np.empty_like(over)
+    previous_over[:, 0] = -1
+    previous_over[:, 1:] = over[:, :-1]
+    recent_over = (previous_over >= 0) & (previous_over >= steps - EMA9_LOOKBACK)
+    close_over_ema9 = np.take_along_axis(close, np.maximum(previous_over, 0), axis=1)
+    is_new_high = recent_over & (close > close_over_ema9)
+
+    long = (
+        tradable
+        & vwap_is_above_50er_fibo
+        & (divergence > 0)
+        & (close < indicators.fibonacci(23.6))
+        & (close + (close - stop_loss_long) * crv <= take_profit_long)
+        & is_new_high
+        & (indicators.wilr < config.wilr_long_threshold)
+    )
+
+    previous_close = np.empty_like(close)
+    previous_close[:, 0] = -np.inf
+    previous_close[:, 1:] = close[:, :-1]
+    previous_ema9 = np.empty_like(ema9)
+    previous_ema9[:, 0] = np.nan
+    previous_ema9[:, 1:] = ema9[:, :-1]
+
+    short = (
+        tradable
+        & ~vwap_is_above_50er_fibo
+        & (divergence < 0)
+        & (close > indicators.fibonacci(78.6))
+        & (close - (stop_loss_short - close) * crv >= take_profit_short)
+        & (previous_close < previous_ema9)
+        & (previous_close > close)
+        & (indicators.wilr > config.wilr_short_threshold)
+    )
+
+    # traded_today: only the first signal of a symbol's day is taken
+    signals = long | short
+    count = np.cumsum(signals, axis=1, dtype=np.int32)
+    before = bars.day_offsets[:-1] - 1
+    count_before_day = np.where(before >= 0, count[:, before], 0)
+    first = signals & (count - count_before_day[:, bars.day] == 1)
+    long &= first
+    short &= first
+
+    bar, symbol = np.nonzero(first.T)
+    side = np.where(long[symbol, bar], 1, -1).astype(np.int8)
+    is_long = side == 1
+    return Entries(
+        long=long,
+        short=short,
+        symbol=symbol,
+        bar=bar,
+        side=side,
+        price=close[symbol, bar],
+        take_profit=np.where(
+            is_long, take_profit_long[symbol, bar], take_profit_short[symbol, bar]
+        ),
+        stop_loss=np.where(
+            is_long, stop_loss_long[symbol, bar], stop_loss_short[symbol, bar]
+        ),
+    )
+
+
+def run_signal_engine(bars: MinuteBars, config: StrategyConfig) -> Entries:
+    return find_entries(bars, compute_indicators(bars), config)
+
+
+if __name__ == "__main__":
+    import argparse
+    from datetime import date
+    from time import perf_counter
+
+    from bar_store import load_minute_bars
+    from indicator_cache import IndicatorCache
+    from tickers import get_tickers_list_as_string
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("source", help="bar store or LEAN data folder")
+    parser.add_argument("start", type=date.fromisoformat)
+    parser.add_argument("end", type=date.fromisoformat)
+    parser.add_argument("--close-vwap-div-threshold", type=float, default=1.0)
+    parser.add_argument("--crv", type=float, default=1.0)
+    parser.add_argument("--indicator-cache", help="folder of the indicator cache")
+    args = parser.parse_args()
+
+    started = perf_counter()
+    minute_bars = load_minute_bars(
+        args.source, get_tickers_list_as_string(), args.start, args.end
+    )
+    loaded = perf_counter()
+    config = StrategyConfig(
+        close_vwap_div_threshold=args.close_vwap_div_threshold, crv=args.crv
+    )
+    if args.indicator_cache:
+        entries = find_entries(
+            minute_bars,
+            IndicatorCache(args.indicator_cache).indicators(minute_bars),
+            config,
+        )
+    else:
+        entries = run_signal_engine(minute_bars, config)
+    finished = perf_counter()
+    print(
+        f"{minute_bars.n_symbols} symbols, {minute_bars.n_days} days: "
+        f"loaded in {loaded - started:.2f}s, "
+        f"{len(entries)} entries in {finished - loaded:.2f}s"
+    )
@@ -0,0 +1,118 @@
+"""
+Binary checkpoints of Aron20's intraday state for fast restarts.
+
+A checkpoint file is a fixed header followed by an uncompressed .npz payload:
+
+    magic       8 bytes     b"ARON20CP"
+    version     uint32      FORMAT_VERSION
+    length      uint64      payload bytes
+    crc32       uint32      of the payload
+
+`read_checkpoint` rejects other magics and versions as well as payloads whose
+length or checksum don't match, e.g. a file truncated by a crash. `write_checkpoint`
+never leaves such a file behind: it writes and syncs a temporary file and renames it
+over the previous checkpoint.
+
+Components save their arrays under their own name, see `flatten` and `component`.
+Per-symbol arrays are saved by slot next to the slots' symbols and matched to the
+slots of the restarted algorithm by symbol with `slot_mapping`.
+"""
+
+import io
+import os
+import struct
+import zlib
+
+import numpy as np
+
+MAGIC = b"ARON20CP"
+# bump whenever a component changes the arrays it saves
+FORMAT_VERSION = 2
+_HEADER = struct.Struct("<8sIQI")
+
+
+def encode_checkpoint(arrays: dict) -> bytes:
+    # no pickled objects, a checkpoint only holds plain arrays
+    for name, array in arrays.items():
+        if np.asarray(array).dtype.hasobject:
+            raise ValueError(f"checkpoint array {name} holds Python objects")
+    payload = io.BytesIO()
+    np.savez(payload, **arrays)
+    payload = payload.getvalue()
+    return (
+        _HEADER.pack(MAGIC, FORMAT_VERSION, len(payload), zlib.crc32(payload)) + payload
+    )
+
+
+def decode_checkpoint(data: bytes) -> dict:
+    if len(data) < _HEADER.size:
+        raise ValueError("checkpoint is truncated")
+    magic, version, length, checksum = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a checkpoint file")
+    if version != FORMAT_VERSION:
+        raise ValueError(
+            f"checkpoint format version {version}, expected {FORMAT_VERSION}"
+        )
+    payload = data[_HEADER.size :]
+    if len(payload) != length or zlib.crc32(payload) != checksum:
+        raise ValueError("checkpoint is corrupt")
+    with np.load(io.BytesIO(payload), allow_pickle=False) as arrays:
+        return {name: arrays[name] for name in arrays.files}
+
+
+def write_checkpoint(path: str, arrays: dict) -> int:
+    """Atomically replace the checkpoint at `path`, returns its size in bytes"""
+    data = encode_checkpoint(arrays)
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    return len(data)
+
+
+def read_checkpoint(path: str) -> dict:
+    with open(path, "rb") as file:
+        return decode_checkpoint(file.read())
+
+
+def flatten(components: dict) -> dict:
+    """{component: {name: array}} as one dict of "component.name" arrays"""
+    return {
+        f"{component_name}.{name}": array
+        for component_name, arrays in components.items()
+        for name, array in arrays.items()
+    }
+
+
+def component(arrays: dict, component_name: str) -> dict:
+    """The arrays `flatten` saved for one component"""
+    prefix = f"{component_name}."
+    return {
+        name[len(prefix) :]: array
+        for name, array in arrays.items()
+        if name.startswith(prefix)
+    }
+
+
+def slot_names(symbols) -> np.ndarray:
+    """Symbols of a slot list as saved, "" for free slots"""
+    return np.array(["" if symbol is None else str(symbol) for symbol in symbols])
+
+
+def slot_mapping(saved_symbols, index: dict) -> tuple:
+    """
+    Rows of the saved slots and the current slots of the symbols in both, as
+    index arrays. `index` maps the current symbols to their slots.
+    """
+    slots_by_name = {str(symbol): slot for symbol, slot in index.items()}
+    pairs = [
+        (row, slots_by_name[name])
+        for row, name in enumerate(saved_symbols.tolist())
+        if name in slots_by_name
+    ]
+    rows = np.array([row for row, _ in pairs], dtype=np.int64)
+    slots = np.array([slot for _, slot in pairs], dtype=np.int64)
+    return rows, slots
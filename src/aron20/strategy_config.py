@@ -0,0 +1,87 @@
+"""
+Typed, immutable snapshot of the Aron20 strategy parameters.
+
+`Aron20.initialize` resolves it once from the algorithm parameters, so the entry
+checks read plain attributes instead of parsing `get_parameter` strings per bar.
+The signal engine and the parameter sweep build the same object from a grid point.
+"""
+
+from dataclasses import dataclass, fields
+from datetime import time
+from numbers import Real
+
+
+@dataclass(frozen=True)
+class StrategyConfig:
+    # close to VWAP divergence in percent an entry needs, at least and at most
+    close_vwap_div_threshold: float = 1.0
+    max_vwap_divergence_percent: float = 3.0
+    # reward to risk the take profit has to leave room for
+    crv: float = 1.0
+    # algorithm-time entry window, both ends exclusive, as on days both time zones
+    # keep the same daylight saving time, see session_calendar
+    entry_window_start: time = time(18, 0)
+    entry_window_end: time = time(21, 0)
+    wilr_long_threshold: float = -90.0
+    wilr_short_threshold: float = -10.0
+    # share of the portfolio value risked per trade
+    risk_per_trade: float = 0.01
+
+    def __post_init__(self):
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if field.type is time:
+                valid = isinstance(value, time)
+            else:
+                valid = isinstance(value, Real) and not isinstance(value, bool)
+            if not valid:
+                raise ValueError(f"{field.name} must be a {field.type.__name__}")
+        if not 0 <= self.close_vwap_div_threshold <= self.max_vwap_divergence_percent:
+            raise ValueError(
+                "close_vwap_div_threshold must be between 0 and "
+                "max_vwap_divergence_percent"
+            )
+        if self.crv < 0:
+            raise ValueError("crv must not be negative")
+        if not self.entry_window_start < self.entry_window_end:
+            raise ValueError("entry_window_start must be before entry_window_end")
+        for name in ("wilr_long_threshold", "wilr_short_threshold"):
+            if not -100 <= getattr(self, name) <= 0:
+                raise ValueError(f"{name} must be between -100 and 0")
+        if not 0 < self.risk_per_trade <= 1:
+            raise ValueError("risk_per_trade must be in (0, 1]")
+
+    @classmethod
+    def from_parameters(cls, get_parameter) -> "StrategyConfig":
+        """
+        Resolve every field from `get_parameter(name)`, e.g. QCAlgorithm.get_parameter
+        or a grid point's `dict.get`. Values may be LEAN's parameter strings, times
+        as "HH:MM". Missing or empty parameters keep their default.
+        """
+        values = {}
+        for field in fields(cls):
+            raw = get_parameter(field.name)
+            if raw is None or raw == "":
+                continue
+            try:
+                if field.type is time:
+                    values[field.name] = (
+                        raw if isinstance(raw, time) else time.fromisoformat(raw)
+                    )
+                else:
+                    values[field.name] = float(raw)
+            except (TypeError, ValueError):
+                raise ValueError(f"invalid {field.name} parameter {raw!r}") from None
+        return cls(**values)
+
+    @property
+    def entry_window_minutes(self) -> tuple:
+        """Entry window ends as minutes since midnight, algorithm time"""
+        return tuple(
+            moment.hour * 60 + moment.minute
+            for moment in (self.entry_window_start, self.entry_window_end)
+        )
+
+
+PARAMETER_NAMES = tuple(field.name for field in fields(StrategyConfig))
+DEFAULT_CONFIG = StrategyConfig()
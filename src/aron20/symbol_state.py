@@ -0,0 +1,260 @@
+import numpy as np
+
+
+class SymbolStateStore:
+    """
+    Per-symbol numeric state of Aron20 as a struct of arrays.
+
+    Every symbol gets a dense integer index into contiguous arrays, so the state of
+    all symbols seen in a minute can be written in one vectorized call instead of a
+    hash lookup per symbol and field. Instead of close/EMA9 windows to scan, the
+    store tracks the most recent close above its EMA9 and how many bars back it
+    is, so the entry checks read it in O(1).
+
+    The store also mirrors each symbol's intraday VWAP and daily range. From them
+    follow the close bands in which an entry can trigger: below the VWAP by the
+    divergence band and under the 23.6 level while the VWAP is above the 50 level
+    for longs, the mirror image around the 78.6 level for shorts. `entry_candidates`
+    only returns the symbols whose close is inside a band or that are invested. The
+    bands are a slightly widened preselection, the exact checks still run on the
+    indicators.
+
+    With a `capacity` beyond the initial symbols the store has free slots, `add`
+    gives a symbol one and `remove` resets and frees it for the next symbol, so a
+    changing universe reuses the arrays. `symbols` holds None for free slots.
+    """
+
+    # age of a close over EMA9 that never happened, far beyond any window
+    _NEVER = 2**62
+    # relative slack on the band edges against rounding differences to the indicators
+    BAND_TOLERANCE = 1e-6
+    # per-slot arrays a checkpoint saves, besides the session mirror
+    CHECKPOINT_ARRAYS = (
+        "previous_minute_close",
+        "previous_minute_high",
+        "previous_minute_low",
+        "traded_today",
+        "over_close",
+        "over_age",
+        "previous_over_close",
+        "previous_over_age",
+        "ema9",
+        "previous_ema9",
+        "invested",
+    )
+    # rows of the session mirror
+    PRICE_VOLUME = 0
+    VOLUME = 1
+    HIGH = 2
+    LOW = 3
+    VWAP = 4
+
+    def __init__(self, symbols, window_size: int = 10, capacity: int = None):
+        """
+        `window_size` is the number of bars, the current one included, the close
+        over EMA9 lookback covers, like the RollingWindows it replaces
+        """
+        symbols = list(symbols)
+        n_symbols = max(len(symbols), capacity or 0)
+        self.symbols = symbols + [None] * (n_symbols - len(symbols))
+        self.index = {symbol: index for index, symbol in enumerate(symbols)}
+        # lowest free slot last
+        self.free_slots = list(range(n_symbols - 1, len(symbols) - 1, -1))
+        self.window_size = window_size
+
+        self.previous_minute_close = np.full(n_symbols, float("-inf"))
+        self.previous_minute_high = np.full(n_symbols, float("-inf"))
+        self.previous_minute_low = np.full(n_symbols, float("inf"))
+        self.traded_today = np.zeros(n_symbols, dtype=bool)
+
+        # most recent close above its EMA9 and its age in bars, 0 for the last bar
+        # added, once including and once excluding the last bar
+        self.over_close = np.zeros(n_symbols)
+        self.over_age = np.full(n_symbols, self._NEVER, dtype=np.int64)
+        self.previous_over_close = np.zeros(n_symbols)
+        self.previous_over_age = np.full(n_symbols, self._NEVER, dtype=np.int64)
+        # EMA9 of the last bar added and of the one before
+        self.ema9 = np.full(n_symbols, np.nan)
+        self.previous_ema9 = np.full(n_symbols, np.nan)
+
+        self.invested = np.zeros(n_symbols, dtype=bool)
+        self.session = np.empty((5, n_symbols))
+        self._clear_session()
+        self.set_divergence_band(0.0, 3.0)
+        # the bands are only trusted once a session was mirrored from its first bar
+        self.sessions_started = 0
+        # symbols added after the first bar of the session, always candidates
+        self.partial_session = np.zeros(n_symbols, dtype=bool)
+        self._session_open = False
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def add(self, symbol) -> int:
+        """Give `symbol` a free slot, returns its index"""
+        if symbol in self.index:
+            return self.index[symbol]
+        if not self.free_slots:
+            raise ValueError(f"no free slot for {symbol}, capacity {len(self)}")
+        index = self.free_slots.pop()
+        self.symbols[index] = symbol
+        self.index[symbol] = index
+        # the mirrors of this session miss the bars before the symbol was added
+        self.partial_session[index] = self._session_open
+        return index
+
+    def remove(self, symbol) -> int:
+        """Reset the slot of `symbol` and free it, returns the index it had"""
+        index = self.index.pop(symbol)
+        self.symbols[index] = None
+        self.previous_minute_close[index] = float("-inf")
+        self.previous_minute_high[index] = float("-inf")
+        self.previous_minute_low[index] = float("inf")
+        self.traded_today[index] = False
+        self.over_close[index] = self.previous_over_close[index] = 0.0
+        self.over_age[index] = self.previous_over_age[index] = self._NEVER
+        self.ema9[index] = self.previous_ema9[index] = np.nan
+        self.invested[index] = False
+        self._clear_session(index)
+        self.partial_session[index] = False
+        self.free_slots.append(index)
+        return index
+
+    def snapshot(self) -> dict:
+        """Arrays of every slot for a checkpoint"""
+        arrays = {name: getattr(self, name).copy() for name in self.CHECKPOINT_ARRAYS}
+        arrays["session"] = self.session.T.copy()
+        arrays["sessions_started"] = np.array(self.sessions_started)
+        return arrays
+
+    def restore(self, arrays: dict, rows, slots) -> None:
+        """Copy the saved `rows` of a snapshot into `slots`"""
+        for name in self.CHECKPOINT_ARRAYS:
+            getattr(self, name)[slots] = arrays[name][rows]
+        self.session[:, slots] = arrays["session"][rows].T
+        # the mirrors miss the bars since the checkpoint
+        self.partial_session[slots] = True
+        self._session_open = True
+        self.sessions_started = max(
+            self.sessions_started, int(arrays["sessions_started"])
+        )
+
+    def update_ema9_tracker(self, indices, closes, ema9s):
+        """Add one close and EMA9 value for each of `indices`"""
+        indices = np.asarray(indices, dtype=np.int64)
+        closes = np.asarray(closes, dtype=np.float64)
+        ema9s = np.asarray(ema9s, dtype=np.float64)
+        over_close = self.over_close[indices]
+        age = self.over_age[indices] + 1
+        self.previous_over_close[indices] = over_close
+        self.previous_over_age[indices] = age
+        over = closes > ema9s
+        self.over_close[indices] = np.where(over, closes, over_close)
+        self.over_age[indices] = np.where(over, 0, age)
+        self.previous_ema9[indices] = self.ema9[indices]
+        self.ema9[indices] = ema9s
+
+    def update_previous_minute_values(self, indices, closes, highs, lows):
+        indices = np.asarray(indices, dtype=np.int64)
+        self.previous_minute_close[indices] = closes
+        self.previous_minute_high[indices] = highs
+        self.previous_minute_low[indices] = lows
+
+    def reset_traded_today(self):
+        self.traded_today[:] = False
+
+    def previous_close_over_ema9(self, index: int):
+        """
+        Most recent close before the last one, within the window, that closed above
+        its EMA9, else False
+        """
+        if self.previous_over_age[index] < self.window_size:
+            return float(self.previous_over_close[index])
+        return False
+
+    def previous_close_under_ema9(self, index: int) -> bool:
+        """Whether the bar before the last one closed below its EMA9"""
+        return bool(self.previous_minute_close[index] < self.previous_ema9[index])
+
+    def set_divergence_band(self, min_percent: float, max_percent: float) -> None:
+        """Close to VWAP divergence in percent that counts as significant"""
+        self.min_divergence_percent = min_percent
+        self.max_divergence_percent = max_percent
+        # band edges as multiples of the VWAP, widened by the tolerance
+        low, high = 1 - self.BAND_TOLERANCE, 1 + self.BAND_TOLERANCE
+        self._long_band = (
+            (1 - max_percent / 100) * low,
+            (1 - min_percent / 100) * high,
+        )
+        self._short_band = (
+            (1 + min_percent / 100) * low,
+            (1 + max_percent / 100) * high,
+        )
+
+    @property
+    def vwap(self) -> np.ndarray:
+        return self.session[self.VWAP]
+
+    def start_session(self) -> None:
+        """Reset the VWAP and range mirrors before the first bar of a day"""
+        self._clear_session()
+        self.sessions_started += 1
+        self.partial_session[:] = False
+        self._session_open = False
+
+    def _clear_session(self, index=slice(None)) -> None:
+        self.session[self.PRICE_VOLUME : self.HIGH, index] = 0.0
+        self.session[self.HIGH, index] = float("-inf")
+        self.session[self.LOW, index] = float("inf")
+        self.session[self.VWAP, index] = np.nan
+
+    def update_session(self, indices, highs, lows, closes, volumes) -> None:
+        """Add one bar per symbol to the VWAP and range mirrors"""
+        indices = np.asarray(indices, dtype=np.int64)
+        highs, lows, closes, volumes = np.array(
+            (highs, lows, closes, volumes), dtype=np.float64
+        )
+        session = self.session[:, indices]
+        typical = (highs + lows + closes) / 3
+        session[self.PRICE_VOLUME] += typical * volumes
+        session[self.VOLUME] += volumes
+        np.maximum(session[self.HIGH], highs, out=session[self.HIGH])
+        np.minimum(session[self.LOW], lows, out=session[self.LOW])
+        volume = session[self.VOLUME]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            session[self.VWAP] = np.where(
+                volume > 0, session[self.PRICE_VOLUME] / volume, typical
+            )
+        self.session[:, indices] = session
+        self._session_open = True
+
+    def entry_candidates(self, indices, closes) -> np.ndarray:
+        """Positions in `indices` of the symbols an entry check can trigger for"""
+        indices = np.asarray(indices, dtype=np.int64)
+        if not self.sessions_started:
+            return np.arange(len(indices))
+        closes = np.asarray(closes, dtype=np.float64)
+        high, low, vwap = self.session[self.HIGH :, indices]
+        price_range = high - low
+        fibonacci_50 = low + 0.5 * price_range
+        tolerance = self.BAND_TOLERANCE
+        long = (
+            (vwap > fibonacci_50 * (1 - tolerance))
+            & (closes >= vwap * self._long_band[0])
+            & (closes <= vwap * self._long_band[1])
+            & (closes <= (low + 0.236 * price_range) * (1 + tolerance))
+        )
+        short = (
+            (vwap <= fibonacci_50 * (1 + tolerance))
+            & (closes >= vwap * self._short_band[0])
+            & (closes <= vwap * self._short_band[1])
+            & (closes >= (low + 0.786 * price_range) * (1 - tolerance))
+        )
+        # without a range the indicator keeps its older levels, anything may trigger
+        return np.flatnonzero(
+            long
+            | short
+            | (price_range <= 0)
+            | self.invested[indices]
+            | self.partial_session[indices]
+        )
@@ -34,3 +34,51 @@ def get_tickers_list_as_string():
         "AAPL",
         "MSFT",
     ]
+
+
+# Morningstar sector codes of the tickers, as in
+# Fundamentals.asset_classification.morningstar_sector_code
+MORNINGSTAR_SECTOR_CODES = {
+    # basic materials
+    "FCX": 101,
+    # consumer cyclical
+    "AMZN": 102,
+    "EBAY": 102,
+    "NKE": 102,
+    "SBUX": 102,
+    "TSLA": 102,
+    # financial services
+    "C": 103,
+    "PYPL": 103,
+    "WFC": 103,
+    # consumer defensive
+    "KO": 205,
+    "WMT": 205,
+    # healthcare
+    "GILD": 206,
+    "MRK": 206,
+    "PFE": 206,
+    # communication services
+    "GOOGL": 308,
+    "META": 308,
+    "TMUS": 308,
+    "WBD": 308,
+    # energy
+    "XOM": 309,
+    # industrials
+    "AAL": 310,
+    "MMM": 310,
+    "UAL": 310,
+    # technology
+    "AAPL": 311,
+    "ADBE": 311,
+    "AMD": 311,
+    "CRM": 311,
+    "CSCO": 311,
+    "INTC": 311,
+    "MSFT": 311,
+    "MU": 311,
+    "ORCL": 311,
+    "QCOM": 311,
+    "STX": 311,
+}
@@ -0,0 +1,378 @@
+"""
+Streaming journal of Aron20's trades with running result metrics.
+
+Open trades live in per-symbol arrays. A finished trade is appended to a columnar
+buffer of fixed capacity that is handed to a sink whenever it is full, so memory
+stays bounded however long the backtest runs. The metrics are updated per trade
+and never need the trades again.
+
+`NpzChunkWriter` is a sink that writes every chunk to its own .npz file of a
+directory, `load_journal` reads them back into one set of columns.
+"""
+
+import os
+
+import numpy as np
+
+# exit reasons, shared with the parameter sweep
+TAKE_PROFIT = 1
+STOP_LOSS = 2
+LIQUIDATION = 3
+
+# name -> (dtype, shape of one row)
+COLUMNS = {
+    # ticker, slot indices are reused when the universe changes
+    "symbol": ("U16", ()),
+    "side": (np.int8, ()),
+    "quantity": (np.float64, ()),
+    "entry_time": ("datetime64[s]", ()),
+    "exit_time": ("datetime64[s]", ()),
+    "entry_price": (np.float64, ()),
+    "exit_price": (np.float64, ()),
+    "take_profit": (np.float64, ()),
+    "stop_loss": (np.float64, ()),
+    "exit_reason": (np.int8, ()),
+    "vwap_divergence": (np.float64, ()),
+    "atr": (np.float64, ()),
+    "wilr": (np.float64, ()),
+    # FibonacciRetracementIndicator.levels, 100 down to 0
+    "fibonacci": (np.float64, (7,)),
+    "pnl": (np.float64, ()),
+    "r_multiple": (np.float64, ()),
+    # worst and best price move per share against and for the trade while open
+    "mae": (np.float64, ()),
+    "mfe": (np.float64, ()),
+}
+
+
+class TradeMetrics:
+    """Running expectancy, R-multiples, excursions and hit rates"""
+
+    def __init__(self):
+        self.trades = 0
+        self.take_profits = 0
+        self.winners = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.r_sum = 0.0
+        self.r_squared_sum = 0.0
+        self.mae_r_sum = 0.0
+        self.mfe_r_sum = 0.0
+        # symbol -> [trades, take profits]
+        self.symbol_counts = {}
+
+    def add(
+        self,
+        symbol: str,
+        pnl: float,
+        risk: float,
+        mae: float,
+        mfe: float,
+        exit_reason: int,
+    ) -> None:
+        """`risk` is the quantity times the stop distance at entry, one R"""
+        self.trades += 1
+        counts = self.symbol_counts.setdefault(symbol, [0, 0])
+        counts[0] += 1
+        if exit_reason == TAKE_PROFIT:
+            self.take_profits += 1
+            counts[1] += 1
+        if pnl > 0:
+            self.winners += 1
+            self.gross_profit += pnl
+        else:
+            self.gross_loss -= pnl
+        if risk > 0:
+            r_multiple = pnl / risk
+            self.r_sum += r_multiple
+            self.r_squared_sum += r_multiple * r_multiple
+            self.mae_r_sum += mae / risk
+            self.mfe_r_sum += mfe / risk
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of trades that hit their take profit"""
+        return self.take_profits / self.trades if self.trades else 0.0
+
+    @property
+    def expectancy(self) -> float:
+        """Average P&L per trade"""
+        if not self.trades:
+            return 0.0
+        return (self.gross_profit - self.gross_loss) / self.trades
+
+    @property
+    def expectancy_r(self) -> float:
+        return self.r_sum / self.trades if self.trades else 0.0
+
+    @property
+    def r_standard_deviation(self) -> float:
+        if self.trades < 2:
+            return 0.0
+        mean = self.r_sum / self.trades
+        variance = (self.r_squared_sum - self.trades * mean * mean) / (self.trades - 1)
+        return max(variance, 0.0) ** 0.5
+
+    def symbol_hit_rates(self) -> dict:
+        return {
+            symbol: take_profits / trades
+            for symbol, (trades, take_profits) in self.symbol_counts.items()
+        }
+
+    def report(self) -> list:
+        if not self.trades:
+            return ["no trades"]
+        lines = [
+            f"trades: {self.trades}, hit rate {self.hit_rate:.2%}, "
+            f"winners {self.winners / self.trades:.2%}",
+            f"expectancy: {self.expectancy:.2f} per trade, "
+            f"{self.expectancy_r:.2f}R (sd {self.r_standard_deviation:.2f}R)",
+            f"profit factor: "
+            + (
+                f"{self.gross_profit / self.gross_loss:.2f}"
+                if self.gross_loss
+                else "inf"
+            ),
+            f"average MAE {self.mae_r_sum / self.trades:.2f}R, "
+            f"MFE {self.mfe_r_sum / self.trades:.2f}R",
+        ]
+        for symbol, hit_rate in sorted(
+            self.symbol_hit_rates().items(), key=lambda item: item[1], reverse=True
+        ):
+            lines.append(f"symbol {symbol}: hit rate {hit_rate:.2%}")
+        return lines
+
+
+class TradeJournal:
+    """
+    One trade per symbol at a time: `open` records the context when the entry is
+    submitted, `fill` books entry and exit fills by their sign and the trade is
+    journaled once the position is flat again. `update_excursions` tracks the
+    price range while trades are open.
+
+    `sink(columns)` gets a dict of column arrays of at most `capacity` trades.
+
+    `symbols` is held by reference, a slot list like SymbolStateStore.symbols
+    names whichever symbol holds the index when its trade closes.
+    """
+
+    def __init__(self, symbols, sink=None, capacity: int = 1024):
+        self.symbols = symbols
+        self.sink = sink
+        self.capacity = capacity
+        self.metrics = TradeMetrics()
+        self.columns = {
+            name: np.empty((capacity,) + shape, dtype=dtype)
+            for name, (dtype, shape) in COLUMNS.items()
+        }
+        self.count = 0
+        self.chunks = 0
+
+        n_symbols = len(self.symbols)
+        self.side = np.zeros(n_symbols, dtype=np.int8)
+        self.take_profit = np.zeros(n_symbols)
+        self.stop_loss = np.zeros(n_symbols)
+        # vwap divergence, atr, wilr, then the Fibonacci levels
+        self.context = np.zeros((n_symbols, 3 + COLUMNS["fibonacci"][1][0]))
+        self.entry_time = [None] * n_symbols
+        self.entry_quantity = np.zeros(n_symbols)
+        self.entry_notional = np.zeros(n_symbols)
+        self.exit_quantity = np.zeros(n_symbols)
+        self.exit_notional = np.zeros(n_symbols)
+        self.highest = np.zeros(n_symbols)
+        self.lowest = np.zeros(n_symbols)
+        self.open_trades = 0
+
+    def open(
+        self,
+        index: int,
+        side: int,
+        take_profit: float,
+        stop_loss: float,
+        vwap_divergence: float,
+        atr: float,
+        wilr: float,
+        fibonacci_levels,
+    ) -> None:
+        """Context of an entry about to be submitted for the symbol at `index`"""
+        self.side[index] = side
+        self.take_profit[index] = take_profit
+        self.stop_loss[index] = stop_loss
+        self.context[index, :3] = vwap_divergence, atr, wilr
+        self.context[index, 3:] = fibonacci_levels
+
+    def fill(
+        self, index: int, time, quantity: float, price: float, exit_reason: int
+    ) -> bool:
+        """Book a fill, returns True when it closed a trade"""
+        side = self.side[index]
+        if side == 0 or quantity == 0:
+            return False
+        if (quantity > 0) == (side > 0):
+            if self.entry_quantity[index] == 0:
+                self.open_trades += 1
+                self.entry_time[index] = time
+                self.highest[index] = self.lowest[index] = price
+            self.entry_quantity[index] += abs(quantity)
+            self.entry_notional[index] += abs(quantity) * price
+            return False
+        if self.entry_quantity[index] == 0:
+            return False
+
+        self.exit_quantity[index] += abs(quantity)
+        self.exit_notional[index] += abs(quantity) * price
+        if self.exit_quantity[index] < self.entry_quantity[index]:
+            return False
+        self._close(index, time, exit_reason)
+        return True
+
+    def update_excursions(self, indices, highs, lows) -> None:
+        """Price range of the latest bars, only matters for symbols in a trade"""
+        if not self.open_trades:
+            return
+        indices = np.asarray(indices, dtype=np.int64)
+        self.highest[indices] = np.maximum(self.highest[indices], highs)
+        self.lowest[indices] = np.minimum(self.lowest[indices], lows)
+
+    def snapshot(self) -> dict:
+        """Open trade arrays of every slot for a checkpoint"""
+        arrays = {
+            name: getattr(self, name).copy()
+            for name in (
+                "side",
+                "take_profit",
+                "stop_loss",
+                "context",
+                "entry_quantity",
+                "entry_notional",
+                "exit_quantity",
+                "exit_notional",
+                "highest",
+                "lowest",
+            )
+        }
+        arrays["entry_time"] = np.array(
+            [
+                np.datetime64("NaT", "s") if time is None else np.datetime64(time, "s")
+                for time in self.entry_time
+            ],
+            dtype="datetime64[s]",
+        )
+        return arrays
+
+    def restore(self, arrays: dict, rows, slots) -> None:
+        """Copy the open trades of the saved `rows` of a snapshot into `slots`"""
+        for name, array in arrays.items():
+            if name != "entry_time":
+                getattr(self, name)[slots] = array[rows]
+        for row, slot in zip(rows.tolist(), slots.tolist()):
+            time = arrays["entry_time"][row]
+            self.entry_time[slot] = None if np.isnat(time) else time.astype(object)
+        self.open_trades = int(np.count_nonzero(self.entry_quantity))
+
+    def release(self, index: int) -> None:
+        """Reset the open trade state of a slot, drops a trade that is not closed"""
+        if self.entry_quantity[index]:
+            self.open_trades -= 1
+        self.side[index] = 0
+        self.entry_quantity[index] = self.entry_notional[index] = 0.0
+        self.exit_quantity[index] = self.exit_notional[index] = 0.0
+        self.entry_time[index] = None
+
+    def _close(self, index: int, time, exit_reason: int) -> None:
+        side = int(self.side[index])
+        quantity = self.entry_quantity[index]
+        entry_price = self.entry_notional[index] / quantity
+        exit_price = self.exit_notional[index] / self.exit_quantity[index]
+        stop_loss = self.stop_loss[index]
+        pnl = side * quantity * (exit_price - entry_price)
+        risk = quantity * abs(entry_price - stop_loss)
+        if side > 0:
+            mae = entry_price - min(self.lowest[index], exit_price)
+            mfe = max(self.highest[index], exit_price) - entry_price
+        else:
+            mae = max(self.highest[index], exit_price) - entry_price
+            mfe = entry_price - min(self.lowest[index], exit_price)
+        symbol = str(self.symbols[index])
+        self.metrics.add(symbol, pnl, risk, mae * quantity, mfe * quantity, exit_reason)
+
+        row = self.count
+        columns = self.columns
+        columns["symbol"][row] = symbol
+        columns["side"][row] = side
+        columns["quantity"][row] = quantity
+        columns["entry_time"][row] = np.datetime64(self.entry_time[index], "s")
+        columns["exit_time"][row] = np.datetime64(time, "s")
+        columns["entry_price"][row] = entry_price
+        columns["exit_price"][row] = exit_price
+        columns["take_profit"][row] = self.take_profit[index]
+        columns["stop_loss"][row] = stop_loss
+        columns["exit_reason"][row] = exit_reason
+        (
+            columns["vwap_divergence"][row],
+            columns["atr"][row],
+            columns["wilr"][row],
+        ) = self.context[index, :3]
+        columns["fibonacci"][row] = self.context[index, 3:]
+        columns["pnl"][row] = pnl
+        columns["r_multiple"][row] = pnl / risk if risk > 0 else np.nan
+        columns["mae"][row] = mae
+        columns["mfe"][row] = mfe
+        self.count += 1
+
+        self.release(index)
+        if self.count == self.capacity:
+            self.flush()
+
+    def flush(self) -> None:
+        """Hand the buffered trades to the sink and start a new chunk"""
+        if not self.count:
+            return
+        if self.sink is not None:
+            self.sink(
+                {name: column[: self.count] for name, column in self.columns.items()}
+            )
+        self.chunks += 1
+        self.count = 0
+
+
+class NpzChunkWriter:
+    """Writes each journal chunk to `<directory>/trades-<n>.npz`"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.chunks = len(chunk_paths(directory))
+
+    def __call__(self, columns: dict) -> None:
+        path = os.path.join(self.directory, f"trades-{self.chunks:06d}.npz")
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as file:
+            np.savez(file, **columns)
+        # readers never see a partly written chunk
+        os.replace(temporary, path)
+        self.chunks += 1
+
+
+def chunk_paths(directory: str) -> list:
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.startswith("trades-") and name.endswith(".npz")
+    )
+
+
+def load_journal(directory: str) -> dict:
+    """All chunks of a journal directory as one dict of columns"""
+    chunks = []
+    for path in chunk_paths(directory):
+        with np.load(path) as chunk:
+            chunks.append({name: chunk[name] for name in chunk.files})
+    return {
+        name: (
+            np.concatenate([chunk[name] for chunk in chunks])
+            if chunks
+            else np.empty((0,) + shape, dtype=dtype)
+        )
+        for name, (dtype, shape) in COLUMNS.items()
+    }
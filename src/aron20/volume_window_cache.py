@@ -0,0 +1,110 @@
+from collections import OrderedDict
+
+import numpy as np
+
+
+class VolumeWindowCache:
+    """
+    Rolling minute volume windows for universe selection, kept across selections.
+
+    Every cached symbol owns a row in one (max_symbols, period) ring buffer. Rows are
+    filled from history once and then rolled forward from arriving bars, so a symbol
+    only needs another history request once its window is older than the caller
+    accepts. When the cache is full the least recently used symbol is evicted.
+    """
+
+    def __init__(self, period: int, max_symbols: int = 2000):
+        self.period = period
+        self.max_symbols = max_symbols
+        self.volumes = np.full((max_symbols, period), np.nan)
+        self.head = np.full(max_symbols, period - 1, dtype=np.int64)
+        self.updated_at = [None] * max_symbols
+        # symbol -> row, least recently used first
+        self.slots = OrderedDict()
+        self.free_slots = list(range(max_symbols - 1, -1, -1))
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, symbol):
+        return symbol in self.slots
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def statistics(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate,
+            "symbols": len(self.slots),
+        }
+
+    def lookup(self, symbol, since=None):
+        """
+        Row of a symbol whose window was written after `since`, else None. Counts a
+        hit or a miss.
+        """
+        slot = self.slots.get(symbol)
+        if slot is None or (since is not None and not self.updated_at[slot] > since):
+            self.misses += 1
+            return None
+        self.slots.move_to_end(symbol)
+        self.hits += 1
+        return slot
+
+    def seed(self, symbol, volumes, time) -> int:
+        """Replace a symbol's window with the last `period` volumes of its history"""
+        slot = self._slot(symbol)
+        volumes = np.asarray(volumes, dtype=np.float64)[-self.period :]
+        self.volumes[slot] = np.nan
+        self.volumes[slot, self.period - len(volumes) :] = volumes
+        self.head[slot] = self.period - 1
+        self.updated_at[slot] = time
+        return slot
+
+    def update(self, symbol, volume: float, time) -> None:
+        """Roll a cached symbol's window forward by one bar, unknown symbols are ignored"""
+        slot = self.slots.get(symbol)
+        if slot is None:
+            return
+        head = (self.head[slot] + 1) % self.period
+        self.head[slot] = head
+        self.volumes[slot, head] = volume
+        self.updated_at[slot] = time
+
+    def remove(self, symbol) -> None:
+        slot = self.slots.pop(symbol, None)
+        if slot is not None:
+            self.free_slots.append(slot)
+
+    def window_statistics(self, slots):
+        """Average, minimum and zero-volume gap flag of each row in `slots`"""
+        volumes = self.volumes[np.asarray(slots, dtype=np.int64)]
+        filled = ~np.isnan(volumes)
+        count = filled.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg_volume = np.where(filled, volumes, 0.0).sum(axis=1) / count
+        min_volume = np.where(filled, volumes, np.inf).min(axis=1)
+        has_gap = (volumes == 0).any(axis=1)
+        return avg_volume, min_volume, has_gap, count
+
+    def _slot(self, symbol) -> int:
+        slot = self.slots.get(symbol)
+        if slot is not None:
+            self.slots.move_to_end(symbol)
+            return slot
+        if not self.free_slots:
+            _, evicted = self.slots.popitem(last=False)
+            self.free_slots.append(evicted)
+            self.evictions += 1
+        slot = self.free_slots.pop()
+        self.slots[symbol] = slot
+        return slot
@@ -0,0 +1,69 @@
+from collections import deque
+
+from AlgorithmImports import *
+
+
+class SlidingExtreme:
+    """
+    Maximum or minimum of the last `period` values.
+
+    A monotonic deque keeps only the values that can still become the extreme, in
+    the order they arrived, so the extreme is always at its front. Every value is
+    appended and dropped once, O(1) amortized per update instead of a scan over
+    the whole window.
+    """
+
+    __slots__ = ("period", "maximum", "samples", "_window")
+
+    def __init__(self, period: int, maximum: bool = True):
+        self.period = period
+        self.maximum = maximum
+        self.samples = 0
+        # (sample number, value), values strictly decreasing for a maximum
+        self._window = deque()
+
+    def add(self, value: float) -> float:
+        """Add a value, returns the extreme of the window it ends"""
+        window = self._window
+        if self.maximum:
+            while window and window[-1][1] <= value:
+                window.pop()
+        else:
+            while window and window[-1][1] >= value:
+                window.pop()
+        window.append((self.samples, value))
+        self.samples += 1
+        if window[0][0] <= self.samples - 1 - self.period:
+            window.popleft()
+        return window[0][1]
+
+
+class SlidingWilliamsPercentR(PythonIndicator):
+    """
+    Williams %R with the values of LEAN's WILR, the period high and low come from
+    SlidingExtremes instead of rescanning the window on every bar.
+    """
+
+    def __init__(self, name: str, period: int):
+        super().__init__()
+        self.name = name
+        self.period = period
+        self.warm_up_period = period
+        self.samples = 0
+        self._highest = SlidingExtreme(period, maximum=True)
+        self._lowest = SlidingExtreme(period, maximum=False)
+
+    @property
+    def is_ready(self) -> bool:
+        return self.samples >= self.period
+
+    def update(self, input) -> bool:
+        highest = self._highest.add(input.high)
+        lowest = self._lowest.add(input.low)
+        self.samples += 1
+        if highest == lowest:
+            self.value = 0.0
+        else:
+            self.value = -100 * (highest - input.close) / (highest - lowest)
+        self.current.set_value(self.value)
+        return self.is_ready
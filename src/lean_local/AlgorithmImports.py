@@ -0,0 +1,1192 @@
+"""
+Local stand-in for the part of LEAN's `AlgorithmImports` this project uses.
+
+Only meant to run the algorithm modules on a plain machine, driven by
+`backtest.LocalBacktest`. It follows LEAN's backtesting behavior where the
+algorithm can observe it:
+
+- market orders fill synchronously at the security's last price, order events are
+  raised before `market_order` returns
+- limit and stop market orders are checked against every later bar, a limit fills
+  when the bar trades through it at the limit or the better open, a stop fills at
+  the stop or the worse close
+- day orders are canceled after the last bar of the session
+- indicators registered for a symbol are updated with its bar before `on_data`
+
+There are no fees, slippage or buying power checks. Members can be reached in
+snake_case and PascalCase like in LEAN's Python API.
+"""
+
+import re
+from collections import deque
+from datetime import datetime, time, timedelta
+
+import pandas as pd
+
+
+class _PascalCaseAliases:
+    """Resolves LEAN's PascalCase member names, e.g. `LimitOrder`, to snake_case"""
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        if name[:1].isupper():
+            snake_case = re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", name).lower()
+            if snake_case != name:
+                return getattr(self, snake_case)
+        raise AttributeError(f"{type(self).__name__} has no attribute {name!r}")
+
+
+class Resolution:
+    TICK = Tick = 0
+    SECOND = Second = 1
+    MINUTE = Minute = 2
+    HOUR = Hour = 3
+    DAILY = Daily = 4
+
+
+class SeriesType:
+    LINE = Line = 0
+    SCATTER = Scatter = 1
+    CANDLE = Candle = 2
+    BAR = Bar = 3
+
+
+class BrokerageName:
+    DEFAULT = Default = 0
+    INTERACTIVE_BROKERS_BROKERAGE = InteractiveBrokersBrokerage = 1
+
+
+class AccountType:
+    MARGIN = Margin = 0
+    CASH = Cash = 1
+
+
+class TimeInForce:
+    GOOD_TIL_CANCELED = GoodTilCanceled = 0
+    DAY = Day = 1
+
+
+class SecurityMarginModel:
+    # LEAN's SecurityMarginModel.Null, buying power is never checked here anyway
+    NULL = Null = None
+
+
+class OrderStatus:
+    NEW = New = 0
+    SUBMITTED = Submitted = 1
+    PARTIALLY_FILLED = PartiallyFilled = 2
+    FILLED = Filled = 3
+    CANCELED = Canceled = 5
+    NONE = 6
+    INVALID = Invalid = 7
+    CANCEL_PENDING = CancelPending = 8
+    UPDATE_SUBMITTED = UpdateSubmitted = 9
+
+    CLOSED = (FILLED, CANCELED, INVALID)
+
+
+class SecurityType:
+    EQUITY = Equity = 1
+
+
+class Market:
+    USA = "usa"
+
+
+class OrderType:
+    MARKET = Market = 0
+    LIMIT = Limit = 1
+    STOP_MARKET = StopMarket = 2
+
+
+class OrderDirection:
+    BUY = Buy = 0
+    SELL = Sell = 1
+    HOLD = Hold = 2
+
+
+class Symbol(_PascalCaseAliases):
+    """
+    Equity symbol identified by its ticker. It hashes and compares like the ticker
+    string, so `securities["AAPL"]` finds the security of Symbol("AAPL").
+    """
+
+    __slots__ = ("value", "id")
+
+    def __init__(self, value: str):
+        self.value = value
+        self.id = value
+
+    @staticmethod
+    def create(ticker: str, *args, **kwargs) -> "Symbol":
+        return Symbol(ticker)
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __eq__(self, other):
+        if isinstance(other, Symbol):
+            return self.value == other.value
+        if isinstance(other, str):
+            return self.value == other
+        return NotImplemented
+
+    def __str__(self):
+        return self.value
+
+    def __repr__(self):
+        return self.value
+
+
+class TradeBar(_PascalCaseAliases):
+    __slots__ = ("time", "symbol", "open", "high", "low", "close", "volume", "period")
+
+    def __init__(
+        self,
+        time: datetime,
+        symbol,
+        open: float,
+        high: float,
+        low: float,
+        close: float,
+        volume: float,
+        period: timedelta = timedelta(minutes=1),
+    ):
+        self.time = time
+        self.symbol = symbol
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.period = period
+
+    @property
+    def end_time(self) -> datetime:
+        return self.time + self.period
+
+    @property
+    def value(self) -> float:
+        return self.close
+
+    @property
+    def price(self) -> float:
+        return self.close
+
+    def __repr__(self):
+        return (
+            f"{self.symbol} {self.time}: O {self.open} H {self.high} L {self.low} "
+            f"C {self.close} V {self.volume}"
+        )
+
+
+class IndicatorDataPoint(_PascalCaseAliases):
+    __slots__ = ("symbol", "time", "value")
+
+    def __init__(self, *args):
+        # (time, value) or (symbol, time, value) like LEAN's constructors
+        if len(args) == 3:
+            self.symbol, self.time, self.value = args
+        else:
+            self.symbol = None
+            self.time, self.value = args
+
+    @property
+    def end_time(self) -> datetime:
+        return self.time
+
+    @property
+    def price(self) -> float:
+        return self.value
+
+    def set_value(self, value: float) -> None:
+        self.value = value
+
+    def __repr__(self):
+        return f"{self.time}: {self.value}"
+
+
+class RollingWindow(_PascalCaseAliases):
+    """Fixed size window, index 0 is the most recent item"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._items = deque(maxlen=size)
+        self.samples = 0
+
+    def __class_getitem__(cls, item):
+        # RollingWindow[float](10)
+        return cls
+
+    def add(self, item) -> None:
+        self._items.appendleft(item)
+        self.samples += 1
+
+    @property
+    def count(self) -> int:
+        return len(self._items)
+
+    @property
+    def is_ready(self) -> bool:
+        return self.samples >= self.size
+
+    def reset(self) -> None:
+        self._items.clear()
+        self.samples = 0
+
+    def __getitem__(self, index: int):
+        return self._items[index]
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+
+class IndicatorBase(_PascalCaseAliases):
+    """Built-in indicators: `update` stores `compute_next_value` of every input"""
+
+    def __init__(self, name: str, warm_up_period: int):
+        self.name = name
+        self.warm_up_period = warm_up_period
+        self.reset()
+
+    def reset(self) -> None:
+        self.samples = 0
+        self.current = IndicatorDataPoint(datetime.min, 0.0)
+        self.previous = IndicatorDataPoint(datetime.min, 0.0)
+
+    @property
+    def is_ready(self) -> bool:
+        return self.samples >= self.warm_up_period
+
+    def update(self, input, value: float = None) -> bool:
+        if value is not None:
+            # update(time, value)
+            input = IndicatorDataPoint(input, value)
+        self.samples += 1
+        self.previous = self.current
+        self.current = IndicatorDataPoint(
+            input.end_time, self.compute_next_value(input)
+        )
+        return self.is_ready
+
+    def compute_next_value(self, input) -> float:
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{self.name}: {self.current.value}"
+
+
+class PythonIndicator(_PascalCaseAliases):
+    """Base of indicators written in Python, they implement `update` themselves"""
+
+    def __init__(self, *args):
+        self.name = type(self).__name__
+        self.value = 0.0
+        self.warm_up_period = 0
+        self.current = IndicatorDataPoint(datetime.min, 0.0)
+
+
+class SimpleMovingAverage(IndicatorBase):
+    def __init__(self, name: str, period: int):
+        self.period = period
+        super().__init__(name, period)
+
+    def reset(self) -> None:
+        super().reset()
+        self._window = deque(maxlen=self.period)
+
+    def compute_next_value(self, input) -> float:
+        self._window.append(input.value)
+        return sum(self._window) / len(self._window)
+
+
+class ExponentialMovingAverage(IndicatorBase):
+    """Seeded with the simple average of the first `period` values like LEAN"""
+
+    def __init__(self, name: str, period: int, smoothing_factor: float = None):
+        self.period = period
+        self.k = 2.0 / (period + 1) if smoothing_factor is None else smoothing_factor
+        super().__init__(name, period)
+
+    def reset(self) -> None:
+        super().reset()
+        self._sum = 0.0
+
+    def compute_next_value(self, input) -> float:
+        if self.samples <= self.period:
+            self._sum += input.value
+            return self._sum / self.samples
+        current = self.current.value
+        return current + self.k * (input.value - current)
+
+
+class IntradayVwap(IndicatorBase):
+    """Typical price weighted by volume, starts over on every new day"""
+
+    def __init__(self, name: str):
+        super().__init__(name, 1)
+
+    def reset(self) -> None:
+        super().reset()
+        self._day = None
+        self._price_volume = 0.0
+        self._volume = 0.0
+
+    def compute_next_value(self, input) -> float:
+        day = input.end_time.date()
+        if day != self._day:
+            self._day = day
+            self._price_volume = 0.0
+            self._volume = 0.0
+        typical = (input.high + input.low + input.close) / 3
+        self._price_volume += typical * input.volume
+        self._volume += input.volume
+        if self._volume == 0:
+            return typical
+        return self._price_volume / self._volume
+
+
+class AverageTrueRange(IndicatorBase):
+    """True range smoothed the Wilder way, seeded with its simple average"""
+
+    def __init__(self, name: str, period: int):
+        self.period = period
+        super().__init__(name, period)
+
+    def reset(self) -> None:
+        super().reset()
+        self._previous_close = None
+        self._sum = 0.0
+
+    def compute_next_value(self, input) -> float:
+        true_range = input.high - input.low
+        if self._previous_close is not None:
+            true_range = max(
+                true_range,
+                abs(input.high - self._previous_close),
+                abs(input.low - self._previous_close),
+            )
+        self._previous_close = input.close
+        if self.samples <= self.period:
+            self._sum += true_range
+            return self._sum / self.samples
+        current = self.current.value
+        return current + (true_range - current) / self.period
+
+
+class WilliamsPercentR(IndicatorBase):
+    def __init__(self, name: str, period: int):
+        self.period = period
+        super().__init__(name, period)
+
+    def reset(self) -> None:
+        super().reset()
+        self._highs = deque(maxlen=self.period)
+        self._lows = deque(maxlen=self.period)
+
+    def compute_next_value(self, input) -> float:
+        self._highs.append(input.high)
+        self._lows.append(input.low)
+        highest = max(self._highs)
+        lowest = min(self._lows)
+        if highest == lowest:
+            return 0.0
+        return -100 * (highest - input.close) / (highest - lowest)
+
+
+class Fundamental(_PascalCaseAliases):
+    """Daily coarse data of one symbol as universe selection receives it"""
+
+    def __init__(
+        self,
+        symbol: Symbol,
+        price: float,
+        volume: float,
+        has_fundamental_data: bool = True,
+    ):
+        self.symbol = symbol
+        self.price = price
+        self.volume = volume
+        self.dollar_volume = price * volume
+        self.has_fundamental_data = has_fundamental_data
+
+
+class Security(_PascalCaseAliases):
+    def __init__(self, symbol: Symbol, resolution: int):
+        self.symbol = symbol
+        self.resolution = resolution
+        self.price = 0.0
+        self.margin_model = None
+        self.has_data = False
+        # False once removed from the algorithm, it then receives no more data
+        self.is_tradable = True
+
+    def set_margin_model(self, margin_model) -> None:
+        self.margin_model = margin_model
+
+    def set_market_price(self, bar) -> None:
+        self.price = bar.close
+        self.has_data = True
+
+
+class SecurityChanges(_PascalCaseAliases):
+    """Securities a universe selection added and removed"""
+
+    def __init__(self, added_securities: list, removed_securities: list):
+        self.added_securities = added_securities
+        self.removed_securities = removed_securities
+
+    def __repr__(self):
+        return (
+            f"SecurityChanges: added {[str(s.symbol) for s in self.added_securities]}"
+            f", removed {[str(s.symbol) for s in self.removed_securities]}"
+        )
+
+
+class UniverseSettings(_PascalCaseAliases):
+    def __init__(self):
+        self.resolution = Resolution.MINUTE
+
+
+class SecurityHolding(_PascalCaseAliases):
+    def __init__(self, security: Security):
+        self.security = security
+        self.symbol = security.symbol
+        self.quantity = 0
+        self.average_price = 0.0
+        self.realized_profit = 0.0
+
+    @property
+    def invested(self) -> bool:
+        return self.quantity != 0
+
+    @property
+    def is_long(self) -> bool:
+        return self.quantity > 0
+
+    @property
+    def is_short(self) -> bool:
+        return self.quantity < 0
+
+    @property
+    def absolute_quantity(self) -> int:
+        return abs(self.quantity)
+
+    @property
+    def price(self) -> float:
+        return self.security.price
+
+    @property
+    def holdings_value(self) -> float:
+        return self.quantity * self.security.price
+
+    @property
+    def unrealized_profit(self) -> float:
+        return self.quantity * (self.security.price - self.average_price)
+
+    def fill(self, quantity: int, price: float) -> None:
+        """Apply a fill to the position, realizing the profit of the closed part"""
+        if self.quantity == 0 or (self.quantity > 0) == (quantity > 0):
+            total = self.quantity + quantity
+            self.average_price = (
+                self.average_price * self.quantity + price * quantity
+            ) / total
+            self.quantity = total
+            return
+        closed = min(abs(quantity), abs(self.quantity))
+        direction = 1 if self.quantity > 0 else -1
+        self.realized_profit += closed * direction * (price - self.average_price)
+        self.quantity += quantity
+        if self.quantity == 0:
+            self.average_price = 0.0
+        elif (self.quantity > 0) != (direction > 0):
+            # flipped sides, the rest opens a new position at the fill price
+            self.average_price = price
+
+
+class SecurityPortfolioManager(dict, _PascalCaseAliases):
+    def __init__(self):
+        super().__init__()
+        self.cash = 0.0
+
+    @property
+    def total_portfolio_value(self) -> float:
+        return self.cash + sum(holding.holdings_value for holding in self.values())
+
+    @property
+    def total_holdings_value(self) -> float:
+        return sum(abs(holding.holdings_value) for holding in self.values())
+
+    @property
+    def invested(self) -> bool:
+        return any(holding.invested for holding in self.values())
+
+
+class SecurityManager(dict, _PascalCaseAliases):
+    pass
+
+
+class Order(_PascalCaseAliases):
+    def __init__(
+        self,
+        id: int,
+        symbol: Symbol,
+        quantity: int,
+        type: int,
+        time: datetime,
+        time_in_force: int,
+        limit_price: float = None,
+        stop_price: float = None,
+        tag: str = "",
+    ):
+        self.id = id
+        self.symbol = symbol
+        self.quantity = quantity
+        self.type = type
+        self.time = time
+        self.time_in_force = time_in_force
+        self.limit_price = limit_price
+        self.stop_price = stop_price
+        self.tag = tag
+        self.status = OrderStatus.NEW
+        self.quantity_filled = 0
+        self.average_fill_price = 0.0
+
+    @property
+    def direction(self) -> int:
+        return OrderDirection.BUY if self.quantity > 0 else OrderDirection.SELL
+
+
+class OrderTicket(_PascalCaseAliases):
+    def __init__(self, transactions, order: Order):
+        self._transactions = transactions
+        self._order = order
+
+    @property
+    def order_id(self) -> int:
+        return self._order.id
+
+    @property
+    def symbol(self) -> Symbol:
+        return self._order.symbol
+
+    @property
+    def quantity(self) -> int:
+        return self._order.quantity
+
+    @property
+    def order_type(self) -> int:
+        return self._order.type
+
+    @property
+    def status(self) -> int:
+        return self._order.status
+
+    @property
+    def quantity_filled(self) -> int:
+        return self._order.quantity_filled
+
+    @property
+    def average_fill_price(self) -> float:
+        return self._order.average_fill_price
+
+    def cancel(self, tag: str = "") -> bool:
+        return self._transactions.cancel_order(self._order.id, tag)
+
+    def update_quantity(self, quantity: int, tag: str = "") -> bool:
+        return self._transactions.update_order(self._order.id, quantity, tag)
+
+
+class OrderEvent(_PascalCaseAliases):
+    def __init__(
+        self,
+        order_id: int,
+        symbol: Symbol,
+        utc_time: datetime,
+        status: int,
+        direction: int,
+        fill_price: float = 0.0,
+        fill_quantity: int = 0,
+        quantity: int = 0,
+        message: str = "",
+    ):
+        self.order_id = order_id
+        self.symbol = symbol
+        self.utc_time = utc_time
+        self.status = status
+        self.direction = direction
+        self.fill_price = fill_price
+        self.fill_quantity = fill_quantity
+        self.quantity = quantity
+        self.message = message
+
+    def __repr__(self):
+        return (
+            f"OrderEvent {self.order_id} {self.symbol} status {self.status} "
+            f"{self.fill_quantity} @ {self.fill_price}"
+        )
+
+
+class SecurityTransactionManager(_PascalCaseAliases):
+    """Order book and simulated fills of a local backtest"""
+
+    def __init__(self, algorithm):
+        self._algorithm = algorithm
+        self._orders = {}
+        self._tickets = {}
+        # symbol -> open limit and stop orders, checked against its bars
+        self._open = {}
+        self._next_id = 1
+
+    def submit(
+        self,
+        symbol,
+        quantity: int,
+        type: int,
+        limit_price: float = None,
+        stop_price: float = None,
+        tag: str = "",
+    ) -> OrderTicket:
+        algorithm = self._algorithm
+        symbol = algorithm.securities[symbol].symbol
+        order = Order(
+            self._next_id,
+            symbol,
+            int(quantity),
+            type,
+            algorithm.utc_time,
+            algorithm.default_order_properties.time_in_force,
+            limit_price,
+            stop_price,
+            tag,
+        )
+        self._next_id += 1
+        self._orders[order.id] = order
+        ticket = self._tickets[order.id] = OrderTicket(self, order)
+        if order.quantity == 0:
+            order.status = OrderStatus.INVALID
+            algorithm.error(f"Unable to submit order {order.id} with zero quantity")
+            return ticket
+
+        self._set_status(order, OrderStatus.SUBMITTED)
+        if type == OrderType.MARKET:
+            self._fill(order, algorithm.securities[symbol].price)
+        else:
+            self._open.setdefault(symbol, []).append(order)
+        return ticket
+
+    def process(self, bars: dict) -> None:
+        """Fill the open limit and stop orders the new bars trigger"""
+        for symbol, orders in list(self._open.items()):
+            bar = bars.get(symbol)
+            if bar is None:
+                continue
+            for order in list(orders):
+                if order.status in OrderStatus.CLOSED:
+                    continue
+                price = self._trigger_price(order, bar)
+                if price is not None:
+                    self._fill(order, price)
+
+    @staticmethod
+    def _trigger_price(order: Order, bar: TradeBar):
+        buy = order.quantity > 0
+        if order.type == OrderType.LIMIT:
+            if buy and bar.low < order.limit_price:
+                return min(order.limit_price, bar.open)
+            if not buy and bar.high > order.limit_price:
+                return max(order.limit_price, bar.open)
+        elif order.type == OrderType.STOP_MARKET:
+            if buy and bar.high > order.stop_price:
+                return max(order.stop_price, bar.close)
+            if not buy and bar.low < order.stop_price:
+                return min(order.stop_price, bar.close)
+        return None
+
+    def _fill(self, order: Order, price: float) -> None:
+        algorithm = self._algorithm
+        quantity = order.quantity - order.quantity_filled
+        algorithm.portfolio.cash -= quantity * price
+        algorithm.portfolio[order.symbol].fill(quantity, price)
+        order.average_fill_price = price
+        order.quantity_filled = order.quantity
+        self._close(order)
+        self._set_status(order, OrderStatus.FILLED, price, quantity)
+
+    def _close(self, order: Order) -> None:
+        orders = self._open.get(order.symbol)
+        if orders and order in orders:
+            orders.remove(order)
+
+    def _set_status(
+        self, order: Order, status: int, fill_price=0.0, fill_quantity=0, message=""
+    ) -> None:
+        order.status = status
+        self._algorithm.on_order_event(
+            OrderEvent(
+                order.id,
+                order.symbol,
+                self._algorithm.utc_time,
+                status,
+                order.direction,
+                fill_price,
+                fill_quantity,
+                order.quantity,
+                message,
+            )
+        )
+
+    def cancel_order(self, order_id: int, tag: str = "") -> bool:
+        order = self._orders.get(order_id)
+        if order is None or order.status in OrderStatus.CLOSED:
+            return False
+        self._close(order)
+        self._set_status(order, OrderStatus.CANCELED, message=tag)
+        return True
+
+    def update_order(self, order_id: int, quantity: int, tag: str = "") -> bool:
+        """Change the total quantity of an open order, what filled stays filled"""
+        order = self._orders.get(order_id)
+        if order is None or order.status in OrderStatus.CLOSED:
+            return False
+        order.quantity = int(quantity)
+        self._set_status(order, OrderStatus.UPDATE_SUBMITTED, message=tag)
+        return True
+
+    def cancel_open_orders(self, symbol=None, tag: str = "") -> list:
+        canceled = []
+        for order in self.get_open_orders(symbol):
+            self.cancel_order(order.id, tag)
+            canceled.append(self._tickets[order.id])
+        return canceled
+
+    def expire_day_orders(self) -> None:
+        for order in self.get_open_orders():
+            if order.time_in_force == TimeInForce.DAY:
+                self.cancel_order(order.id, "Day order expired")
+
+    def get_open_orders(self, symbol=None) -> list:
+        if symbol is not None:
+            return list(self._open.get(symbol, ()))
+        return [order for orders in self._open.values() for order in orders]
+
+    def get_order_by_id(self, order_id: int) -> Order:
+        return self._orders.get(order_id)
+
+    def get_order_ticket(self, order_id: int) -> OrderTicket:
+        return self._tickets.get(order_id)
+
+    def get_orders(self) -> list:
+        return list(self._orders.values())
+
+
+class Slice(_PascalCaseAliases):
+    def __init__(self, time: datetime, bars: dict):
+        self.time = time
+        self.bars = bars
+
+    def contains_key(self, symbol) -> bool:
+        return symbol in self.bars
+
+    def get(self, symbol, default=None):
+        return self.bars.get(symbol, default)
+
+    def keys(self):
+        return self.bars.keys()
+
+    def values(self):
+        return self.bars.values()
+
+    def items(self):
+        return self.bars.items()
+
+    def __contains__(self, symbol):
+        return symbol in self.bars
+
+    def __getitem__(self, symbol):
+        return self.bars[symbol]
+
+    def __len__(self):
+        return len(self.bars)
+
+
+class DateRule:
+    def __init__(self, name: str, applies):
+        self.name = name
+        self.applies = applies
+
+
+class _ScheduleRules(_PascalCaseAliases):
+    def __init__(self, securities: SecurityManager):
+        self._securities = securities
+
+    def _symbol(self, symbol):
+        """LEAN looks tickers up in its SymbolCache, which only knows added ones"""
+        if isinstance(symbol, str) and symbol not in self._securities:
+            raise KeyError(
+                f"{symbol} is not in the SymbolCache, add it or use Symbol.create"
+            )
+        return symbol
+
+
+class DateRules(_ScheduleRules):
+    def every_day(self, *symbols) -> DateRule:
+        for symbol in symbols:
+            self._symbol(symbol)
+        return DateRule("EveryDay", lambda day: True)
+
+
+class TimeRule:
+    def __init__(self, name: str, at):
+        self.name = name
+        # (day, market open, market close) -> algorithm time the event fires at,
+        # the session's open and close are given in algorithm time
+        self.at = at
+
+
+class TimeRules(_ScheduleRules):
+    """
+    The market relative rules take the session's hours from the backtest's bars,
+    all symbols share the US equity sessions.
+    """
+
+    def at(self, hour: int, minute: int = 0, second: int = 0) -> TimeRule:
+        moment = time(hour, minute, second)
+        return TimeRule(
+            f"{moment:%H:%M:%S}", lambda day, *_: datetime.combine(day, moment)
+        )
+
+    def before_market_open(self, symbol, minutes_before_open: float = 0) -> TimeRule:
+        symbol = self._symbol(symbol)
+        shift = timedelta(minutes=minutes_before_open)
+        return TimeRule(
+            f"{symbol}: {minutes_before_open:g} min before MarketOpen",
+            lambda day, market_open, market_close: market_open - shift,
+        )
+
+    def before_market_close(
+        self, symbol, minutes_before_close: float = 0, extended_market_close=False
+    ) -> TimeRule:
+        symbol = self._symbol(symbol)
+        shift = timedelta(minutes=minutes_before_close)
+        return TimeRule(
+            f"{symbol}: {minutes_before_close:g} min before MarketClose",
+            lambda day, market_open, market_close: market_close - shift,
+        )
+
+    def after_market_close(
+        self, symbol, minutes_after_close: float = 0, extended_market_close=False
+    ) -> TimeRule:
+        symbol = self._symbol(symbol)
+        shift = timedelta(minutes=minutes_after_close)
+        return TimeRule(
+            f"{symbol}: {minutes_after_close:g} min after MarketClose",
+            lambda day, market_open, market_close: market_close + shift,
+        )
+
+
+class ScheduledEvent:
+    def __init__(self, date_rule: DateRule, time_rule: TimeRule, callback):
+        self.date_rule = date_rule
+        self.time_rule = time_rule
+        self.callback = callback
+        self.name = f"{date_rule.name}: {time_rule.name}"
+
+
+class ScheduleManager(_PascalCaseAliases):
+    def __init__(self):
+        self.events = []
+
+    def on(self, date_rule: DateRule, time_rule: TimeRule, callback) -> ScheduledEvent:
+        event = ScheduledEvent(date_rule, time_rule, callback)
+        self.events.append(event)
+        return event
+
+
+class Series(_PascalCaseAliases):
+    def __init__(
+        self, name: str, series_type: int = SeriesType.LINE, index: int = 0, unit="$"
+    ):
+        self.name = name
+        self.series_type = series_type
+        self.index = index
+        self.unit = unit
+        # (time, value) or (time, open, high, low, close)
+        self.points = []
+
+    def add_point(self, time, *values) -> None:
+        self.points.append((time, *values))
+
+
+class CandlestickSeries(Series):
+    def __init__(self, name: str, index: int = 0, unit="$"):
+        super().__init__(name, SeriesType.CANDLE, index, unit)
+
+
+class Chart(_PascalCaseAliases):
+    def __init__(self, name: str):
+        self.name = name
+        self.series = {}
+
+    def add_series(self, series: Series) -> None:
+        self.series[series.name] = series
+
+
+class OrderProperties(_PascalCaseAliases):
+    def __init__(self):
+        self.time_in_force = TimeInForce.GOOD_TIL_CANCELED
+
+
+class AlgorithmSettings(_PascalCaseAliases):
+    def __init__(self):
+        self.liquidate_enabled = True
+
+
+class _History:
+    """`history(...)` and `history[TradeBar](...)` of QCAlgorithm"""
+
+    def __init__(self, algorithm):
+        self._algorithm = algorithm
+
+    def __getitem__(self, data_type):
+        return self._bars
+
+    def _bars(self, symbols, periods: int, resolution: int = None):
+        """A list of {symbol: TradeBar}, or of TradeBars for a single symbol"""
+        single = not isinstance(symbols, (list, tuple))
+        symbols = [symbols] if single else list(symbols)
+        feed = self._algorithm._lean_feed
+        slices = [] if feed is None else feed.history(symbols, periods)
+        if single:
+            return [bars[symbols[0]] for bars in slices if symbols[0] in bars]
+        return slices
+
+    def __call__(self, symbols, periods: int, resolution: int = None) -> pd.DataFrame:
+        """Bars as a DataFrame indexed by symbol and time like LEAN's pandas history"""
+        rows = [
+            (
+                bar.symbol,
+                bar.end_time,
+                bar.open,
+                bar.high,
+                bar.low,
+                bar.close,
+                bar.volume,
+            )
+            for bars in self._bars(list(symbols), periods, resolution)
+            for bar in bars.values()
+        ]
+        frame = pd.DataFrame(
+            rows, columns=["symbol", "time", "open", "high", "low", "close", "volume"]
+        )
+        return frame.sort_values(["symbol", "time"], key=_symbol_sort_key).set_index(
+            ["symbol", "time"]
+        )
+
+
+def _symbol_sort_key(column: pd.Series) -> pd.Series:
+    return column.map(str) if column.name == "symbol" else column
+
+
+class QCAlgorithm(_PascalCaseAliases):
+    """
+    Algorithm base with the API surface this project uses. Without an attached
+    backtest history is empty and parameters are unset.
+    """
+
+    def __init__(self):
+        self.securities = SecurityManager()
+        self.portfolio = SecurityPortfolioManager()
+        self.transactions = SecurityTransactionManager(self)
+        self.schedule = ScheduleManager()
+        self.date_rules = DateRules(self.securities)
+        self.time_rules = TimeRules(self.securities)
+        self.default_order_properties = OrderProperties()
+        self.settings = AlgorithmSettings()
+        self.history = _History(self)
+        self.universe_settings = UniverseSettings()
+        self.time_zone = "America/New_York"
+        self.start_date = datetime(1998, 1, 1)
+        self.end_date = datetime.now().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        self.time = self.start_date
+        self.utc_time = self.start_date
+        self.brokerage_name = BrokerageName.DEFAULT
+        self.account_type = AccountType.MARGIN
+        self.runtime_statistics = {}
+        self.logs = []
+        self._lean_feed = None
+        self._lean_parameters = {}
+        self._lean_charts = {}
+        # symbol -> indicators updated with every bar of the symbol
+        self._lean_indicators = {}
+        # universe selection models, run before every trading day
+        self._lean_universe_models = []
+
+    # setup
+
+    def set_brokerage_model(self, brokerage_name, account_type=AccountType.MARGIN):
+        self.brokerage_name = brokerage_name
+        self.account_type = account_type
+
+    def set_start_date(self, year, month: int = None, day: int = None) -> None:
+        if self._lean_feed is not None and self._lean_feed.start is not None:
+            return  # the backtest decides the range
+        self.start_date = year if month is None else datetime(year, month, day)
+        self.time = self.start_date
+
+    def set_end_date(self, year, month: int = None, day: int = None) -> None:
+        if self._lean_feed is not None and self._lean_feed.end is not None:
+            return
+        self.end_date = year if month is None else datetime(year, month, day)
+
+    def set_cash(self, cash: float) -> None:
+        self.portfolio.cash = float(cash)
+
+    def set_time_zone(self, time_zone: str) -> None:
+        self.time_zone = time_zone
+
+    def get_parameter(self, name: str, default=None):
+        return self._lean_parameters.get(name, default)
+
+    def add_equity(
+        self, ticker: str, resolution: int = Resolution.MINUTE, *args, **kwargs
+    ) -> Security:
+        symbol = Symbol(ticker)
+        security = self.securities.get(symbol)
+        if security is None:
+            security = self.securities[symbol] = Security(symbol, resolution)
+            self.portfolio[symbol] = SecurityHolding(security)
+            self._lean_indicators[symbol] = []
+        security.is_tradable = True
+        return security
+
+    def remove_security(self, symbol) -> bool:
+        """Stop the data of a security, it stays in `securities` like in LEAN"""
+        security = self.securities.get(symbol)
+        if security is None or not security.is_tradable:
+            return False
+        security.is_tradable = False
+        return True
+
+    def set_universe_selection(self, model) -> None:
+        self._lean_universe_models = [model]
+
+    def add_universe_selection(self, model) -> None:
+        self._lean_universe_models.append(model)
+
+    # indicators
+
+    def register_indicator(self, symbol, indicator, resolution=None, selector=None):
+        self._lean_indicators[self.securities[symbol].symbol].append(indicator)
+
+    def deregister_indicator(self, indicator) -> None:
+        for indicators in self._lean_indicators.values():
+            if indicator in indicators:
+                indicators.remove(indicator)
+
+    def _lean_indicator(self, symbol, indicator):
+        self.register_indicator(symbol, indicator)
+        return indicator
+
+    def vwap(self, symbol, period: int = None, resolution=None, selector=None):
+        return self._lean_indicator(symbol, IntradayVwap(f"VWAP({symbol})"))
+
+    def ema(self, symbol, period: int, resolution=None, selector=None):
+        return self._lean_indicator(
+            symbol, ExponentialMovingAverage(f"EMA({symbol},{period})", period)
+        )
+
+    def sma(self, symbol, period: int, resolution=None, selector=None):
+        return self._lean_indicator(
+            symbol, SimpleMovingAverage(f"SMA({symbol},{period})", period)
+        )
+
+    def wilr(self, symbol, period: int, resolution=None, selector=None):
+        return self._lean_indicator(
+            symbol, WilliamsPercentR(f"WILR({symbol},{period})", period)
+        )
+
+    def atr(
+        self,
+        symbol,
+        period: int,
+        moving_average_type=None,
+        resolution=None,
+        selector=None,
+    ):
+        return self._lean_indicator(
+            symbol, AverageTrueRange(f"ATR({symbol},{period})", period)
+        )
+
+    # orders
+
+    def market_order(self, symbol, quantity, asynchronous=False, tag=""):
+        return self.transactions.submit(symbol, quantity, OrderType.MARKET, tag=tag)
+
+    def limit_order(self, symbol, quantity, limit_price, tag=""):
+        return self.transactions.submit(
+            symbol, quantity, OrderType.LIMIT, limit_price=limit_price, tag=tag
+        )
+
+    def stop_market_order(self, symbol, quantity, stop_price, tag=""):
+        return self.transactions.submit(
+            symbol, quantity, OrderType.STOP_MARKET, stop_price=stop_price, tag=tag
+        )
+
+    def liquidate(self, symbol=None, tag: str = "Liquidated") -> list:
+        """Cancel the open orders, then close the positions with market orders"""
+        self.transactions.cancel_open_orders(symbol, tag)
+        holdings = (
+            [self.portfolio[symbol]] if symbol is not None else self.portfolio.values()
+        )
+        return [
+            self.market_order(holding.symbol, -holding.quantity, tag=tag)
+            for holding in list(holdings)
+            if holding.invested
+        ]
+
+    # events, overridden by the algorithm
+
+    def initialize(self) -> None:
+        pass
+
+    def on_data(self, data: Slice) -> None:
+        pass
+
+    def on_order_event(self, order_event: OrderEvent) -> None:
+        pass
+
+    def on_securities_changed(self, changes: SecurityChanges) -> None:
+        pass
+
+    def on_end_of_algorithm(self) -> None:
+        pass
+
+    # charts, statistics and logs
+
+    def add_chart(self, chart: Chart) -> None:
+        self._lean_charts[chart.name] = chart
+
+    def plot(self, chart: str, series: str, value: float) -> None:
+        chart_object = self._lean_charts.setdefault(chart, Chart(chart))
+        if series not in chart_object.series:
+            chart_object.add_series(Series(series))
+        chart_object.series[series].add_point(self.utc_time, value)
+
+    def set_runtime_statistic(self, name: str, value) -> None:
+        self.runtime_statistics[name] = str(value)
+
+    def debug(self, message) -> None:
+        self.logs.append((self.time, str(message)))
+
+    def log(self, message) -> None:
+        self.logs.append((self.time, str(message)))
+
+    def error(self, message) -> None:
+        self.logs.append((self.time, f"ERROR: {message}"))
@@ -0,0 +1,15 @@
+from AlgorithmImports import *
+
+
+class FundamentalUniverseSelectionModel:
+    """Stand-in for LEAN's base model, subclasses implement `select_coarse`"""
+
+    def __init__(self, filterFineData: bool = False, universeSettings=None):
+        self.filter_fine_data = filterFineData
+        self.universe_settings = universeSettings
+
+    def select(self, algorithm: QCAlgorithm, fundamental: list) -> list:
+        return self.select_coarse(algorithm, fundamental)
+
+    def select_coarse(self, algorithm: QCAlgorithm, fundamental: list) -> list:
+        raise NotImplementedError
@@ -0,0 +1,396 @@
+"""
+Offline backtests of a QCAlgorithm over MinuteBars, using the local AlgorithmImports
+stand-in instead of LEAN.
+
+Each minute of the timeline is one time step, in the order LEAN backtests run it:
+security prices, scheduled events that are due, fills of open limit and stop orders,
+registered indicators, then `on_data`. Scheduled events that fall after the last bar
+of a session still fire that day, day orders expire after them. Market relative
+time rules take the start of the session's first bar and the end of its last bar
+as the market open and close.
+
+Universe selection models run before every session on Fundamentals of the previous
+session, i.e. its last close and total volume. Securities they add get data from
+that session on, removed ones stop getting data.
+
+    python src/lean_local/backtest.py <bar store or LEAN data folder> 2023-09-18 \
+        2023-10-18 --parameter close_vwap_div_threshold=1 --parameter crv=1
+"""
+
+import os
+import sys
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from time import perf_counter
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+# the algorithm project folder, its modules import each other by file name
+ALGORITHM_FOLDER = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "aron20")
+)
+if ALGORITHM_FOLDER not in sys.path:
+    sys.path.append(ALGORITHM_FOLDER)
+
+from AlgorithmImports import (
+    Fundamental,
+    QCAlgorithm,
+    SecurityChanges,
+    Slice,
+    Symbol,
+    TradeBar,
+)
+from minute_bars import MARKET_OPEN_MINUTE, MINUTES_PER_SESSION, MinuteBars
+from session_calendar import EARLY_CLOSE_MINUTE, is_early_close
+
+EXCHANGE_TIME_ZONE = "America/New_York"
+ONE_MINUTE = timedelta(minutes=1)
+
+
+@dataclass
+class BacktestResult:
+    algorithm: QCAlgorithm
+    initialize_seconds: float
+    # time spent in the time loop, i.e. indicators, order fills and on_data
+    run_seconds: float
+    time_steps: int
+    # symbol bars delivered to on_data
+    bars: int
+
+    @property
+    def bars_per_second(self) -> float:
+        return self.bars / self.run_seconds if self.run_seconds else 0.0
+
+
+class LocalBacktest:
+    """
+    Runs `algorithm_class` over the days of `bars` from `start` to `end`, both
+    dates inclusive. Bars before `start` serve history requests, e.g. the warm up
+    in `initialize`. Without `start` the algorithm's own start date is used.
+    """
+
+    def __init__(
+        self,
+        algorithm_class,
+        bars: MinuteBars,
+        parameters: dict = None,
+        start: date = None,
+        end: date = None,
+        exchange_time_zone: str = EXCHANGE_TIME_ZONE,
+    ):
+        self.algorithm_class = algorithm_class
+        self.bars = bars
+        self.parameters = dict(parameters or {})
+        self.start = start
+        self.end = end
+        self.exchange_time_zone = ZoneInfo(exchange_time_zone)
+        self.rows = {symbol: index for index, symbol in enumerate(bars.symbols)}
+        self.algorithm = None
+        # history requests see the timeline up to here, exclusive
+        self.history_end = 0
+        self._day = bars.day
+        # symbols the universe selection models currently hold
+        self.universe = set()
+
+    def run(self) -> BacktestResult:
+        algorithm = self.algorithm = self.algorithm_class()
+        algorithm._lean_feed = self
+        algorithm._lean_parameters = dict(self.parameters)
+        if self.start is not None:
+            algorithm.start_date = datetime(
+                self.start.year, self.start.month, self.start.day
+            )
+            algorithm.time = algorithm.start_date
+        if self.end is not None:
+            algorithm.end_date = datetime(self.end.year, self.end.month, self.end.day)
+
+        started = perf_counter()
+        algorithm.initialize()
+        initialize_seconds = perf_counter() - started
+
+        dates = self.bars.dates
+        first_day = int(np.searchsorted(dates, self._start_day()))
+        stop_day = int(
+            np.searchsorted(
+                dates, np.datetime64(algorithm.end_date.date(), "D"), side="right"
+            )
+        )
+
+        started = perf_counter()
+        time_steps = bars = 0
+        for day in range(first_day, stop_day):
+            if algorithm._lean_universe_models:
+                self._select_universe(day)
+            subscriptions = [
+                (
+                    security.symbol,
+                    security,
+                    algorithm._lean_indicators[security.symbol],
+                )
+                for security in algorithm.securities.values()
+                if security.is_tradable and str(security.symbol) in self.rows
+            ]
+            rows = [self.rows[str(symbol)] for symbol, _, _ in subscriptions]
+            day_steps, day_bars = self._run_day(day, subscriptions, rows)
+            time_steps += day_steps
+            bars += day_bars
+        run_seconds = perf_counter() - started
+        algorithm.on_end_of_algorithm()
+        return BacktestResult(
+            algorithm, initialize_seconds, run_seconds, time_steps, bars
+        )
+
+    def _start_day(self) -> np.datetime64:
+        start = self.start if self.start is not None else self.algorithm.start_date
+        return np.datetime64(start, "D")
+
+    def _select_universe(self, day: int) -> None:
+        """Run the selection models and apply the changes before the session"""
+        algorithm = self.algorithm
+        bars = self.bars
+        begin = int(bars.day_offsets[day])
+        self.history_end = begin
+        fundamentals = []
+        if day > 0:
+            previous = slice(int(bars.day_offsets[day - 1]), begin)
+            available = bars.available[:, previous]
+            volumes = np.where(available, bars.volume[:, previous], 0.0).sum(axis=1)
+            for row, symbol in enumerate(bars.symbols):
+                traded = np.flatnonzero(available[row])
+                if len(traded):
+                    close = float(bars.close[row, previous.start + traded[-1]])
+                    fundamentals.append(
+                        Fundamental(Symbol(symbol), close, float(volumes[row]))
+                    )
+        selected = set()
+        for model in algorithm._lean_universe_models:
+            selected.update(model.select(algorithm, fundamentals))
+
+        added = [
+            algorithm.add_equity(
+                str(symbol), resolution=algorithm.universe_settings.resolution
+            )
+            for symbol in sorted(selected - self.universe, key=str)
+        ]
+        removed = []
+        for symbol in sorted(self.universe - selected, key=str):
+            if algorithm.remove_security(symbol):
+                removed.append(algorithm.securities[symbol])
+        self.universe = selected
+        if added or removed:
+            algorithm.on_securities_changed(SecurityChanges(added, removed))
+
+    def _time_offsets(self, session: date, time_zone: str):
+        """Exchange time to algorithm time and to UTC on a session date"""
+        moment = datetime(
+            session.year, session.month, session.day, 12, tzinfo=self.exchange_time_zone
+        )
+        exchange_offset = moment.utcoffset()
+        algorithm_offset = moment.astimezone(ZoneInfo(time_zone)).utcoffset()
+        return algorithm_offset - exchange_offset, -exchange_offset
+
+    def _run_day(self, day: int, subscriptions: list, rows: list):
+        algorithm = self.algorithm
+        bars = self.bars
+        transactions = algorithm.transactions
+        begin, stop = bars.day_offsets[day], bars.day_offsets[day + 1]
+        session = bars.dates[day].astype(object)
+        midnight = datetime(session.year, session.month, session.day)
+        to_algorithm, to_utc = self._time_offsets(session, algorithm.time_zone)
+
+        minutes = bars.minute[begin:stop].tolist()
+        market_open = midnight + timedelta(minutes=minutes[0]) + to_algorithm
+        market_close = (
+            midnight + timedelta(minutes=minutes[-1]) + ONE_MINUTE + to_algorithm
+        )
+        # (algorithm time, registration order, event)
+        due = sorted(
+            (
+                (event.time_rule.at(session, market_open, market_close), order, event)
+                for order, event in enumerate(algorithm.schedule.events)
+                if event.date_rule.applies(session)
+            ),
+            key=lambda item: item[:2],
+        )
+        next_event = 0
+
+        # python lists per time step, reading numpy scalars one by one is slow
+        columns = [
+            getattr(bars, name)[rows, begin:stop].T.tolist()
+            for name in ("open", "high", "low", "close", "volume", "available")
+        ]
+
+        delivered = 0
+        for step, (opens, highs, lows, closes, volumes, available) in enumerate(
+            zip(*columns)
+        ):
+            self.history_end = begin + step + 1
+            start_time = midnight + timedelta(minutes=minutes[step])
+            end_time = start_time + ONE_MINUTE
+            algorithm.time = end_time + to_algorithm
+            algorithm.utc_time = end_time + to_utc
+
+            slice_bars = {}
+            for (symbol, security, _), open_, high, low, close, volume, ok in zip(
+                subscriptions, opens, highs, lows, closes, volumes, available
+            ):
+                if ok:
+                    bar = TradeBar(start_time, symbol, open_, high, low, close, volume)
+                    security.set_market_price(bar)
+                    slice_bars[symbol] = bar
+
+            while next_event < len(due) and due[next_event][0] <= algorithm.time:
+                self._fire(due[next_event], to_algorithm, to_utc)
+                next_event += 1
+            transactions.process(slice_bars)
+            for symbol, security, indicators in subscriptions:
+                bar = slice_bars.get(symbol)
+                if bar is not None:
+                    for indicator in indicators:
+                        indicator.update(bar)
+            if slice_bars:
+                algorithm.on_data(Slice(algorithm.time, slice_bars))
+                delivered += len(slice_bars)
+
+        for item in due[next_event:]:
+            self._fire(item, to_algorithm, to_utc)
+        transactions.expire_day_orders()
+        return int(stop - begin), delivered
+
+    def _fire(self, item, to_algorithm: timedelta, to_utc: timedelta) -> None:
+        event_time, _, event = item
+        algorithm = self.algorithm
+        algorithm.time = max(algorithm.time, event_time)
+        algorithm.utc_time = algorithm.time - to_algorithm + to_utc
+        event.callback()
+
+    def history(self, symbols: list, periods: int) -> list:
+        """{symbol: TradeBar} of the last `periods` time steps before history_end"""
+        if self.algorithm is not None and self.history_end == 0:
+            # requests from initialize end at the start date
+            self.history_end = int(
+                self.bars.day_offsets[
+                    np.searchsorted(self.bars.dates, self._start_day())
+                ]
+            )
+        bars = self.bars
+        rows = [self.rows.get(str(symbol)) for symbol in symbols]
+        slices = []
+        for position in range(max(0, self.history_end - periods), self.history_end):
+            session = bars.dates[self._day[position]].astype(object)
+            start_time = datetime(session.year, session.month, session.day) + timedelta(
+                minutes=int(bars.minute[position])
+            )
+            slices.append(
+                {
+                    symbol: TradeBar(
+                        start_time,
+                        symbol,
+                        float(bars.open[row, position]),
+                        float(bars.high[row, position]),
+                        float(bars.low[row, position]),
+                        float(bars.close[row, position]),
+                        float(bars.volume[row, position]),
+                    )
+                    for symbol, row in zip(symbols, rows)
+                    if row is not None and bars.available[row, position]
+                }
+            )
+        return slices
+
+
+def run_backtest(
+    algorithm_class,
+    bars: MinuteBars,
+    parameters: dict = None,
+    start: date = None,
+    end: date = None,
+) -> BacktestResult:
+    return LocalBacktest(algorithm_class, bars, parameters, start, end).run()
+
+
+def random_walk_minute_bars(symbols, n_days: int, seed: int = 7, start: date = None):
+    """
+    Synthetic regular-session minute bars on consecutive weekdays, the sessions of
+    early closes end at 13:00
+    """
+    rng = np.random.default_rng(seed)
+    dates = []
+    day = start if start is not None else date(2023, 9, 18)
+    while len(dates) < n_days:
+        if day.weekday() < 5:
+            dates.append(day)
+        day += timedelta(days=1)
+
+    n_symbols = len(symbols)
+    minutes = np.arange(MARKET_OPEN_MINUTE, MARKET_OPEN_MINUTE + MINUTES_PER_SESSION)
+    minutes_per_day = [
+        minutes[minutes < EARLY_CLOSE_MINUTE] if is_early_close(day) else minutes
+        for day in dates
+    ]
+    n_bars = sum(len(day_minutes) for day_minutes in minutes_per_day)
+    returns = rng.normal(0, 0.0015, size=(n_symbols, n_bars))
+    close = 100 * np.exp(np.cumsum(returns, axis=1))
+    open_ = np.concatenate([close[:, :1], close[:, :-1]], axis=1)
+    spread = np.abs(rng.normal(0, 0.0008, size=(n_symbols, n_bars))) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.integers(100, 5000, size=(n_symbols, n_bars)).astype(np.float64)
+
+    grids = np.split(
+        np.stack([open_, high, low, close, volume]),
+        np.cumsum([len(day_minutes) for day_minutes in minutes_per_day])[:-1],
+        axis=2,
+    )
+    return MinuteBars.from_day_grids(list(symbols), dates, minutes_per_day, grids)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from bar_store import load_minute_bars
+    from main import Aron20
+    from tickers import get_tickers_list_as_string
+
+    parser = argparse.ArgumentParser(description="Backtest Aron20 on local minute bars")
+    parser.add_argument("source", help="bar store directory or LEAN data folder")
+    parser.add_argument("start", type=date.fromisoformat)
+    parser.add_argument("end", type=date.fromisoformat)
+    parser.add_argument(
+        "--parameter",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="algorithm parameter, may be repeated",
+    )
+    parser.add_argument(
+        "--warm-up-days",
+        type=int,
+        default=7,
+        help="calendar days loaded before start for history requests",
+    )
+    args = parser.parse_args()
+
+    bars = load_minute_bars(
+        args.source,
+        get_tickers_list_as_string(),
+        args.start - timedelta(days=args.warm_up_days),
+        args.end,
+    )
+    result = run_backtest(
+        Aron20,
+        bars,
+        dict(parameter.split("=", 1) for parameter in args.parameter),
+        args.start,
+        args.end,
+    )
+    algorithm = result.algorithm
+    for _, message in algorithm.logs:
+        print(message)
+    print(
+        f"initialize {result.initialize_seconds:.2f}s, {result.time_steps} time steps, "
+        f"{result.bars} bars in {result.run_seconds:.2f}s "
+        f"({result.bars_per_second:,.0f} bars/s), "
+        f"portfolio value {algorithm.portfolio.total_portfolio_value:,.2f}"
+    )
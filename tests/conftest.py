@@ -0,0 +1,25 @@
+import os
+import sys
+from datetime import date
+
+import pytest
+
+# the algorithm modules import each other the way QuantConnect lays out a project,
+# AlgorithmImports comes from the local stand-in
+SOURCE_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "src")
+sys.path.insert(0, os.path.join(SOURCE_FOLDER, "aron20"))
+sys.path.insert(1, os.path.join(SOURCE_FOLDER, "lean_local"))
+
+from backtest import random_walk_minute_bars
+
+
+def make_minute_bars(n_symbols=3, n_days=4, seed=7, start=date(2023, 9, 18)):
+    """Random-walk minute bars on consecutive weekdays"""
+    return random_walk_minute_bars(
+        [f"SYM{index}" for index in range(n_symbols)], n_days, seed, start
+    )
+
+
+@pytest.fixture
+def minute_bars():
+    return make_minute_bars()
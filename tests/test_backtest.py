@@ -0,0 +1,209 @@
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from AlgorithmImports import (
+    OrderStatus,
+    OrderType,
+    QCAlgorithm,
+    Resolution,
+    SecurityChanges,
+    TimeInForce,
+    TradeBar,
+)
+from backtest import random_walk_minute_bars, run_backtest
+from main import Aron20
+from parameter_sweep import resolve_exits
+from signal_engine import run_signal_engine
+from strategy_config import StrategyConfig
+from tickers import get_tickers_list_as_string
+
+PARAMETERS = {"close_vwap_div_threshold": "0.3", "crv": "1"}
+
+
+def bar_end_utc(bars, bar):
+    session = bars.dates[bars.day[bar]].astype(object)
+    start = datetime(
+        session.year, session.month, session.day, tzinfo=ZoneInfo("America/New_York")
+    ) + timedelta(minutes=int(bars.minute[bar]))
+    end = (start + timedelta(minutes=1)).astimezone(ZoneInfo("UTC"))
+    return end.replace(tzinfo=None)
+
+
+@pytest.mark.parametrize(
+    "start",
+    [
+        date(2023, 9, 18),
+        # US daylight saving time still runs after Europe's ended on Oct 29th
+        date(2023, 10, 30),
+        # the day after Thanksgiving closes at 13:00
+        date(2023, 11, 22),
+    ],
+)
+def test_aron20_trades_match_signal_engine_and_exits(start):
+    bars = random_walk_minute_bars(get_tickers_list_as_string(), 4, seed=3, start=start)
+    result = run_backtest(Aron20, bars, PARAMETERS, bars.dates[0].astype(object))
+    orders = result.algorithm.transactions.get_orders()
+
+    # entry market orders and the first fill after each, a take profit, stop loss
+    # or liquidation
+    trades = {}
+    for order in orders:
+        if order.type == OrderType.MARKET and order.tag == "":
+            exit_order = next(
+                later
+                for later in orders
+                if later.id > order.id
+                and later.symbol == order.symbol
+                and later.status == OrderStatus.FILLED
+            )
+            trades[(str(order.symbol), order.time)] = (
+                1 if order.quantity > 0 else -1,
+                exit_order.average_fill_price,
+            )
+
+    entries = run_signal_engine(bars, StrategyConfig.from_parameters(PARAMETERS.get))
+    exits = resolve_exits(bars, entries)
+    expected = {
+        (bars.symbols[symbol], bar_end_utc(bars, bar)): (side, exit_price)
+        for symbol, bar, side, exit_price in zip(
+            entries.symbol, entries.bar, entries.side, exits.exit_price
+        )
+    }
+    assert len(expected) > 0
+    assert trades.keys() == expected.keys()
+    for key, (side, exit_price) in expected.items():
+        assert trades[key][0] == side
+        assert abs(trades[key][1] - exit_price) < 1e-9
+
+
+class Recorder(QCAlgorithm):
+    def initialize(self):
+        self.set_cash(10000)
+        self.symbol = self.add_equity("SYM0", Resolution.MINUTE).symbol
+        self.default_order_properties.time_in_force = TimeInForce.DAY
+        self.warm_up = self.history[TradeBar]([self.symbol], 30, Resolution.MINUTE)
+        self.events = []
+        self.bars = []
+        self.schedule.on(
+            self.date_rules.every_day(), self.time_rules.at(10, 0), self.on_schedule
+        )
+        self.scheduled = []
+
+    def on_schedule(self):
+        self.scheduled.append(self.time)
+
+    def on_data(self, data):
+        bar = data.Bars[self.symbol]
+        self.bars.append(bar)
+        if len(self.bars) == 1:
+            self.market_order(self.symbol, 10)
+            # the market order filled before it returned
+            self.quantity_after_market_order = self.Portfolio[self.symbol].Quantity
+            self.take_profit = self.LimitOrder(self.symbol, -10, bar.close * 10)
+            self.stop_loss = self.StopMarketOrder(self.symbol, -10, bar.close / 10)
+        elif len(self.bars) == 2:
+            self.transactions.cancel_order(self.stop_loss.order_id)
+            self.limit = self.limit_order(self.symbol, 5, bar.close * 10)
+
+    def on_order_event(self, order_event):
+        self.events.append((order_event.order_id, order_event.status))
+
+
+def test_orders_events_and_schedule():
+    bars = random_walk_minute_bars(["SYM0"], 3, seed=1)
+    start = bars.dates[1].astype(object)
+    algorithm = run_backtest(Recorder, bars, start=start).algorithm
+
+    assert len(algorithm.warm_up) == 30
+    assert algorithm.warm_up[-1][algorithm.symbol].end_time == datetime.combine(
+        bars.dates[0].astype(object), datetime.min.time()
+    ) + timedelta(hours=16)
+    assert algorithm.bars[0].time.date() == start
+    assert algorithm.quantity_after_market_order == 10
+
+    take_profit = algorithm.take_profit.order_id
+    stop_loss = algorithm.stop_loss.order_id
+    limit = algorithm.limit.order_id
+    assert algorithm.events[:2] == [(1, OrderStatus.SUBMITTED), (1, OrderStatus.FILLED)]
+    assert (stop_loss, OrderStatus.CANCELED) in algorithm.events
+    # a buy limit at ten times the price fills on the next bar at its open
+    assert (limit, OrderStatus.FILLED) in algorithm.events
+    assert algorithm.transactions.get_order_by_id(limit).average_fill_price == (
+        algorithm.bars[2].open
+    )
+    # the far take profit never filled and expired with the day
+    assert algorithm.events[-1] == (take_profit, OrderStatus.CANCELED)
+    assert algorithm.portfolio[algorithm.symbol].quantity == 15
+    # in algorithm time, which defaults to New York
+    assert [moment.time() for moment in algorithm.scheduled] == [
+        datetime(2000, 1, 1, 10).time()
+    ] * 2
+
+
+def test_history_frame_is_indexed_by_symbol_and_time():
+    class Frame(QCAlgorithm):
+        def initialize(self):
+            self.symbols = [self.add_equity(f"SYM{i}").symbol for i in range(2)]
+            self.frame = self.History(self.symbols, 14, Resolution.Minute)
+
+    bars = random_walk_minute_bars(["SYM0", "SYM1"], 2)
+    algorithm = run_backtest(
+        Frame, bars, start=date(2023, 9, 19), end=date(2023, 9, 19)
+    ).algorithm
+    assert len(algorithm.frame) == 28
+    assert len(algorithm.frame.loc[algorithm.symbols[1]]) == 14
+    assert list(algorithm.frame["volume"].loc["SYM0"]) == list(bars.volume[0, 376:390])
+
+
+def test_dynamic_universe_creates_and_frees_symbol_state():
+    class Dynamic(Aron20):
+        def on_securities_changed(self, changes):
+            super().on_securities_changed(changes)
+            self.changes.append(changes)
+            assert set(self._vwap) == set(self.state.index) == set(self.charts)
+            self.registered.append(sum(map(len, self._lean_indicators.values())))
+
+        changes = []
+        registered = []
+
+    bars = random_walk_minute_bars([f"SYM{i}" for i in range(30)], 6, seed=5)
+    parameters = dict(
+        PARAMETERS,
+        universe="dynamic",
+        universe_size="5",
+        universe_volume_threshold="150",
+    )
+    algorithm = run_backtest(
+        Dynamic, bars, parameters, bars.dates[1].astype(object)
+    ).algorithm
+
+    # twice the universe size, room for removals that wait for the liquidation
+    assert len(algorithm.state) == 10
+    assert any(changes.removed_securities for changes in algorithm.changes)
+    for registered in algorithm.registered:
+        # vwap, ema9, atr and the pipeline of each symbol, removed ones deregistered
+        assert registered == 4 * 5
+    # the added symbols reused the freed slots
+    assert max(algorithm.state.index.values()) < 5
+    added = {
+        str(security.symbol)
+        for changes in algorithm.changes
+        for security in changes.added_securities
+    }
+    traded = algorithm.journal.metrics.symbol_hit_rates()
+    assert traded and set(traded) <= added
+
+
+def test_static_universe_ignores_security_changes():
+    bars = random_walk_minute_bars(get_tickers_list_as_string(), 2, seed=5)
+    day = bars.dates[1].astype(object)
+    algorithm = run_backtest(Aron20, bars, PARAMETERS, day, day).algorithm
+    slots = dict(algorithm.state.index)
+    logs = len(algorithm.logs)
+    # LEAN reports the securities added in initialize as changes
+    securities = list(algorithm.securities.values())
+    algorithm.on_securities_changed(SecurityChanges(securities, []))
+    algorithm.on_securities_changed(SecurityChanges([], securities[:1]))
+    assert algorithm.state.index == slots and len(algorithm.logs) == logs
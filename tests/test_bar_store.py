@@ -0,0 +1,86 @@
+import os
+from datetime import date, datetime
+
+import numpy as np
+
+from bar_store import CURRENT, BarStore, BarStoreWriter, to_epoch_minutes
+
+
+def write_store(path, bars):
+    writer = BarStoreWriter(str(path))
+    for symbol_index, symbol in enumerate(bars.symbols):
+        for day_index, day in enumerate(bars.dates):
+            rows = slice(bars.day_offsets[day_index], bars.day_offsets[day_index + 1])
+            writer.add(
+                symbol,
+                day.astype(object),
+                np.column_stack(
+                    [
+                        bars.minute[rows],
+                        bars.open[symbol_index, rows],
+                        bars.high[symbol_index, rows],
+                        bars.low[symbol_index, rows],
+                        bars.close[symbol_index, rows],
+                        bars.volume[symbol_index, rows],
+                    ]
+                ),
+            )
+    return writer.close()
+
+
+def test_round_trip_to_minute_bars(tmp_path, minute_bars):
+    store = write_store(tmp_path, minute_bars)
+    loaded = store.to_minute_bars()
+    assert loaded.symbols == minute_bars.symbols
+    np.testing.assert_array_equal(loaded.dates, minute_bars.dates)
+    np.testing.assert_array_equal(loaded.day_offsets, minute_bars.day_offsets)
+    np.testing.assert_array_equal(loaded.minute, minute_bars.minute)
+    np.testing.assert_allclose(loaded.close, minute_bars.close, rtol=1e-6)
+    np.testing.assert_array_equal(loaded.volume, minute_bars.volume)
+
+
+def test_slices_are_zero_copy_views(tmp_path, minute_bars):
+    store = write_store(tmp_path, minute_bars)
+    bars = store.slice("SYM1", date(2023, 9, 19), date(2023, 9, 20))
+    assert len(bars) == 2 * 390
+    assert np.shares_memory(bars.close, store.columns["close"])
+    assert bars.time[0] == to_epoch_minutes(datetime(2023, 9, 19, 9, 30))
+
+    intraday = store.slice(
+        "SYM1", datetime(2023, 9, 19, 12, 0), datetime(2023, 9, 19, 12, 30)
+    )
+    assert len(intraday) == 30
+    np.testing.assert_allclose(
+        intraday.close, minute_bars.close[1, 390 + 150 : 390 + 180], rtol=1e-6
+    )
+
+
+def test_rewriting_keeps_other_symbol_days(tmp_path, minute_bars):
+    write_store(tmp_path, minute_bars)
+    writer = BarStoreWriter(str(tmp_path))
+    writer.add("NEW", date(2023, 9, 18), [[570, 1, 2, 0.5, 1.5, 10]])
+    writer.add("SYM0", date(2023, 9, 18), [[570, 1, 2, 0.5, 1.5, 10]])
+    store = writer.close()
+    assert store.symbols == ["NEW", "SYM0", "SYM1", "SYM2"]
+    assert len(store.slice("SYM0", date(2023, 9, 18), date(2023, 9, 18))) == 1
+    assert len(store.slice("SYM0")) == 1 + 3 * 390
+    assert len(BarStore(str(tmp_path)).slice("SYM2")) == 4 * 390
+
+
+def test_rewrites_swap_in_a_new_generation(tmp_path, minute_bars):
+    first = write_store(tmp_path, minute_bars)
+    second = write_store(tmp_path, minute_bars)
+    assert second.generation != first.generation
+    # a reader that opened the store before the swap keeps a consistent view
+    assert len(first.slice("SYM2")) == 4 * 390
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        [CURRENT, first.generation, second.generation]
+    )
+
+    # a writer that died before the swap leaves the current store alone
+    os.makedirs(tmp_path / "generation-000099")
+    third = write_store(tmp_path, minute_bars)
+    assert third.generation == "generation-000100"
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        [CURRENT, second.generation, third.generation]
+    )
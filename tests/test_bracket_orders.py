@@ -0,0 +1,231 @@
+from types import SimpleNamespace
+
+from AlgorithmImports import OrderDirection, OrderEvent, OrderStatus, OrderType
+from bracket_orders import BracketLeg, BracketOrderManager
+
+
+class SimulatedTicket:
+    def __init__(self, broker, order_id, quantity, type, limit_price, stop_price):
+        self.broker = broker
+        self.order_id = self.id = order_id
+        self.quantity = quantity
+        self.type = type
+        self.limit_price = limit_price
+        self.stop_price = stop_price
+        self.symbol = "SYM"
+        self.status = OrderStatus.NEW
+        self.quantity_filled = 0
+
+    def cancel(self, tag=""):
+        self.broker.cancels.append(self.order_id)
+        return True
+
+    def update_quantity(self, quantity, tag=""):
+        self.broker.updates.append((self.order_id, quantity))
+        self.quantity = quantity
+        return True
+
+
+class SimulatedBroker:
+    """Takes orders and leaves every event to the test, like a live brokerage"""
+
+    def __init__(self):
+        self.orders = []
+        self.cancels = []
+        self.updates = []
+        self.tickets = {}
+        self.portfolio = {"SYM": SimpleNamespace(quantity=0)}
+        self.manager = BracketOrderManager(self)
+
+    @property
+    def transactions(self):
+        return self
+
+    def get_order_ticket(self, order_id):
+        return self.tickets.get(order_id)
+
+    def get_open_orders(self, symbol=None):
+        return [
+            ticket
+            for ticket in self.tickets.values()
+            if ticket.status not in OrderStatus.CLOSED
+        ]
+
+    def restart(self, first_order_id):
+        """Reload the open orders under new ids, like LEAN after a restart"""
+        open_tickets = self.get_open_orders()
+        self.tickets = {}
+        for order_id, ticket in enumerate(open_tickets, first_order_id):
+            ticket.order_id = ticket.id = order_id
+            self.tickets[order_id] = ticket
+        self.manager = BracketOrderManager(self)
+
+    def _place(self, type, quantity, tag="", limit_price=None, stop_price=None):
+        ticket = SimulatedTicket(
+            self, len(self.orders) + 1, quantity, type, limit_price, stop_price
+        )
+        self.orders.append((type, quantity, tag))
+        self.tickets[ticket.order_id] = ticket
+        return ticket
+
+    def market_order(self, symbol, quantity, asynchronous=False, tag=""):
+        return self._place(OrderType.MARKET, quantity, tag)
+
+    def limit_order(self, symbol, quantity, limit_price, tag=""):
+        return self._place(OrderType.LIMIT, quantity, tag, limit_price=limit_price)
+
+    def stop_market_order(self, symbol, quantity, stop_price, tag=""):
+        return self._place(OrderType.STOP_MARKET, quantity, tag, stop_price=stop_price)
+
+    def event(self, order_id, status, fill_quantity=0):
+        ticket = self.tickets[order_id]
+        ticket.status = status
+        ticket.quantity_filled += fill_quantity
+        self.portfolio["SYM"].quantity += fill_quantity
+        if self.manager is None:
+            # the algorithm is down
+            return None
+        return self.manager.on_order_event(
+            OrderEvent(
+                order_id,
+                "SYM",
+                None,
+                status,
+                OrderDirection.BUY,
+                fill_quantity=fill_quantity,
+            )
+        )
+
+
+def submit(broker, quantity=100):
+    bracket = broker.manager.submit("SYM", quantity, take_profit=110, stop_loss=90)
+    for order_id in (1, 2, 3):
+        broker.event(order_id, OrderStatus.SUBMITTED)
+    return bracket
+
+
+def test_exits_are_submitted_with_the_entry_and_cancel_each_other():
+    broker = SimulatedBroker()
+    bracket = submit(broker)
+    assert broker.orders == [
+        (OrderType.MARKET, 100, ""),
+        (OrderType.LIMIT, -100, ""),
+        (OrderType.STOP_MARKET, -100, ""),
+    ]
+    assert broker.manager.acks == [1, 1, 1]
+
+    assert broker.event(1, OrderStatus.FILLED, 100).kind == BracketLeg.ENTRY
+    assert broker.cancels == [] and broker.updates == []
+    broker.event(2, OrderStatus.FILLED, -100)
+    assert broker.cancels == [3]
+    assert broker.event(3, OrderStatus.CANCELED).kind == BracketLeg.STOP_LOSS
+    assert bracket.closed and bracket.position == 0
+    assert broker.manager.legs == {}
+    # later events of the bracket's orders are no longer tracked
+    assert broker.event(3, OrderStatus.CANCELED) is None
+
+
+def test_partially_filled_entry_resizes_the_exits():
+    broker = SimulatedBroker()
+    submit(broker, quantity=-100)
+    broker.event(1, OrderStatus.PARTIALLY_FILLED, -40)
+    assert broker.updates == [(2, 40), (3, 40)]
+    broker.event(1, OrderStatus.PARTIALLY_FILLED, -30)
+    assert broker.updates[2:] == [(2, 70), (3, 70)]
+    broker.event(1, OrderStatus.CANCELED)
+    assert len(broker.updates) == 4
+
+
+def test_stop_fill_during_a_partially_filled_entry_only_sells_the_position():
+    broker = SimulatedBroker()
+    bracket = submit(broker)
+    broker.event(1, OrderStatus.PARTIALLY_FILLED, 40)
+    assert broker.updates == [(2, -40), (3, -40)]
+    broker.event(3, OrderStatus.FILLED, -40)
+    assert broker.cancels == [1, 2] and bracket.position == 0
+    broker.event(1, OrderStatus.CANCELED)
+    broker.event(2, OrderStatus.CANCELED)
+    assert bracket.closed and broker.manager.races == 0
+
+
+def test_partially_filled_exit_resizes_its_sibling():
+    broker = SimulatedBroker()
+    submit(broker)
+    broker.event(1, OrderStatus.FILLED, 100)
+    broker.event(3, OrderStatus.PARTIALLY_FILLED, -30)
+    # the stop keeps its total quantity, the take profit covers the remaining 70
+    assert broker.updates == [(2, -70)]
+    broker.event(3, OrderStatus.FILLED, -70)
+    assert broker.cancels == [2]
+
+
+def test_exit_fill_cancels_the_open_entry():
+    broker = SimulatedBroker()
+    submit(broker)
+    broker.event(1, OrderStatus.PARTIALLY_FILLED, 60)
+    broker.event(3, OrderStatus.PARTIALLY_FILLED, -20)
+    assert broker.cancels == [1]
+    broker.event(1, OrderStatus.CANCELED)
+    # the stop already sold 20 of its 60, the take profit covers the other 40
+    assert broker.updates == [(2, -60), (3, -60), (2, -40)]
+
+
+def test_cancel_race_closes_the_overfill():
+    broker = SimulatedBroker()
+    bracket = submit(broker)
+    broker.event(1, OrderStatus.FILLED, 100)
+    broker.event(2, OrderStatus.FILLED, -100)
+    assert broker.cancels == [3]
+    # the stop filled before the cancel reached the broker
+    broker.event(3, OrderStatus.FILLED, -100)
+    assert broker.orders[-1] == (OrderType.MARKET, 100, "Bracket overfill")
+    assert broker.manager.races == 1
+    assert bracket.closed and broker.manager.legs == {}
+
+
+def test_synchronous_events_are_matched_to_the_submitted_leg():
+    broker = SimulatedBroker()
+    place = broker.market_order
+
+    def filling_market_order(symbol, quantity, asynchronous=False, tag=""):
+        # events before the ticket is returned, like a backtest market order
+        ticket = place(symbol, quantity, asynchronous, tag)
+        broker.event(ticket.order_id, OrderStatus.SUBMITTED)
+        broker.event(ticket.order_id, OrderStatus.FILLED, quantity)
+        return ticket
+
+    broker.market_order = filling_market_order
+    bracket = broker.manager.submit("SYM", 100, take_profit=110, stop_loss=90)
+    assert bracket.entry.closed and bracket.position == 100
+    assert broker.updates == [] and broker.cancels == []
+    assert set(broker.manager.legs) == {1, 2, 3}
+    assert broker.manager.acks[BracketLeg.ENTRY] == 1
+
+
+def test_restored_brackets_match_the_reloaded_orders_and_holdings():
+    broker = SimulatedBroker()
+    submit(broker)
+    snapshot = broker.manager.snapshot()
+    assert snapshot["symbol"].tolist() == ["SYM"]
+    assert snapshot["take_profit"].tolist() == [110] and "order_id" not in snapshot
+    # while the algorithm was down the entry filled and the stop sold 30
+    broker.manager = None
+    broker.event(1, OrderStatus.FILLED, 100)
+    broker.event(3, OrderStatus.PARTIALLY_FILLED, -30)
+    # an unrelated order of the symbol, the stop it can be confused with by id
+    broker.stop_market_order("SYM", -5, stop_price=80)
+
+    # the open orders come back with new ids, 1 to 3 are other orders now
+    broker.restart(first_order_id=1)
+    take_profit, stop_loss, unrelated = (broker.tickets[i] for i in (1, 2, 3))
+    assert (take_profit.limit_price, stop_loss.stop_price) == (110, 90)
+    assert broker.manager.restore(snapshot) == 1
+    bracket = broker.manager.legs[2].bracket
+    assert bracket.position == 70 and bracket.entry.closed
+    assert 3 not in broker.manager.legs
+    # the take profit still covered all 100
+    assert broker.updates == [(1, -70)]
+
+    broker.event(2, OrderStatus.FILLED, -70)
+    assert broker.cancels == [1]
+    assert unrelated.status == OrderStatus.NEW
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+from chart_buffer import ChartBuffer
+
+START = datetime(2023, 9, 18, 16, 0)
+
+
+def make_buffer(**kwargs):
+    points = []
+
+    def sink(index, series, times, values):
+        points.append((index, series, list(times), values.tolist()))
+
+    return ChartBuffer(2, sink, **kwargs), points
+
+
+def lines(fibonacci_100=110.0):
+    return (100.0, 100.5, fibonacci_100, 106.0, 105.0, 104.0, 100.0)
+
+
+def test_points_reach_the_sink_only_on_flush():
+    buffer, points = make_buffer()
+    buffer.record(0, START, 1, 2, 0.5, 1.5, lines())
+    buffer.mark(1, "Entry", START, 99.0)
+    assert points == []
+    buffer.flush()
+    assert [series for _, series, _, _ in points] == [
+        "Price",
+        *ChartBuffer.LINE_SERIES,
+        "Entry",
+    ]
+    assert points[0] == (0, "Price", [START], [[1, 2, 0.5, 1.5]])
+    assert points[-1] == (1, "Entry", [START], [99.0])
+    buffer.flush()
+    assert len(points) == 9
+
+
+def test_decimation_every_n_minutes_and_on_level_change():
+    buffer, points = make_buffer(every_n_minutes=5, on_level_change=True)
+    kept = [
+        buffer.record(0, START + timedelta(minutes=minute), 1, 1, 1, 1, lines())
+        for minute in range(11)
+    ]
+    assert kept == [minute % 5 == 0 for minute in range(11)]
+    assert buffer.record(0, START + timedelta(minutes=11), 1, 1, 1, 1, lines(111.0))
+    assert (buffer.recorded, buffer.skipped) == (4, 8)
+
+
+def test_full_buffer_flushes_that_symbol():
+    buffer, points = make_buffer(capacity=2)
+    for minute in range(3):
+        buffer.record(1, START + timedelta(minutes=minute), 1, 1, 1, 1, lines())
+    assert {index for index, _, _, _ in points} == {1}
+    assert points[0][2] == [START, START + timedelta(minutes=1)]
+    assert buffer.count.tolist() == [0, 1]
@@ -1,6 +1,9 @@
 from src.aron20.main import Aron20
 
+
 def test_conditions():
-	aron = Aron20()
-	symbol = "AAPL"
-	aron.previous_minutes_close_over_ema9(symbol=symbol)
\ No newline at end of file
+    aron = Aron20()
+    aron.initialize()
+    symbol = "AAPL"
+    # no minute seen yet, so no close over the EMA9 to compare against
+    assert aron.previous_minutes_close_over_ema9(symbol=symbol) is False
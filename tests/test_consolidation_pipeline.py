@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from AlgorithmImports import ExponentialMovingAverage, TradeBar, WilliamsPercentR
+from consolidation_pipeline import ConsolidationPipeline, MinuteBarConsolidator
+from signal_engine import williams_percent_r
+from williams_percent_r import SlidingExtreme, SlidingWilliamsPercentR
+
+
+def minute_trade_bars(bars, symbol):
+    session = bars.dates[0].astype(object)
+    midnight = datetime(session.year, session.month, session.day)
+    stop = bars.day_offsets[1]
+    return [
+        TradeBar(
+            midnight + timedelta(minutes=int(bars.minute[bar])),
+            bars.symbols[symbol],
+            *(
+                float(getattr(bars, field)[symbol, bar])
+                for field in ("open", "high", "low", "close", "volume")
+            ),
+        )
+        for bar in range(stop)
+    ]
+
+
+def test_sliding_extreme_matches_naive_window():
+    values = np.random.default_rng(2).integers(0, 20, size=400).tolist()
+    for period in (1, 3, 180):
+        highest = SlidingExtreme(period, maximum=True)
+        lowest = SlidingExtreme(period, maximum=False)
+        for step, value in enumerate(values):
+            window = values[max(0, step - period + 1) : step + 1]
+            assert highest.add(value) == max(window)
+            assert lowest.add(value) == min(window)
+
+
+def test_sliding_williams_percent_r_matches_lean_wilr(minute_bars):
+    bars = minute_trade_bars(minute_bars, 0)
+    sliding = SlidingWilliamsPercentR("sliding", 180)
+    scanning = WilliamsPercentR("scanning", 180)
+    expected = williams_percent_r(minute_bars, 180)[0]
+    for step, bar in enumerate(bars):
+        assert sliding.update(bar) == scanning.update(bar)
+        assert sliding.current.value == scanning.current.value
+        assert abs(sliding.current.value - expected[step]) < 1e-9
+
+
+def test_consolidator_aggregates_clock_aligned_bars(minute_bars):
+    bars = minute_trade_bars(minute_bars, 1)
+    consolidator = MinuteBarConsolidator(15)
+    # every minute of the session is one step, 09:30 to 15:59
+    emitted = [consolidator.update(bar) for bar in bars]
+    consolidated = [bar for completed in emitted for bar in completed]
+    assert len(consolidated) == len(bars) // 15
+    assert [bool(completed) for completed in emitted[:15]] == [False] * 14 + [True]
+    first = consolidated[0]
+    assert (first.time.hour, first.time.minute) == (9, 30)
+    assert first.end_time == bars[14].end_time
+    assert first.open == bars[0].open
+    assert first.high == max(bar.high for bar in bars[:15])
+    assert first.low == min(bar.low for bar in bars[:15])
+    assert first.close == bars[14].close
+    assert first.volume == sum(bar.volume for bar in bars[:15])
+
+
+def test_consolidator_emits_the_bar_a_gap_left_open(minute_bars):
+    bars = minute_trade_bars(minute_bars, 0)
+    consolidator = MinuteBarConsolidator(5)
+    # 09:30 and 09:31, then nothing until 09:41
+    assert consolidator.update(bars[0]) == ()
+    assert consolidator.update(bars[1]) == ()
+    (partial,) = consolidator.update(bars[11])
+    assert partial.time == bars[0].time
+    assert partial.close == bars[1].close
+    assert partial.volume == bars[0].volume + bars[1].volume
+
+
+def test_pipeline_shares_one_consolidator_per_timeframe(minute_bars):
+    bars = minute_trade_bars(minute_bars, 0)
+    pipeline = ConsolidationPipeline("pipeline")
+    minute = pipeline.add(SlidingWilliamsPercentR("minute", 180))
+    five = pipeline.add(SlidingWilliamsPercentR("five", 12), minutes=5)
+    five_ema = pipeline.add(ExponentialMovingAverage("five ema", 9), minutes=5)
+    fifteen = pipeline.add(SlidingWilliamsPercentR("fifteen", 4), minutes=15)
+    assert len(pipeline.timeframes) == 2
+    assert pipeline.warm_up_period == 180
+
+    for bar in bars:
+        pipeline.update(bar)
+    assert minute.samples == len(bars)
+    assert five.samples == five_ema.samples == len(bars) // 5
+    assert fifteen.samples == len(bars) // 15
+
+    expected = SlidingWilliamsPercentR("expected", 4)
+    consolidator = MinuteBarConsolidator(15)
+    for bar in bars:
+        for consolidated in consolidator.update(bar):
+            expected.update(consolidated)
+    assert fifteen.current.value == expected.current.value
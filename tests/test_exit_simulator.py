@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from exit_simulator import (
+    LIQUIDATION,
+    NEAREST_TO_OPEN,
+    STOP_LOSS,
+    STOP_LOSS_FIRST,
+    TAKE_PROFIT,
+    ExitRules,
+    liquidation_bars,
+    simulate_exits,
+)
+
+
+def walk_exit(bars, flatten, symbol, entry_bar, side, take_profit, stop_loss, rules):
+    """One entry bar by bar, the way a backtest's fill loop sees it"""
+    last = max(flatten[bars.day[entry_bar]], entry_bar)
+    for bar in range(entry_bar + 1, last + 1):
+        high, low = bars.high[symbol, bar], bars.low[symbol, bar]
+        open_, close = bars.open[symbol, bar], bars.close[symbol, bar]
+        if side == 1:
+            profit, stop = high > take_profit, low < stop_loss
+        else:
+            profit, stop = low < take_profit, high > stop_loss
+        if profit and stop:
+            if rules.tie_break == STOP_LOSS_FIRST:
+                profit = False
+            elif rules.tie_break == NEAREST_TO_OPEN:
+                profit = abs(open_ - stop_loss) >= abs(open_ - take_profit)
+        if profit:
+            better = max if side == 1 else min
+            return bar, better(take_profit, open_), TAKE_PROFIT
+        if stop:
+            worse = min if side == 1 else max
+            return (
+                bar,
+                worse(stop_loss, close) * (1 - side * rules.stop_slippage),
+                STOP_LOSS,
+            )
+    close = bars.close[symbol, last]
+    return last, close * (1 - side * rules.liquidation_slippage), LIQUIDATION
+
+
+@pytest.mark.parametrize(
+    "rules",
+    [
+        ExitRules(),
+        ExitRules(tie_break=STOP_LOSS_FIRST, stop_slippage=0.001),
+        ExitRules(tie_break=NEAREST_TO_OPEN, liquidation_slippage=0.0005),
+    ],
+)
+def test_first_crossings_match_a_bar_by_bar_walk(minute_bars, rules):
+    bars = minute_bars
+    rng = np.random.default_rng(4)
+    n_entries = 400
+    symbol = rng.integers(0, bars.close.shape[0], n_entries)
+    entry_bar = rng.integers(0, bars.n_bars, n_entries)
+    side = rng.choice([-1, 1], n_entries)
+    price = bars.close[symbol, entry_bar]
+    # tight levels, so ties on a bar happen
+    take_profit = price * (1 + side * rng.uniform(0.0005, 0.01, n_entries))
+    stop_loss = price * (1 - side * rng.uniform(0.0005, 0.01, n_entries))
+    flatten = liquidation_bars(bars)
+
+    exits = simulate_exits(
+        bars, symbol, entry_bar, side, take_profit, stop_loss, rules=rules
+    )
+    expected = [
+        walk_exit(bars, flatten, *entry, rules)
+        for entry in zip(symbol, entry_bar, side, take_profit, stop_loss)
+    ]
+    assert exits.bar.tolist() == [bar for bar, _, _ in expected]
+    assert exits.reason.tolist() == [reason for _, _, reason in expected]
+    np.testing.assert_allclose(exits.price, [price for _, price, _ in expected])
+    assert len(set(exits.reason.tolist())) == 3
+    np.testing.assert_array_equal(
+        exits.holding_minutes, bars.minute[exits.bar] - bars.minute[entry_bar]
+    )
+
+
+def test_small_chunks_give_the_same_exits(minute_bars, monkeypatch):
+    bars = minute_bars
+    entry_bar = np.arange(0, bars.n_bars, 7)
+    price = bars.close[0, entry_bar]
+    arguments = (
+        bars,
+        np.zeros_like(entry_bar),
+        entry_bar,
+        1,
+        price * 1.003,
+        price * 0.997,
+    )
+    exits = simulate_exits(*arguments)
+    monkeypatch.setattr("exit_simulator.CHUNK_ELEMENTS", 50)
+    monkeypatch.setattr("exit_simulator.FIRST_WINDOW", 1)
+    chunked = simulate_exits(*arguments)
+    assert exits.bar.tolist() == chunked.bar.tolist()
+    assert exits.reason.tolist() == chunked.reason.tolist()
+    assert len(set(exits.reason.tolist())) == 3
+
+
+def test_rules_are_checked():
+    with pytest.raises(ValueError, match="tie_break"):
+        ExitRules(tie_break="random")
+    with pytest.raises(ValueError, match="slippage"):
+        ExitRules(stop_slippage=-0.1)
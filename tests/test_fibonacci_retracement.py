@@ -0,0 +1,60 @@
+from datetime import date, datetime
+
+import pytest
+
+from AlgorithmImports import TradeBar
+from fibonacci_retracement import FIBONACCI_RATIOS, FibonacciRetracementIndicator
+
+
+def bar(moment: datetime, high: float, low: float) -> TradeBar:
+    return TradeBar(moment, "SYM", low, high, low, low, 100)
+
+
+def test_levels_are_drawn_from_the_daily_range():
+    indicator = FibonacciRetracementIndicator("fib")
+    assert indicator.update(bar(datetime(2023, 9, 18, 9, 30), 110, 100))
+    assert [indicator.level(ratio) for ratio in FIBONACCI_RATIOS] == pytest.approx(
+        [110, 107.86, 106.18, 105, 103.82, 102.36, 100]
+    )
+    assert indicator.current.value == indicator.level(50) == 105
+    assert indicator._382.current.value == pytest.approx(103.82)
+
+    # the range grows, every level moves with it
+    assert indicator.update(bar(datetime(2023, 9, 18, 9, 31), 120, 101))
+    assert indicator.level(100) == 120 and indicator.level(50) == 110
+    assert indicator._0.current.value == 100
+
+
+def test_bars_inside_the_range_leave_the_levels_alone():
+    indicator = FibonacciRetracementIndicator("fib")
+    indicator.update(bar(datetime(2023, 9, 18, 9, 30), 110, 100))
+    levels = indicator.levels
+    before = list(levels)
+    assert indicator.update(bar(datetime(2023, 9, 18, 9, 31), 108, 101))
+    assert indicator.levels is levels and levels == before
+
+    # a new day without a range yet keeps the previous day's levels
+    assert not indicator.update(bar(datetime(2023, 9, 19, 9, 30), 50, 50))
+    assert indicator.current_day == date(2023, 9, 19) and levels == before
+    assert not indicator.update(bar(datetime(2023, 9, 19, 9, 31), 50, 50))
+    assert indicator.update(bar(datetime(2023, 9, 19, 9, 32), 60, 50))
+    assert indicator.level(100) == 60 and indicator.level(0) == 50
+
+
+def test_restore_merges_the_saved_range_of_the_same_day():
+    indicator = FibonacciRetracementIndicator("fib")
+    indicator.update(bar(datetime(2023, 9, 18, 9, 30), 110, 100))
+    indicator.restore(date(2023, 9, 18), 115, 105)
+    assert (indicator.current_high, indicator.current_low) == (115, 100)
+    assert indicator.level(100) == 115 and indicator.level(0) == 100
+
+    # ranges of earlier days are stale
+    indicator.restore(date(2023, 9, 15), 200, 10)
+    assert (indicator.current_high, indicator.current_low) == (115, 100)
+
+    fresh = FibonacciRetracementIndicator("fib")
+    fresh.restore(date(2023, 9, 18), 110, 100)
+    assert fresh.current_day == date(2023, 9, 18) and fresh.level(50) == 105
+    # the next bar of that day continues the restored range
+    fresh.update(bar(datetime(2023, 9, 18, 12, 0), 120, 104))
+    assert (fresh.current_high, fresh.current_low) == (120, 100)
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from AlgorithmImports import Fundamental, Symbol, TradeBar
+from high_volume_universe_selection_model import HighVolumeUniverseSelectionModel
+
+
+class HistoryAlgorithm:
+    """Serves minute volumes of some symbols, like history of the last minutes"""
+
+    def __init__(self, volumes: dict):
+        self.volumes = volumes
+        self.time = datetime(2023, 9, 18, 9, 30)
+        self.requests = []
+
+    def History(self, symbols, periods, resolution):
+        self.requests.append(list(symbols))
+        rows = [
+            (symbol, self.time - timedelta(minutes=periods - index), volume)
+            for symbol in symbols
+            if symbol in self.volumes
+            for index, volume in enumerate(self.volumes[symbol][-periods:])
+        ]
+        frame = pd.DataFrame(rows, columns=["symbol", "time", "volume"])
+        return frame.set_index(["symbol", "time"])
+
+
+def fundamentals(volumes: dict) -> list:
+    return [Fundamental(Symbol(ticker), 10.0, volume) for ticker, volume in volumes]
+
+
+def test_top_n_by_volume_of_the_symbols_with_history():
+    model = HighVolumeUniverseSelectionModel(period=3, volume_threshold=100, top_n=2)
+    algorithm = HistoryAlgorithm(
+        {
+            "A": [500, 600, 700],
+            "B": [900, 900, 900],
+            # a minute without volume
+            "C": [800, 0, 800],
+            "D": [300, 300, 300],
+            # below the threshold on average
+            "E": [50, 50, 300],
+        }
+    )
+    coarse = fundamentals(
+        [
+            ("A", 2e6),
+            ("B", 3e6),
+            ("C", 5e6),
+            ("D", 1e6),
+            ("E", 4e6),
+            # no minute history, e.g. just listed
+            ("F", 6e6),
+            ("G", 50),
+        ]
+    )
+    coarse.append(Fundamental(Symbol("H"), 10.0, 7e6, has_fundamental_data=False))
+
+    selected = model.select_coarse(algorithm, coarse)
+    # in dollar volume order, D passes but is not in the top 2
+    assert [str(symbol) for symbol in selected] == ["B", "A"]
+    assert model.filtered_symbols == selected
+    # one request for the candidates, G and H are filtered out before
+    assert [str(symbol) for symbol in algorithm.requests[0]] == list("FCEBAD")
+    assert "F" not in model.volume_cache
+
+
+def test_windows_seen_at_a_selection_are_reused_until_they_age():
+    model = HighVolumeUniverseSelectionModel(
+        period=2, volume_threshold=100, top_n=5, max_window_age=timedelta(days=3)
+    )
+    algorithm = HistoryAlgorithm({"A": [500, 500], "B": [400, 400], "C": [300, 300]})
+    model.select_coarse(algorithm, fundamentals([("A", 2e6), ("B", 1e6)]))
+
+    # no bars in between, C is a new candidate
+    algorithm.time += timedelta(days=1)
+    coarse = fundamentals([("A", 2e6), ("B", 1e6), ("C", 5e5)])
+    selected = model.select_coarse(algorithm, coarse)
+    assert [str(symbol) for symbol in algorithm.requests[1]] == ["C"]
+    assert [str(symbol) for symbol in selected] == ["A", "B", "C"]
+    assert (model.volume_cache.hits, model.volume_cache.misses) == (2, 3)
+
+    # the windows of A and B are older than three days now, C's is not
+    algorithm.time += timedelta(days=2, hours=12)
+    model.select_coarse(algorithm, coarse)
+    assert [str(symbol) for symbol in algorithm.requests[2]] == ["A", "B"]
+
+
+def test_windows_kept_current_by_bars_need_no_history():
+    model = HighVolumeUniverseSelectionModel(
+        period=2, volume_threshold=100, top_n=5, max_window_age=timedelta(hours=12)
+    )
+    algorithm = HistoryAlgorithm({"A": [500, 500], "B": [400, 400]})
+    coarse = fundamentals([("A", 2e6), ("B", 1e6)])
+    model.select_coarse(algorithm, coarse)
+
+    # A receives bars after the selection, B's window ages
+    algorithm.time += timedelta(days=1)
+    bar = TradeBar(algorithm.time, Symbol("A"), 10, 10, 10, 10, 50)
+    model.update(Symbol("A"), bar, algorithm.time)
+    algorithm.volumes["B"] = [300, 300]
+    selected = model.select_coarse(algorithm, coarse)
+    assert [str(symbol) for symbol in algorithm.requests[1]] == ["B"]
+    # A's window now holds the 50
+    assert [str(symbol) for symbol in selected] == ["B"]
+
+
+def test_windows_missing_from_the_history_refresh_are_dropped():
+    model = HighVolumeUniverseSelectionModel(
+        period=2, volume_threshold=100, top_n=5, max_window_age=timedelta(hours=12)
+    )
+    algorithm = HistoryAlgorithm({"A": [500, 500], "B": [400, 400]})
+    coarse = fundamentals([("A", 2e6), ("B", 1e6)])
+    model.select_coarse(algorithm, coarse)
+
+    # neither received bars, and B is no longer in the history, e.g. delisted
+    algorithm.time += timedelta(days=1)
+    del algorithm.volumes["B"]
+    selected = model.select_coarse(algorithm, coarse)
+    assert [str(symbol) for symbol in selected] == ["A"]
+    assert "B" not in model.volume_cache
+
+    # an empty refresh leaves no stale windows either
+    algorithm.time += timedelta(days=1)
+    algorithm.volumes.clear()
+    assert model.select_coarse(algorithm, coarse) == []
+    assert len(model.volume_cache) == 0
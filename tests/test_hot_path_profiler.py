@@ -0,0 +1,50 @@
+from hot_path_profiler import HotPathProfiler
+
+
+def test_laps_and_counters_roll_up_per_symbol_and_day():
+    profiler = HotPathProfiler(["A", "B"])
+    started = profiler.start()
+    started = profiler.lap(profiler.WINDOWS, profiler.ALL_SYMBOLS, started)
+    profiler.lap(profiler.VWAP_DIVERGENCE, 1, started)
+    profiler.count(profiler.BARS, [0, 1])
+    profiler.count(profiler.NOT_SIGNIFICANT, 1)
+    profiler.end_day("2023-09-18")
+    profiler.count(profiler.BARS, [1])
+    profiler.end_day("2023-09-19")
+    # nothing happened, no line for that day
+    profiler.end_day("2023-09-20")
+
+    assert profiler.calls[profiler.WINDOWS, -1] == 1
+    assert profiler.calls[profiler.VWAP_DIVERGENCE, 1] == 1
+    assert profiler.counters[profiler.BARS].tolist() == [1, 2, 0]
+    assert [day for day, _, _ in profiler.days] == ["2023-09-18", "2023-09-19"]
+    assert profiler.days[1][2][profiler.BARS] == 1
+
+    report = profiler.report()
+    assert report[0].startswith("stage windows: ")
+    assert "bars=3" in report[len(profiler.STAGES)]
+    assert report[-1].startswith("day 2023-09-19: ")
+
+
+def test_released_slots_start_over_and_keep_the_totals():
+    symbols = ["A", "B"]
+    profiler = HotPathProfiler(symbols)
+    profiler.lap(profiler.VWAP_DIVERGENCE, 1, profiler.start())
+    profiler.count(profiler.BARS, [0, 1])
+    profiler.count(profiler.ENTRIES, 1)
+    profiler.end_day("2023-09-18")
+
+    # C takes over the slot of B
+    profiler.release(1)
+    symbols[1] = "C"
+    assert profiler.counters[:, 1].sum() == profiler.calls[:, 1].sum() == 0
+    assert profiler.seconds[:, 1].sum() == 0
+    assert profiler.counters[profiler.BARS].tolist() == [1, 0, 1]
+    assert profiler.calls[profiler.VWAP_DIVERGENCE, -1] == 1
+
+    # nothing happened since, the release moves work without adding any
+    profiler.end_day("2023-09-19")
+    assert [day for day, _, _ in profiler.days] == ["2023-09-18"]
+    report = profiler.report()
+    assert "bars=2" in report[len(profiler.STAGES)]
+    assert "symbol C: 0.000s, 0 bars, 0 entries" in report
@@ -0,0 +1,87 @@
+import os
+from dataclasses import fields
+
+import numpy as np
+import pytest
+
+from indicator_cache import IndicatorCache, select_days
+from signal_engine import Indicators, compute_indicators
+from tests.conftest import make_minute_bars
+
+
+def assert_same_indicators(actual, expected):
+    # the smoothing's matrix products may round differently on fewer symbols
+    for field in fields(Indicators):
+        np.testing.assert_allclose(
+            getattr(actual, field.name), getattr(expected, field.name), rtol=1e-12
+        )
+
+
+def test_cached_indicators_match_and_are_computed_once(minute_bars, tmp_path):
+    cache = IndicatorCache(str(tmp_path))
+    expected = compute_indicators(minute_bars)
+    assert_same_indicators(cache.indicators(minute_bars), expected)
+    # one series per symbol and day
+    assert (cache.hits, cache.misses) == (0, 12)
+
+    again = IndicatorCache(str(tmp_path))
+    assert_same_indicators(again.indicators(minute_bars), expected)
+    assert (again.hits, again.misses) == (12, 0)
+
+
+def test_changed_bars_only_recompute_the_days_depending_on_them(minute_bars, tmp_path):
+    cache = IndicatorCache(str(tmp_path))
+    cache.indicators(minute_bars)
+    # a bar on the first day, the two days after it still depend on it
+    minute_bars.close[1, 10] *= 1.01
+    indicators = cache.indicators(minute_bars)
+    assert (cache.hits, cache.misses) == (9, 12 + 3)
+    assert_same_indicators(indicators, compute_indicators(minute_bars))
+
+
+def test_extended_and_shifted_ranges_reuse_the_cached_days(tmp_path):
+    bars = make_minute_bars(n_days=6)
+    IndicatorCache(str(tmp_path)).indicators(select_days(bars, 0, 4))
+
+    extended = IndicatorCache(str(tmp_path))
+    assert_same_indicators(extended.indicators(bars), compute_indicators(bars))
+    assert (extended.hits, extended.misses) == (3 * 4, 3 * 2)
+
+    # the first two days of the shifted range have a shorter warm up
+    shifted_bars = select_days(bars, 1, 6)
+    shifted = IndicatorCache(str(tmp_path))
+    assert_same_indicators(
+        shifted.indicators(shifted_bars), compute_indicators(shifted_bars)
+    )
+    assert (shifted.hits, shifted.misses) == (3 * 3, 3 * 2)
+
+
+def test_least_recently_used_files_are_evicted(minute_bars, tmp_path):
+    cache = IndicatorCache(str(tmp_path))
+    cache.indicators(minute_bars)
+    keys = [key for row in range(3) for key in cache.keys(minute_bars, row)]
+    file_size = cache.size() // len(keys)
+    paths = [cache._path(key) for key in keys]
+    for age, path in enumerate(paths):
+        os.utime(path, ns=(age * 10**9, age * 10**9))
+
+    # the oldest file is read, the second oldest is the least recently used then
+    small = IndicatorCache(str(tmp_path), max_bytes=(len(keys) - 1) * file_size)
+    assert small._read(keys[0], minute_bars.day_offsets[1]) is not None
+    assert small.evict() == 1
+    assert [os.path.exists(path) for path in paths[:3]] == [True, False, True]
+    assert small.size() <= small.max_bytes
+
+
+def test_unreadable_files_are_computed_again(minute_bars, tmp_path):
+    cache = IndicatorCache(str(tmp_path))
+    cache.indicators(minute_bars)
+    path = cache._path(cache.keys(minute_bars, 2)[3])
+    with open(path, "r+b") as file:
+        file.truncate(100)
+    indicators = cache.indicators(minute_bars)
+    assert cache.misses == 12 + 1
+    assert_same_indicators(indicators, compute_indicators(minute_bars))
+
+    with pytest.raises(ValueError, match="max_bytes"):
+        IndicatorCache(str(tmp_path), max_bytes=0)
@@ -0,0 +1,113 @@
+from datetime import datetime, time
+
+from AlgorithmImports import (
+    AverageTrueRange,
+    ExponentialMovingAverage,
+    IndicatorDataPoint,
+    TradeBar,
+    WilliamsPercentR,
+)
+from indicator_warm_up import IndicatorWarmUp
+from tests.conftest import make_minute_bars
+
+
+def trade_bars(bars, symbol: str, periods: int) -> list:
+    """The last `periods` minute bars of the first day, as history before the next"""
+    index = bars.symbol_index(symbol)
+    day = bars.dates[0].astype(object)
+    end = bars.day_offsets[1]
+    return [
+        TradeBar(
+            datetime.combine(day, time(*divmod(int(bars.minute[i]), 60))),
+            symbol,
+            bars.open[index, i],
+            bars.high[index, i],
+            bars.low[index, i],
+            bars.close[index, i],
+            bars.volume[index, i],
+        )
+        for i in range(end - periods, end)
+    ]
+
+
+class HistoryAlgorithm:
+    """Serves `history[TradeBar](symbols, periods, resolution)` from minute bars"""
+
+    def __init__(self, bars):
+        self.bars = bars
+        self.history = self
+        self.requests = []
+
+    def __getitem__(self, data_type):
+        return self.trade_bars
+
+    def trade_bars(self, symbols, periods, resolution):
+        self.requests.append((list(symbols), periods))
+        by_symbol = [trade_bars(self.bars, symbol, periods) for symbol in symbols]
+        return [
+            {bar.symbol: bar for bar in minute_bars} for minute_bars in zip(*by_symbol)
+        ]
+
+
+class Recorder:
+    def __init__(self):
+        self.inputs = []
+
+    def update(self, input):
+        self.inputs.append(input)
+
+
+def indicators() -> tuple:
+    return (
+        ExponentialMovingAverage("ema", 9),
+        AverageTrueRange("atr", 14),
+        WilliamsPercentR("wilr", 180),
+    )
+
+
+def test_one_history_request_warms_up_like_one_per_indicator():
+    bars = make_minute_bars()
+    warm_up = IndicatorWarmUp()
+    recorders, warmed_up = {}, {}
+    for symbol in bars.symbols:
+        recorders[symbol] = bar_recorder, point_recorder = Recorder(), Recorder()
+        warmed_up[symbol] = ema, atr, wilr = indicators()
+        warm_up.add(symbol, [bar_recorder, atr], periods=14)
+        warm_up.add(symbol, [point_recorder, ema], periods=9, data_point=True)
+        warm_up.add(symbol, [wilr], periods=180)
+
+    algorithm = HistoryAlgorithm(bars)
+    assert warm_up.run(algorithm) == 180 * 3
+    # the largest lookback is fetched once for every symbol
+    assert algorithm.requests == [(bars.symbols, 180)]
+
+    for symbol in bars.symbols:
+        # the plain way, a history request per symbol and lookback
+        ema, atr, wilr = expected = indicators()
+        for bar in trade_bars(bars, symbol, 14):
+            atr.update(bar)
+        for bar in trade_bars(bars, symbol, 9):
+            ema.update(IndicatorDataPoint(bar.end_time, bar.close))
+        for bar in trade_bars(bars, symbol, 180):
+            wilr.update(bar)
+
+        # each indicator gets the tail of its lookback
+        history = trade_bars(bars, symbol, 180)
+        bar_recorder, point_recorder = recorders[symbol]
+        assert [bar.time for bar in bar_recorder.inputs] == [
+            bar.time for bar in history[-14:]
+        ]
+        assert [(point.time, point.value) for point in point_recorder.inputs] == [
+            (bar.end_time, bar.close) for bar in history[-9:]
+        ]
+        assert [
+            (indicator.is_ready, indicator.current.value)
+            for indicator in warmed_up[symbol]
+        ] == [(indicator.is_ready, indicator.current.value) for indicator in expected]
+        assert all(indicator.is_ready for indicator in warmed_up[symbol])
+
+
+def test_nothing_is_requested_without_indicators():
+    algorithm = HistoryAlgorithm(make_minute_bars())
+    assert IndicatorWarmUp().run(algorithm) == 0
+    assert algorithm.requests == []
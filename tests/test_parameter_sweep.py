@@ -0,0 +1,87 @@
+import numpy as np
+
+from parameter_sweep import (
+    LIQUIDATION,
+    STOP_LOSS,
+    TAKE_PROFIT,
+    SharedBarStore,
+    evaluate,
+    expand_grid,
+    liquidation_bars,
+    resolve_exits,
+    run_parameter_sweep,
+)
+from signal_engine import Entries, compute_indicators, entry_window_mask
+from tests.conftest import make_minute_bars
+
+
+def make_entries(bars, symbol, bar, side, take_profit, stop_loss):
+    return Entries(
+        long=None,
+        short=None,
+        symbol=np.array([symbol]),
+        bar=np.array([bar]),
+        side=np.array([side], dtype=np.int8),
+        price=np.array([bars.close[symbol, bar]]),
+        take_profit=np.array([take_profit]),
+        stop_loss=np.array([stop_loss]),
+    )
+
+
+def test_expand_grid():
+    assert expand_grid({"crv": [1, 2], "close_vwap_div_threshold": [0.5]}) == [
+        {"crv": 1, "close_vwap_div_threshold": 0.5},
+        {"crv": 2, "close_vwap_div_threshold": 0.5},
+    ]
+
+
+def test_liquidation_bar_ends_at_2155_berlin(minute_bars):
+    # 15:54 New York bar ends 21:55 Berlin in September
+    flatten = liquidation_bars(minute_bars)
+    assert (minute_bars.minute[flatten] == 15 * 60 + 54).all()
+
+
+def test_resolve_exits(minute_bars):
+    bars = minute_bars
+    close = bars.close[0, 100]
+    later_high = bars.high[0, 101:].max()
+
+    take_profit = make_entries(bars, 0, 100, 1, close * 0.999, close * 0.5)
+    trades = resolve_exits(bars, take_profit)
+    assert trades.exit_reason[0] == TAKE_PROFIT
+
+    stop = make_entries(bars, 0, 100, -1, close * 0.5, close * 0.999)
+    assert resolve_exits(bars, stop).exit_reason[0] == STOP_LOSS
+
+    untouched = make_entries(bars, 0, 100, 1, later_high * 2, close * 0.1)
+    trades = resolve_exits(bars, untouched)
+    assert trades.exit_reason[0] == LIQUIDATION
+    assert trades.exit_bar[0] == liquidation_bars(bars)[0]
+
+
+def test_pool_results_match_in_process_evaluation():
+    bars = make_minute_bars(n_symbols=4, n_days=5, seed=3)
+    grid = {"close_vwap_div_threshold": [0.05, 0.1], "crv": [0.0, 0.5]}
+    results = run_parameter_sweep(bars, grid, max_workers=2)
+
+    indicators = compute_indicators(bars)
+    in_window = entry_window_mask(bars)
+    flatten = liquidation_bars(bars)
+    expected = [
+        evaluate(bars, indicators, in_window, flatten, point)
+        for point in expand_grid(grid)
+    ]
+    assert results == expected
+    assert any(result.trades for result in results)
+
+
+def test_shared_store_views_match_source(minute_bars):
+    with SharedBarStore(minute_bars) as store:
+        memory, (bars, indicators, in_window, flatten) = SharedBarStore.attach(
+            store.descriptor
+        )
+        np.testing.assert_array_equal(bars.close, minute_bars.close)
+        np.testing.assert_array_equal(bars.day_offsets, minute_bars.day_offsets)
+        assert bars.symbols == minute_bars.symbols
+        del bars, indicators, in_window, flatten
+        memory.close()
@@ -0,0 +1,87 @@
+import pytest
+
+from backtest import random_walk_minute_bars, run_backtest
+from main import Aron20
+from position_sizing import PositionSizer, RiskLimits
+from tickers import get_tickers_list_as_string
+from trade_journal import load_journal
+
+
+def make_sizer(limits=RiskLimits()):
+    sizer = PositionSizer(4, limits)
+    for index, sector in enumerate(["tech", "tech", "energy", None]):
+        sizer.set_sector(index, sector)
+    return sizer
+
+
+def test_uncapped_entries_risk_their_share_on_the_stop():
+    sizer = make_sizer()
+    snapshot = sizer.snapshot(100000, [], [])
+    quantities = sizer.size(
+        snapshot, [0, 1, 2, 3], [50.0] * 4, [0.3, 2.0, 0.0, -1.0], 0.01
+    )
+    # int() of 1000 / 0.3 like the per entry sizing, no size without a stop distance
+    assert quantities.tolist() == [3333, 500, 0, 0]
+
+
+def test_entries_are_cut_to_the_caps_in_order():
+    limits = RiskLimits(max_gross_exposure=1.0, max_sector_exposure=0.4)
+    sizer = make_sizer(limits)
+    # 30000 in tech and 10000 unknown are held already
+    snapshot = sizer.snapshot(100000, [1, 3], [-30000.0, 10000.0])
+    assert snapshot.gross_exposure == 40000 and snapshot.positions == 2
+    assert list(snapshot.sector_exposure) == [30000, 0]
+
+    # every entry asks for 1000 shares at 20, i.e. 20000
+    quantities = sizer.size(snapshot, [0, 2, 0, 3, 2], [20.0] * 5, [1.0] * 5, 0.01)
+    # tech has 10000 left, energy 40000 but the gross cap only 60000 overall
+    assert quantities.tolist() == [500, 1000, 0, 1000, 1000 - 500]
+
+    limits = RiskLimits(max_positions=3)
+    quantities = make_sizer(limits).size(
+        snapshot, [0, 2, 3], [20.0] * 3, [1.0] * 3, 0.01
+    )
+    assert quantities.tolist() == [1000, 0, 0]
+
+    # an entry the exhausted tech budget leaves without shares takes no slot
+    limits = RiskLimits(max_sector_exposure=0.3, max_positions=3)
+    quantities = make_sizer(limits).size(
+        snapshot, [0, 2, 3], [20.0] * 3, [1.0] * 3, 0.01
+    )
+    assert quantities.tolist() == [0, 1000, 0]
+
+
+def test_limits_come_from_the_parameters():
+    assert RiskLimits.from_parameters({"max_positions": "3"}.get) == RiskLimits(
+        max_positions=3.0
+    )
+    with pytest.raises(ValueError, match="positive"):
+        RiskLimits(max_gross_exposure=0)
+    with pytest.raises(ValueError, match="invalid max_positions"):
+        RiskLimits.from_parameters({"max_positions": "x"}.get)
+
+
+def test_aron20_holds_at_most_max_positions(tmp_path):
+    bars = random_walk_minute_bars(get_tickers_list_as_string(), 4, seed=3)
+    parameters = {
+        "close_vwap_div_threshold": "0.3",
+        "crv": "1",
+        "trade_journal_path": str(tmp_path),
+    }
+    uncapped = run_backtest(
+        Aron20, bars, parameters, bars.dates[0].astype(object)
+    ).algorithm
+    capped = run_backtest(
+        Aron20,
+        bars,
+        dict(parameters, max_positions="2", trade_journal_path=str(tmp_path / "c")),
+        bars.dates[0].astype(object),
+    ).algorithm
+    assert 0 < capped.journal.metrics.trades < uncapped.journal.metrics.trades
+
+    trades = load_journal(str(tmp_path / "c"))
+    for entry_time in trades["entry_time"]:
+        open_trades = (trades["entry_time"] <= entry_time) & (
+            trades["exit_time"] > entry_time
+        )
+        assert open_trades.sum() <= 2
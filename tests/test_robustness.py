@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+
+from parameter_sweep import Trades, summarize
+from robustness import (
+    BOOTSTRAP,
+    HISTOGRAM_BINS,
+    PERMUTATION,
+    draw_indices,
+    resample_metrics,
+    run_robustness,
+    trades_from_journal,
+)
+from signal_engine import Entries
+from trade_journal import LIQUIDATION, STOP_LOSS, TAKE_PROFIT
+
+
+def make_trades(n_trades=200, seed=2):
+    rng = np.random.default_rng(seed)
+    take_profit = rng.random(n_trades) < 0.45
+    pnl = np.where(
+        take_profit, rng.uniform(50, 150, n_trades), -rng.uniform(20, 120, n_trades)
+    )
+    return pnl, take_profit
+
+
+def test_metrics_of_the_original_order_match_the_sweep_summary():
+    pnl, take_profit = make_trades(50)
+    identity = np.arange(50)[None, :]
+    take_profits, expectancy, max_drawdown = resample_metrics(
+        pnl, take_profit, identity
+    )
+    summary = summarize(
+        {},
+        Trades(
+            entries=Entries(
+                long=None,
+                short=None,
+                symbol=np.zeros(50, dtype=np.int64),
+                bar=np.arange(50),
+                side=np.ones(50, dtype=np.int8),
+                price=np.zeros(50),
+                take_profit=np.zeros(50),
+                stop_loss=np.zeros(50),
+            ),
+            quantity=np.ones(50),
+            exit_bar=np.arange(50),
+            exit_price=pnl,
+            exit_reason=np.where(take_profit, TAKE_PROFIT, STOP_LOSS),
+        ),
+    )
+    assert take_profits[0] / 50 == summary.hit_rate
+    assert expectancy[0] == pytest.approx(summary.pnl / 50)
+    assert max_drawdown[0] == pytest.approx(summary.max_drawdown)
+
+
+@pytest.mark.parametrize("method", [BOOTSTRAP, PERMUTATION])
+def test_intervals_match_the_quantiles_of_all_resamples(method, monkeypatch):
+    pnl, take_profit = make_trades()
+    # several chunks on two workers
+    monkeypatch.setattr("robustness.CHUNK_ELEMENTS", 200 * 700)
+    report = run_robustness(
+        pnl, take_profit, resamples=3000, method=method, seed=5, max_workers=2
+    )
+
+    # the same seeds evaluated at once, without histograms
+    seeds = np.random.SeedSequence(5).spawn(5)
+    sizes = [700, 700, 700, 700, 200]
+    metrics = [
+        np.concatenate(values)
+        for values in zip(
+            *(
+                resample_metrics(
+                    pnl,
+                    take_profit,
+                    draw_indices(method, np.random.default_rng(seed), size, 200),
+                )
+                for size, seed in zip(sizes, seeds)
+            )
+        )
+    ]
+    quantiles = [0.025, 0.5, 0.975]
+    hit_rate = np.quantile(metrics[0] / 200, quantiles, method="inverted_cdf")
+    assert [
+        report.hit_rate.low,
+        report.hit_rate.median,
+        report.hit_rate.high,
+    ] == pytest.approx(hit_rate)
+    for interval, values, value_range in (
+        (report.expectancy, metrics[1], np.ptp(pnl)),
+        (report.max_drawdown, metrics[2], -200 * pnl.min()),
+    ):
+        np.testing.assert_allclose(
+            [interval.low, interval.median, interval.high],
+            np.quantile(values, quantiles, method="inverted_cdf"),
+            atol=value_range / HISTOGRAM_BINS,
+        )
+
+    assert report.max_drawdown.low < report.max_drawdown.high
+    if method == PERMUTATION:
+        assert report.hit_rate.low == report.hit_rate.high == take_profit.mean()
+    else:
+        assert report.hit_rate.low < take_profit.mean() < report.hit_rate.high
+    assert len(report.report()) == 4
+
+
+def test_journal_trades_are_taken_in_exit_order():
+    columns = {
+        "pnl": np.array([1.0, -2.0, 3.0]),
+        "exit_reason": np.array([TAKE_PROFIT, STOP_LOSS, LIQUIDATION], dtype=np.int8),
+        "exit_time": np.array(
+            ["2023-09-18T16:00", "2023-09-18T15:00", "2023-09-18T15:30"],
+            dtype="datetime64[s]",
+        ),
+    }
+    pnl, take_profit = trades_from_journal(columns)
+    assert pnl.tolist() == [-2.0, 3.0, 1.0]
+    assert take_profit.tolist() == [False, False, True]
+
+
+def test_arguments_are_checked():
+    with pytest.raises(ValueError, match="no trades"):
+        run_robustness([], [])
+    with pytest.raises(ValueError, match="method"):
+        run_robustness([1.0], [True], method="jackknife")
+    with pytest.raises(ValueError, match="confidence"):
+        run_robustness([1.0], [True], confidence=1.5)
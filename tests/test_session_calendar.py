@@ -0,0 +1,94 @@
+from datetime import date, time
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+
+from AlgorithmImports import OrderType
+from backtest import random_walk_minute_bars, run_backtest
+from exit_simulator import liquidation_bars
+from main import Aron20
+from session_calendar import SessionCalendar, is_early_close
+from strategy_config import StrategyConfig
+from tickers import get_tickers_list_as_string
+
+
+def test_early_closes():
+    early = [date(2023, 7, 3), date(2023, 11, 24), date(2024, 7, 3), date(2024, 12, 24)]
+    regular = [
+        # July 3rd and December 24th on Fridays are holidays
+        date(2026, 7, 3),
+        date(2021, 12, 24),
+        date(2023, 11, 17),
+        date(2023, 12, 22),
+    ]
+    assert [is_early_close(day) for day in early] == [True] * 4
+    assert [is_early_close(day) for day in regular] == [False] * 4
+
+
+def test_sessions_keep_their_exchange_time_when_daylight_saving_is_out_of_sync():
+    calendar = SessionCalendar()
+    in_sync = calendar.session(date(2023, 10, 23))
+    out_of_sync = calendar.session(date(2023, 10, 30))
+    assert (in_sync.algorithm_offset, out_of_sync.algorithm_offset) == (360, 300)
+    for session in (in_sync, out_of_sync):
+        # 12:00 to 15:00 New York time, flattened at 15:55
+        assert (session.entry_start_minute, session.entry_end_minute) == (720, 900)
+        assert session.flatten_minute == 955
+        assert session.in_entry_window(721) and not session.in_entry_window(900)
+
+    early_close = calendar.session(date(2023, 11, 24))
+    assert (early_close.close_minute, early_close.flatten_minute) == (780, 775)
+    # no entries after the liquidation
+    assert early_close.entry_end_minute == 775
+
+    late = SessionCalendar(StrategyConfig(entry_window_end=time(21, 30)))
+    assert late.session(date(2023, 10, 23)).entry_end_minute == 930
+    minutes = late.minutes(np.array(["2023-10-23", "2023-11-24"], "datetime64[D]"))
+    assert minutes["entry_end_minute"].tolist() == [930, 775]
+
+
+def test_liquidation_bars_follow_early_closes():
+    bars = random_walk_minute_bars(["SYM0"], 3, start=date(2023, 11, 22))
+    # the bars starting at 15:54 and 12:54, i.e. ending at the flatten minute
+    assert bars.minute[liquidation_bars(bars)].tolist() == [954, 954, 774]
+
+
+def test_aron20_trades_in_exchange_time_when_daylight_saving_is_out_of_sync():
+    # US daylight saving time ends on November 5th, a week after Europe's
+    bars = random_walk_minute_bars(
+        get_tickers_list_as_string(), 5, seed=5, start=date(2023, 10, 30)
+    )
+    parameters = {"close_vwap_div_threshold": "0.3", "crv": "1"}
+    algorithm = run_backtest(
+        Aron20, bars, parameters, bars.dates[0].astype(object)
+    ).algorithm
+    new_york = ZoneInfo("America/New_York")
+    entries, liquidations = set(), set()
+    for order in algorithm.transactions.get_orders():
+        if order.type != OrderType.MARKET:
+            continue
+        moment = order.time.replace(tzinfo=ZoneInfo("UTC")).astimezone(new_york).time()
+        (liquidations if order.tag == "Liquidated" else entries).add(moment)
+    assert entries and all(time(12, 0) < moment < time(15, 0) for moment in entries)
+    # 21:55 Berlin time would have been 16:55, after the close
+    assert liquidations == {time(15, 55)}
+
+
+def test_aron20_schedules_on_the_market_hours_without_subscribing_to_them():
+    bars = random_walk_minute_bars(get_tickers_list_as_string(), 2, seed=5)
+    assert Aron20.MARKET_HOURS_TICKER not in bars.symbols
+    parameters = {"close_vwap_div_threshold": "0.3", "crv": "1"}
+    algorithm = run_backtest(
+        Aron20, bars, parameters, bars.dates[0].astype(object)
+    ).algorithm
+    assert Aron20.MARKET_HOURS_TICKER not in algorithm.securities
+    # a ticker that was never added can't be resolved
+    with pytest.raises(KeyError, match=Aron20.MARKET_HOURS_TICKER):
+        algorithm.time_rules.before_market_close(Aron20.MARKET_HOURS_TICKER)
+    assert [event.name for event in algorithm.schedule.events][1] == (
+        "EveryDay: SPY: 5 min before MarketClose"
+    )
+    assert any(
+        order.tag == "Liquidated" for order in algorithm.transactions.get_orders()
+    )
@@ -0,0 +1,181 @@
+from collections import deque
+from datetime import date
+
+import numpy as np
+import pytest
+
+from session_calendar import SessionCalendar
+from signal_engine import _rolling_extreme, compute_indicators, find_entries
+from strategy_config import StrategyConfig
+from tests.conftest import make_minute_bars
+
+
+def replay_on_data(bars, close_vwap_div_threshold, crv):
+    """Bar-by-bar replica of Aron20.on_data with LEAN-style indicator updates"""
+    calendar = SessionCalendar()
+    sessions = [calendar.session(day) for day in bars.dates.astype(object)]
+    day_of_bar = bars.day
+    entries = []
+    for s in range(bars.n_symbols):
+        ema9 = atr = vwap = None
+        ema_samples, atr_samples = [], []
+        previous_ema9 = None
+        previous_close_for_tr = None
+        highs, lows = deque(maxlen=180), deque(maxlen=180)
+        vwap_day, price_volume, volume = None, 0.0, 0.0
+        fib_day, fib_high, fib_low, levels = None, None, None, None
+        close_window, ema9_window = deque(maxlen=10), deque(maxlen=10)
+        previous_minute_close = float("-inf")
+        traded_day = None
+        for t in range(bars.n_bars):
+            o, h, l, c, v = (
+                bars.open[s, t],
+                bars.high[s, t],
+                bars.low[s, t],
+                bars.close[s, t],
+                bars.volume[s, t],
+            )
+            day = day_of_bar[t]
+            # indicators update before on_data
+            if vwap_day != day:
+                vwap_day, price_volume, volume = day, 0.0, 0.0
+            price_volume += (h + l + c) / 3 * v
+            volume += v
+            vwap = price_volume / volume if volume else (h + l + c) / 3
+
+            previous_ema9 = ema9
+            ema_samples.append(c)
+            if len(ema_samples) <= 9:
+                ema9 = sum(ema_samples) / len(ema_samples)
+            else:
+                ema9 = ema9 + 0.2 * (c - ema9)
+
+            if previous_close_for_tr is None:
+                true_range = h - l
+            else:
+                true_range = max(
+                    h - l,
+                    abs(h - previous_close_for_tr),
+                    abs(l - previous_close_for_tr),
+                )
+            previous_close_for_tr = c
+            atr_samples.append(true_range)
+            if len(atr_samples) <= 14:
+                atr = sum(atr_samples) / len(atr_samples)
+            else:
+                atr = atr + (true_range - atr) / 14
+
+            highs.append(h)
+            lows.append(l)
+            highest, lowest = max(highs), min(lows)
+            wilr = (
+                0.0 if highest == lowest else -100 * (highest - c) / (highest - lowest)
+            )
+
+            if fib_day != day:
+                fib_day, fib_high, fib_low = day, h, l
+            else:
+                fib_high, fib_low = max(fib_high, h), min(fib_low, l)
+            if fib_high != fib_low:
+                diff = fib_high - fib_low
+                levels = {
+                    r: fib_low + r / 100 * diff
+                    for r in (0, 23.6, 38.2, 50, 61.8, 78.6, 100)
+                }
+
+            # on_data
+            if traded_day == day:
+                continue
+            close_window.appendleft(c)
+            ema9_window.appendleft(ema9)
+            end_minute = bars.minute[t] + 1
+            if not sessions[day].in_entry_window(end_minute) or levels is None:
+                previous_minute_close = c
+                continue
+
+            divergence = (vwap - c) / vwap * 100
+            if 3 >= abs(divergence) >= close_vwap_div_threshold:
+                stop_long = levels[0] - 2 * atr
+                stop_short = levels[100] + 2 * atr
+                if (
+                    vwap > levels[50]
+                    and divergence > 0
+                    and c < levels[23.6]
+                    and c + (c - stop_long) * crv <= levels[38.2]
+                ):
+                    over = False
+                    for close, average in zip(
+                        list(close_window)[1:], list(ema9_window)[1:]
+                    ):
+                        if close > average:
+                            over = close
+                            break
+                    if over and c > over and wilr < -90:
+                        entries.append((t, s, 1))
+                        traded_day = day
+                elif (
+                    not vwap > levels[50]
+                    and divergence < 0
+                    and c > levels[78.6]
+                    and c - (stop_short - c) * crv >= levels[61.8]
+                ):
+                    if (
+                        previous_minute_close < previous_ema9
+                        and previous_minute_close > c
+                        and wilr > -10
+                    ):
+                        entries.append((t, s, -1))
+                        traded_day = day
+            previous_minute_close = c
+    return sorted(entries)
+
+
+# the second week starts with the US on daylight saving time and Europe not yet
+@pytest.mark.parametrize("start", [date(2023, 9, 18), date(2023, 3, 13)])
+def test_entries_match_bar_by_bar_replay(start):
+    bars = make_minute_bars(n_symbols=6, n_days=5, seed=3, start=start)
+    indicators = compute_indicators(bars)
+    total = 0
+    for threshold, crv in [(0.1, 0.1), (0.2, 0.5), (0.05, 0.0)]:
+        entries = find_entries(
+            bars,
+            indicators,
+            StrategyConfig(close_vwap_div_threshold=threshold, crv=crv),
+        )
+        expected = replay_on_data(bars, threshold, crv)
+        assert list(zip(entries.bar, entries.symbol, entries.side)) == expected
+        total += len(expected)
+    assert total > 0
+
+
+def test_rolling_extreme_matches_naive_window():
+    values = np.random.default_rng(1).normal(size=(2, 500))
+    for window in (1, 7, 180):
+        expected = np.array(
+            [
+                [values[s, max(0, t - window + 1) : t + 1].max() for t in range(500)]
+                for s in range(2)
+            ]
+        )
+        np.testing.assert_array_equal(
+            _rolling_extreme(values, window, maximum=True), expected
+        )
+
+
+def test_vwap_resets_every_day(minute_bars):
+    vwap = compute_indicators(minute_bars).vwap
+    first_bars = minute_bars.day_offsets[:-1]
+    typical = (minute_bars.high + minute_bars.low + minute_bars.close) / 3
+    np.testing.assert_allclose(vwap[:, first_bars], typical[:, first_bars])
+
+
+def test_entry_levels_come_from_the_entry_bar(minute_bars):
+    indicators = compute_indicators(minute_bars)
+    entries = find_entries(
+        minute_bars, indicators, StrategyConfig(close_vwap_div_threshold=0.1, crv=0.1)
+    )
+    for symbol, bar, side, take_profit in zip(
+        entries.symbol, entries.bar, entries.side, entries.take_profit
+    ):
+        level = 38.2 if side == 1 else 61.8
+        assert take_profit == indicators.fibonacci(level)[symbol, bar]
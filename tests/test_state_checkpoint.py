@@ -0,0 +1,160 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from backtest import random_walk_minute_bars, run_backtest
+from main import Aron20
+from state_checkpoint import (
+    read_checkpoint,
+    slot_mapping,
+    write_checkpoint,
+)
+from tickers import get_tickers_list_as_string
+
+PARAMETERS = {"close_vwap_div_threshold": "0.3", "crv": "1"}
+
+
+def test_checkpoint_files_are_checked_and_replaced_atomically(tmp_path):
+    path = str(tmp_path / "state.ckpt")
+    write_checkpoint(path, {"a": np.arange(3), "b": np.array(["X", ""])})
+    arrays = read_checkpoint(path)
+    assert list(arrays["a"]) == [0, 1, 2] and list(arrays["b"]) == ["X", ""]
+
+    # a failed write keeps the previous checkpoint
+    with pytest.raises(ValueError):
+        write_checkpoint(path, {"a": np.array([object()])})
+    assert list(read_checkpoint(path)["a"]) == [0, 1, 2]
+
+    data = (tmp_path / "state.ckpt").read_bytes()
+    for broken, message in [
+        (data[:-1], "corrupt"),
+        (data[:-5] + bytes(5), "corrupt"),
+        (data[:10], "truncated"),
+        (b"NOTACKPT" + data[8:], "not a checkpoint"),
+        (data[:8] + (99).to_bytes(4, "little") + data[12:], "version 99"),
+    ]:
+        (tmp_path / "broken").write_bytes(broken)
+        with pytest.raises(ValueError, match=message):
+            read_checkpoint(str(tmp_path / "broken"))
+
+
+def test_slots_are_matched_by_symbol():
+    rows, slots = slot_mapping(np.array(["A", "", "C", "D"]), {"D": 0, "A": 2, "E": 1})
+    assert list(rows) == [0, 3] and list(slots) == [2, 0]
+
+
+class Checkpointed(Aron20):
+    """Copies a checkpoint of the entry window of the last day"""
+
+    def on_data(self, data):
+        super().on_data(data)
+        if (
+            self.saved is None
+            and self.time.date() == self.last_day
+            and self.time.hour == 20
+        ):
+            self.save_checkpoint()
+            shutil.copyfile(self.checkpoint_path, self.copy_path)
+            self.saved = self.state.snapshot()
+            self.saved_levels = {
+                str(symbol): list(indicator.levels)
+                for symbol, indicator in self._fibonacci_retracement_levels.items()
+            }
+
+    saved = None
+
+
+class Restarted(Aron20):
+    def restore_checkpoint(self):
+        # the state as restored, before the first bar is processed
+        restored = super().restore_checkpoint()
+        self.restored = self.state.snapshot()
+        self.restored_levels = {
+            str(symbol): list(indicator.levels)
+            for symbol, indicator in self._fibonacci_retracement_levels.items()
+        }
+        return restored
+
+
+def test_restart_restores_the_intraday_state(tmp_path):
+    bars = random_walk_minute_bars(get_tickers_list_as_string(), 3, seed=3)
+    last_day = bars.dates[2].astype(object)
+    Checkpointed.last_day = last_day
+    Checkpointed.copy_path = str(tmp_path / "entry-window.ckpt")
+    first = run_backtest(
+        Checkpointed,
+        bars,
+        dict(PARAMETERS, checkpoint_path=str(tmp_path / "aron20.ckpt")),
+        bars.dates[1].astype(object),
+    ).algorithm
+    assert first.saved["traded_today"].any()
+
+    # starts on the day of the checkpoint, the warm up only sees the day before
+    second = run_backtest(
+        Restarted,
+        bars,
+        dict(PARAMETERS, checkpoint_path=Checkpointed.copy_path),
+        last_day,
+        last_day,
+    ).algorithm
+    assert second.previous_day == last_day
+    for name in ("traded_today", "previous_minute_close", "over_age", "session"):
+        np.testing.assert_array_equal(second.restored[name], first.saved[name])
+    assert second.state.partial_session.all()
+    # the daily range of the checkpoint, the warm up bars are from the day before
+    assert second.restored_levels == first.saved_levels
+
+
+class CrashesAfterEntry(Aron20):
+    """Copies the checkpoint on disk right after the first entries of the last day"""
+
+    def journal_entry(self, symbol, *args):
+        super().journal_entry(symbol, *args)
+        if self.time.date() == self.last_day:
+            self.entered.append(str(symbol))
+
+    def on_data(self, data):
+        super().on_data(data)
+        if self.entered and self.saved is None:
+            shutil.copyfile(self.checkpoint_path, self.copy_path)
+            self.saved = self.state.snapshot()
+            self.entered_before_crash = set(self.entered)
+
+    saved = None
+
+
+class EntersAfterRestart(Restarted):
+    def journal_entry(self, symbol, *args):
+        super().journal_entry(symbol, *args)
+        self.entered.append(str(symbol))
+
+
+def test_restart_after_an_entry_does_not_enter_again(tmp_path):
+    bars = random_walk_minute_bars(get_tickers_list_as_string(), 3, seed=3)
+    last_day = bars.dates[2].astype(object)
+    CrashesAfterEntry.last_day = last_day
+    CrashesAfterEntry.entered = []
+    CrashesAfterEntry.copy_path = str(tmp_path / "after-entry.ckpt")
+    # no periodic checkpoint during the day, only the one of the entries
+    parameters = dict(PARAMETERS, checkpoint_every_n_minutes="100000")
+    first = run_backtest(
+        CrashesAfterEntry,
+        bars,
+        dict(parameters, checkpoint_path=str(tmp_path / "aron20.ckpt")),
+        bars.dates[1].astype(object),
+    ).algorithm
+    assert first.entered
+
+    EntersAfterRestart.entered = []
+    second = run_backtest(
+        EntersAfterRestart,
+        bars,
+        dict(parameters, checkpoint_path=CrashesAfterEntry.copy_path),
+        last_day,
+        last_day,
+    ).algorithm
+    np.testing.assert_array_equal(
+        second.restored["traded_today"], first.saved["traded_today"]
+    )
+    assert not set(second.entered) & first.entered_before_crash
@@ -0,0 +1,81 @@
+from datetime import time
+
+import pytest
+
+from backtest import random_walk_minute_bars, run_backtest
+from main import Aron20
+from parameter_sweep import evaluate, expand_grid, liquidation_bars
+from signal_engine import compute_indicators, entry_window_mask
+from strategy_config import DEFAULT_CONFIG, StrategyConfig
+from tickers import get_tickers_list_as_string
+
+
+def test_from_parameters_parses_strings_and_keeps_defaults():
+    parameters = {
+        "close_vwap_div_threshold": "0.3",
+        "crv": "1",
+        "entry_window_start": "17:30",
+        "wilr_long_threshold": "",
+    }
+    config = StrategyConfig.from_parameters(parameters.get)
+    assert config.close_vwap_div_threshold == 0.3
+    assert config.crv == 1.0
+    assert config.entry_window_start == time(17, 30)
+    assert config.entry_window_minutes == (17 * 60 + 30, 21 * 60)
+    assert config.wilr_long_threshold == DEFAULT_CONFIG.wilr_long_threshold
+
+
+@pytest.mark.parametrize(
+    "parameters",
+    [
+        {"crv": "one"},
+        {"crv": "-1"},
+        {"close_vwap_div_threshold": "4"},
+        {"entry_window_start": "21:30"},
+        {"wilr_short_threshold": "10"},
+        {"risk_per_trade": "0"},
+    ],
+)
+def test_invalid_parameters_are_rejected(parameters):
+    with pytest.raises(ValueError):
+        StrategyConfig.from_parameters(parameters.get)
+
+
+def test_config_is_immutable():
+    with pytest.raises(AttributeError):
+        DEFAULT_CONFIG.crv = 2.0
+
+
+def test_sweep_grid_can_move_the_entry_window():
+    with pytest.raises(ValueError):
+        expand_grid({"cvr": [1.0]})
+
+    bars = random_walk_minute_bars(["SYM0", "SYM1", "SYM2"], 3, seed=3)
+    indicators = compute_indicators(bars)
+    flatten = liquidation_bars(bars)
+    point = {"close_vwap_div_threshold": 0.05, "crv": 0.0}
+    # the default mask is passed along, a moved window must not reuse it
+    closed = {**point, "entry_window_start": "20:58", "entry_window_end": "20:59"}
+    in_window = entry_window_mask(bars)
+    assert evaluate(bars, indicators, in_window, flatten, point).trades > 0
+    assert evaluate(bars, indicators, in_window, flatten, closed).trades == 0
+
+
+def test_aron20_reloads_changed_parameters():
+    bars = random_walk_minute_bars(get_tickers_list_as_string(), 2)
+    parameters = {"close_vwap_div_threshold": "0.3", "crv": "1"}
+    algorithm = run_backtest(
+        Aron20, bars, parameters, bars.dates[1].astype(object)
+    ).algorithm
+    assert algorithm.config == StrategyConfig.from_parameters(parameters.get)
+    assert algorithm.reload_config() is False
+
+    algorithm._lean_parameters["crv"] = "2"
+    assert algorithm.reload_config() is True
+    assert algorithm.config.crv == 2.0
+
+    # a broken update keeps the running config
+    algorithm._lean_parameters["close_vwap_div_threshold"] = "5"
+    assert algorithm.reload_config() is False
+    assert algorithm.config.close_vwap_div_threshold == 0.3
+    assert algorithm.state.min_divergence_percent == 0.3
@@ -0,0 +1,135 @@
+from collections import deque
+
+import numpy as np
+
+from signal_engine import compute_indicators
+from symbol_state import SymbolStateStore
+from tests.conftest import make_minute_bars
+
+
+def test_tracker_matches_rolling_window_scan():
+    state = SymbolStateStore(["A", "B"], window_size=10)
+    rng = np.random.default_rng(0)
+    closes = {0: deque(maxlen=10), 1: deque(maxlen=10)}
+    ema9s = {0: deque(maxlen=10), 1: deque(maxlen=10)}
+    for step in range(60):
+        # B misses every third minute
+        indices = [0, 1] if step % 3 else [0]
+        values = rng.uniform(99, 101, size=(2, len(indices)))
+        # the previous minute values still hold the bar before when checks run
+        state.update_ema9_tracker(indices, values[0], values[1])
+        for position, index in enumerate(indices):
+            closes[index].appendleft(values[0, position])
+            ema9s[index].appendleft(values[1, position])
+
+        for index in (0, 1):
+            # the scan over the windows the tracker replaces
+            expected = next(
+                (
+                    close
+                    for close, ema9 in zip(
+                        list(closes[index])[1:], list(ema9s[index])[1:]
+                    )
+                    if close > ema9
+                ),
+                False,
+            )
+            assert state.previous_close_over_ema9(index) == expected
+            if index in indices and len(closes[index]) > 1:
+                assert state.previous_close_under_ema9(index) == (
+                    closes[index][1] < ema9s[index][1]
+                )
+        state.update_previous_minute_values(
+            indices, values[0], values[0] + 0.5, values[0] - 0.5
+        )
+
+
+def test_previous_minute_values_and_reset():
+    state = SymbolStateStore(["A", "B", "C"])
+    assert state.previous_minute_close.tolist() == [float("-inf")] * 3
+    state.update_previous_minute_values([0, 2], [1.0, 3.0], [1.5, 3.5], [0.5, 2.5])
+    assert state.previous_minute_close.tolist() == [1.0, float("-inf"), 3.0]
+    state.traded_today[1] = True
+    state.reset_traded_today()
+    assert not state.traded_today.any()
+    assert state.index["C"] == 2
+
+
+def test_entry_candidates_cover_the_entry_zones():
+    bars = make_minute_bars(n_symbols=4, n_days=2, seed=5)
+    indicators = compute_indicators(bars)
+    threshold = 0.2
+    with np.errstate(invalid="ignore"):
+        divergence = (indicators.vwap - bars.close) / indicators.vwap * 100
+        significant = (3 >= np.abs(divergence)) & (np.abs(divergence) >= threshold)
+        vwap_above_50 = indicators.vwap > indicators.fibonacci(50)
+        long = (
+            vwap_above_50 & (divergence > 0) & (bars.close < indicators.fibonacci(23.6))
+        )
+        short = (
+            ~vwap_above_50
+            & (divergence < 0)
+            & (bars.close > indicators.fibonacci(78.6))
+        )
+    in_zone = significant & (long | short)
+
+    state = SymbolStateStore(bars.symbols)
+    state.set_divergence_band(threshold, 3)
+    state.invested[3] = True
+    indices = np.arange(bars.n_symbols)
+    candidates = np.zeros_like(in_zone)
+    open_bands = np.zeros_like(in_zone)
+    for day in range(bars.n_days):
+        state.start_session()
+        for bar in range(bars.day_offsets[day], bars.day_offsets[day + 1]):
+            state.update_session(
+                indices,
+                bars.high[:, bar],
+                bars.low[:, bar],
+                bars.close[:, bar],
+                bars.volume[:, bar],
+            )
+            candidates[state.entry_candidates(indices, bars.close[:, bar]), bar] = True
+            open_bands[:, bar] = state.session[state.HIGH] == state.session[state.LOW]
+
+    assert candidates[3].all()
+    assert (candidates[:3] >= in_zone[:3]).all()
+    # anything else was only let through while the day had no range yet
+    assert (open_bands[:3] >= (candidates[:3] & ~in_zone[:3])).all()
+    assert in_zone[:3].any() and not candidates[:3].all()
+
+
+def test_entry_candidates_are_ungated_before_a_full_session():
+    state = SymbolStateStore(["A", "B"])
+    state.update_session([0, 1], [101, 101], [99, 99], [100, 100], [10, 10])
+    assert state.entry_candidates([0, 1], [100, 100]).tolist() == [0, 1]
+
+
+def test_removed_slots_are_reset_and_reused():
+    state = SymbolStateStore(["A"], capacity=2)
+    assert state.symbols == ["A", None]
+    b = state.add("B")
+    assert b == 1 and state.add("B") == 1 and not state.free_slots
+    state.update_session([0, 1], [101.0, 51.0], [99.0, 49.0], [100.0, 50.0], [10, 10])
+    state.update_ema9_tracker([0, 1], [100.0, 50.0], [99.0, 49.0])
+    state.traded_today[b] = True
+
+    assert state.remove("B") == 1
+    assert state.symbols == ["A", None] and "B" not in state.index
+    assert not state.traded_today[1] and np.isnan(state.vwap[1])
+    assert state.previous_close_over_ema9(1) is False
+    # A keeps its state
+    assert state.vwap[0] == 100.0
+
+    # added after the session's first bar the mirrors miss bars, always a candidate
+    state.add("C")
+    state.start_session()
+    # closes far below the VWAP are outside every entry band
+    state.update_session([0, 1], [101.0] * 2, [99.0] * 2, [100.0] * 2, [10, 10])
+    state.remove("A")
+    assert state.add("D") == 0
+    state.update_session([0], [101.0], [99.0], [100.0], [10])
+    assert list(state.entry_candidates([0, 1], [10.0, 10.0])) == [0]
+    state.start_session()
+    state.update_session([0, 1], [101.0] * 2, [99.0] * 2, [100.0] * 2, [10, 10])
+    assert list(state.entry_candidates([0, 1], [10.0, 10.0])) == []
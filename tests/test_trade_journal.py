@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from backtest import random_walk_minute_bars, run_backtest
+from main import Aron20
+from parameter_sweep import resolve_exits
+from signal_engine import run_signal_engine
+from strategy_config import StrategyConfig
+from tickers import get_tickers_list_as_string
+from trade_journal import (
+    LIQUIDATION,
+    STOP_LOSS,
+    TAKE_PROFIT,
+    NpzChunkWriter,
+    TradeJournal,
+    load_journal,
+)
+
+START = datetime(2023, 9, 18, 14)
+LEVELS = [110, 108, 106, 105, 104, 102, 100]
+
+
+def open_long(journal, index=0):
+    journal.open(index, 1, 104, 98, 1.5, 0.5, -95, LEVELS)
+
+
+def test_partial_fills_are_one_trade():
+    journal = TradeJournal(["A", "B"])
+    open_long(journal)
+    journal.fill(0, START, 60, 100.0, LIQUIDATION)
+    journal.fill(0, START, 40, 101.0, LIQUIDATION)
+    assert journal.open_trades == 1
+    journal.update_excursions([0, 1], [103.0, 500.0], [99.0, 1.0])
+    journal.update_excursions([0], [102.0], [97.5])
+    assert not journal.fill(0, START + timedelta(minutes=5), -50, 104.0, TAKE_PROFIT)
+    assert journal.fill(0, START + timedelta(minutes=6), -50, 104.0, TAKE_PROFIT)
+    assert journal.open_trades == 0
+    # later fills without a new entry are not journaled
+    assert not journal.fill(0, START, -10, 104.0, LIQUIDATION)
+
+    columns = journal.columns
+    assert journal.count == 1
+    assert columns["quantity"][0] == 100
+    assert columns["entry_price"][0] == 100.4
+    assert abs(columns["pnl"][0] - 360.0) < 1e-9
+    # one R is 100 shares times the 2.4 to the stop
+    assert abs(columns["r_multiple"][0] - 1.5) < 1e-9
+    assert abs(columns["mae"][0] - 2.9) < 1e-9
+    # the exit itself was the best price
+    assert abs(columns["mfe"][0] - 3.6) < 1e-9
+    assert columns["exit_reason"][0] == TAKE_PROFIT
+    assert list(columns["fibonacci"][0]) == LEVELS
+    assert columns["exit_time"][0] == np.datetime64(START + timedelta(minutes=6))
+
+
+def test_metrics_are_running_totals():
+    journal = TradeJournal(["A", "B"])
+    for index, exit_price, reason in [
+        (0, 104.0, TAKE_PROFIT),
+        (0, 98.0, STOP_LOSS),
+        (1, 104.0, TAKE_PROFIT),
+    ]:
+        open_long(journal, index)
+        journal.fill(index, START, 10, 100.0, reason)
+        journal.fill(index, START, -10, exit_price, reason)
+
+    metrics = journal.metrics
+    assert metrics.trades == 3
+    assert metrics.hit_rate == 2 / 3
+    assert metrics.expectancy == (40 - 20 + 40) / 3
+    assert abs(metrics.expectancy_r - (2 - 1 + 2) / 3) < 1e-9
+    assert metrics.symbol_hit_rates() == {"A": 0.5, "B": 1.0}
+    assert abs(metrics.r_standard_deviation - np.std([2, -1, 2], ddof=1)) < 1e-9
+
+
+def test_full_buffers_are_flushed_in_chunks(tmp_path):
+    journal = TradeJournal(["A"], sink=NpzChunkWriter(str(tmp_path)), capacity=2)
+    for trade in range(5):
+        open_long(journal)
+        journal.fill(0, START, 10, 100.0 + trade, LIQUIDATION)
+        journal.fill(0, START, -10, 101.0 + trade, LIQUIDATION)
+    assert journal.chunks == 2 and journal.count == 1
+    journal.flush()
+
+    trades = load_journal(str(tmp_path))
+    assert list(trades["entry_price"]) == [100.0, 101.0, 102.0, 103.0, 104.0]
+    assert trades["fibonacci"].shape == (5, 7)
+    assert len(list(tmp_path.iterdir())) == 3
+
+
+def test_aron20_journal_matches_resolved_exits(tmp_path):
+    bars = random_walk_minute_bars(get_tickers_list_as_string(), 4, seed=3)
+    parameters = {
+        "close_vwap_div_threshold": "0.3",
+        "crv": "1",
+        "trade_journal_path": str(tmp_path),
+    }
+    algorithm = run_backtest(
+        Aron20, bars, parameters, bars.dates[0].astype(object)
+    ).algorithm
+    trades = load_journal(str(tmp_path))
+
+    expected = resolve_exits(
+        bars, run_signal_engine(bars, StrategyConfig.from_parameters(parameters.get))
+    )
+    traded = expected.quantity > 0
+    assert len(trades["pnl"]) == traded.sum() == algorithm.journal.metrics.trades
+    order = np.lexsort((trades["symbol"], trades["entry_time"]))
+    np.testing.assert_array_equal(
+        trades["exit_reason"][order], expected.exit_reason[traded]
+    )
+    # quantities differ, Aron20 sizes on the running portfolio value
+    np.testing.assert_allclose(
+        trades["entry_price"][order], expected.entries.price[traded]
+    )
+    np.testing.assert_allclose(trades["exit_price"][order], expected.exit_price[traded])
@@ -0,0 +1,54 @@
+import numpy as np
+
+from volume_window_cache import VolumeWindowCache
+
+
+def test_seed_and_roll_forward():
+    cache = VolumeWindowCache(period=3, max_symbols=4)
+    slot = cache.seed("A", [5, 6, 7, 8], time=1)
+    assert sorted(cache.volumes[slot].tolist()) == [6, 7, 8]
+    cache.update("A", 0, time=2)
+    avg_volume, min_volume, has_gap, count = cache.window_statistics([slot])
+    assert avg_volume[0] == 5
+    assert min_volume[0] == 0
+    assert has_gap[0]
+    assert count[0] == 3
+
+
+def test_short_history_only_counts_received_bars():
+    cache = VolumeWindowCache(period=5)
+    slot = cache.seed("A", [10, 20], time=1)
+    avg_volume, min_volume, has_gap, count = cache.window_statistics([slot])
+    assert (avg_volume[0], min_volume[0], has_gap[0], count[0]) == (15, 10, False, 2)
+
+
+def test_lookup_counts_hits_and_stale_windows_as_misses():
+    cache = VolumeWindowCache(period=3)
+    assert cache.lookup("A") is None
+    cache.seed("A", [1, 2, 3], time=10)
+    cache.seed("B", [1, 2, 3], time=10)
+    # A keeps receiving bars after the selection at 10, B does not
+    cache.update("A", 4, time=11)
+    cache.update("unknown", 4, time=11)
+    assert cache.lookup("A", since=10) is not None
+    assert cache.lookup("B", since=10) is None
+    assert "unknown" not in cache
+    assert cache.statistics() == {
+        "hits": 1,
+        "misses": 2,
+        "evictions": 0,
+        "hit_rate": 1 / 3,
+        "symbols": 2,
+    }
+
+
+def test_least_recently_used_symbol_is_evicted():
+    cache = VolumeWindowCache(period=2, max_symbols=2)
+    cache.seed("A", [1, 1], time=0)
+    cache.seed("B", [2, 2], time=0)
+    cache.lookup("A")
+    cache.seed("C", [3, 3], time=0)
+    assert "B" not in cache
+    assert "A" in cache and "C" in cache
+    assert cache.evictions == 1
+    np.testing.assert_array_equal(cache.volumes[cache.slots["C"]], [3, 3])